@@ -0,0 +1,48 @@
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from admission.services.admission_service import AdmissionRejectedError, RouteClass, admission_controller
+from auth.dependencies import get_authenticated_username
+from settings import settings
+
+ROUTE_CLASSES: dict[str, RouteClass] = {
+    "/scrape": "scrape",
+    "/ask": "ask",
+    "/ask/batch": "ask",
+}
+
+
+class AdmissionControlMiddleware:
+    """
+    Runs /scrape and /ask requests through the admission controller, rejecting them with a 503 and a Retry-After
+    header when the worker is overloaded.
+
+    Decision: requests without valid credentials skip admission control, they're rejected by the route straight away
+    so they cost next to nothing, and it means they can't use up the queue space of real clients.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        route_class = ROUTE_CLASSES.get(scope["path"]) if scope["type"] == "http" else None
+        if route_class is None or scope["method"] != "POST" or not settings.ADMISSION_CONTROL_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        username = get_authenticated_username(Headers(scope=scope).get("authorization"))
+        if username is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            async with admission_controller.admit(route_class, username):
+                await self.app(scope, receive, send)
+        except AdmissionRejectedError as e:
+            response = JSONResponse(
+                {"detail": "Server is overloaded, try again later"},
+                status_code=503,
+                headers={"Retry-After": str(e.retry_after_seconds)},
+            )
+            await response(scope, receive, send)
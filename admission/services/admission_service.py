@@ -0,0 +1,217 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Literal
+
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+RouteClass = Literal["scrape", "ask"]
+
+# How much each new latency sample moves the average
+LATENCY_SMOOTHING = 0.2
+# Multiplicative decrease applied to a route's limit while it's over its target latency
+LIMIT_DECREASE_FACTOR = 0.9
+MIN_LIMIT = 1.0
+
+
+class AdmissionRejectedError(Exception):
+    def __init__(self, retry_after_seconds: int) -> None:
+        super().__init__(f"Request rejected, retry after {retry_after_seconds} seconds")
+        self.retry_after_seconds = retry_after_seconds
+
+
+class RouteLimit:
+    """
+    Concurrency limit for one route class, adjusted with AIMD from the latency of its requests. The limit grows by one
+    for every `limit` requests that finish in time while the route is using all of its capacity, and shrinks by 10%
+    (at most once per target latency) while requests finish slower than the target.
+    """
+
+    def __init__(self, maximum: int, target_latency: float, weight: float) -> None:
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.weight = weight
+        self.limit = float(maximum)
+        self.in_flight = 0
+        self.average_latency: float | None = None
+        self._last_decrease = 0.0
+
+    @property
+    def has_capacity(self) -> bool:
+        return self.in_flight < max(MIN_LIMIT, math.floor(self.limit))
+
+    def record_latency(self, latency: float, was_saturated: bool) -> None:
+        if self.average_latency is None:
+            self.average_latency = latency
+        else:
+            self.average_latency += LATENCY_SMOOTHING * (latency - self.average_latency)
+
+        now = time.monotonic()
+        if latency > self.target_latency:
+            # Requests that were already in flight will report the same slowdown, only react to it once
+            if now - self._last_decrease >= self.target_latency:
+                self.limit = max(MIN_LIMIT, self.limit * LIMIT_DECREASE_FACTOR)
+                self._last_decrease = now
+        elif was_saturated:
+            self.limit = min(float(self.maximum), self.limit + 1 / self.limit)
+
+
+@dataclass(order=True)
+class _Waiter:
+    finish_tag: float
+    sequence: int
+    start_tag: float = field(compare=False)
+    future: asyncio.Future[None] = field(compare=False)
+    abandoned: bool = field(default=False, compare=False)
+
+
+class AdmissionController:
+    """
+    Decides when a /scrape or /ask request gets to run. A request runs straight away if both its route and the worker
+    as a whole are under their concurrency limits, otherwise it's queued.
+
+    Queued requests are picked with start-time fair queuing: each (route, username) flow gets a share of the free
+    capacity in proportion to its route's weight, so a burst of /ask calls can't hold back /scrape traffic, and one
+    client can't hold back another on the same route.
+
+    Decision: requests are rejected with a 503 as soon as their expected wait is over ADMISSION_MAX_QUEUE_WAIT_SECONDS,
+    rather than after waiting in the queue that long. That keeps the latency of the requests we do accept stable under
+    overload, instead of every request slowing down together until they all time out.
+    """
+
+    def __init__(self) -> None:
+        self._routes: dict[RouteClass, RouteLimit] = {}
+        self._queues: dict[RouteClass, list[_Waiter]] = {"scrape": [], "ask": []}
+        self._flow_finish_tags: dict[tuple[RouteClass, str], float] = {}
+        self._virtual_time = 0.0
+        self._in_flight = 0
+        self._sequence = itertools.count()
+
+    def route(self, route_class: RouteClass) -> RouteLimit:
+        # Created on first use so the limits come from the settings at that point
+        if route_class not in self._routes:
+            if route_class == "scrape":
+                self._routes[route_class] = RouteLimit(
+                    settings.ADMISSION_SCRAPE_MAX_CONCURRENCY,
+                    settings.ADMISSION_SCRAPE_TARGET_LATENCY_SECONDS,
+                    settings.ADMISSION_SCRAPE_WEIGHT,
+                )
+            else:
+                self._routes[route_class] = RouteLimit(
+                    settings.ADMISSION_ASK_MAX_CONCURRENCY,
+                    settings.ADMISSION_ASK_TARGET_LATENCY_SECONDS,
+                    settings.ADMISSION_ASK_WEIGHT,
+                )
+        return self._routes[route_class]
+
+    def queued(self, route_class: RouteClass) -> int:
+        return sum(not waiter.abandoned for waiter in self._queues[route_class])
+
+    @asynccontextmanager
+    async def admit(self, route_class: RouteClass, username: str) -> AsyncIterator[None]:
+        """
+        Waits until the request can run, raising AdmissionRejectedError if it would have to wait too long.
+        """
+        await self._acquire(route_class, username)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(route_class, time.monotonic() - start)
+
+    async def _acquire(self, route_class: RouteClass, username: str) -> None:
+        route = self.route(route_class)
+        if self._can_run(route) and self.queued(route_class) == 0:
+            self._start(route)
+            return
+
+        queued = self.queued(route_class)
+        if route.average_latency is not None:
+            # Everything queued ahead of us has to get through the route's limit first
+            expected_wait = (queued + 1) * route.average_latency / max(MIN_LIMIT, route.limit)
+            if expected_wait > settings.ADMISSION_MAX_QUEUE_WAIT_SECONDS:
+                logger.info(
+                    "Request shed",
+                    extra={"route": route_class, "queued": queued, "expected_wait_seconds": expected_wait},
+                )
+                raise AdmissionRejectedError(math.ceil(expected_wait))
+
+        flow = (route_class, username)
+        start_tag = max(self._virtual_time, self._flow_finish_tags.get(flow, 0.0))
+        finish_tag = start_tag + 1 / route.weight
+        self._flow_finish_tags[flow] = finish_tag
+        waiter = _Waiter(finish_tag, next(self._sequence), start_tag, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._queues[route_class], waiter)
+        # There may be capacity after all if everything queued before us has given up
+        self._dispatch()
+
+        try:
+            await asyncio.wait_for(waiter.future, settings.ADMISSION_MAX_QUEUE_WAIT_SECONDS)
+        except TimeoutError:
+            # wait_for can time out after _dispatch has already given us a slot in the same loop iteration, that slot
+            # has to be passed on or it's lost for good
+            if waiter.future.done() and not waiter.future.cancelled():
+                self._release(route_class, None)
+            waiter.abandoned = True
+            logger.info("Request shed", extra={"route": route_class, "queued": queued})
+            raise AdmissionRejectedError(math.ceil(settings.ADMISSION_MAX_QUEUE_WAIT_SECONDS))
+        except asyncio.CancelledError:
+            # The client went away. If we had already been given a slot, pass it on to someone else
+            if waiter.future.done() and not waiter.future.cancelled():
+                self._release(route_class, None)
+            waiter.abandoned = True
+            raise
+
+    def _can_run(self, route: RouteLimit) -> bool:
+        return self._in_flight < settings.ADMISSION_MAX_IN_FLIGHT and route.has_capacity
+
+    def _start(self, route: RouteLimit) -> None:
+        route.in_flight += 1
+        self._in_flight += 1
+
+    def _release(self, route_class: RouteClass, latency: float | None) -> None:
+        route = self.route(route_class)
+        was_saturated = not route.has_capacity or bool(self._queues[route_class])
+        route.in_flight -= 1
+        self._in_flight -= 1
+        if latency is not None:
+            route.record_latency(latency, was_saturated)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        # Flows that have caught up with the virtual time don't affect scheduling anymore
+        if len(self._flow_finish_tags) > 1000:
+            self._flow_finish_tags = {
+                flow: tag for flow, tag in self._flow_finish_tags.items() if tag > self._virtual_time
+            }
+
+        while self._in_flight < settings.ADMISSION_MAX_IN_FLIGHT:
+            # The waiter with the lowest finish tag out of the routes that have room for another request
+            best: tuple[RouteClass, _Waiter] | None = None
+            for route_class, queue in self._queues.items():
+                # Waiters that timed out or were cancelled are left in the queue until they reach the front
+                while queue and (queue[0].abandoned or queue[0].future.done()):
+                    heapq.heappop(queue)
+                if not queue or not self.route(route_class).has_capacity:
+                    continue
+                if best is None or queue[0] < best[1]:
+                    best = (route_class, queue[0])
+            if best is None:
+                return
+
+            route_class, waiter = best
+            heapq.heappop(self._queues[route_class])
+            self._virtual_time = waiter.start_tag
+            self._start(self.route(route_class))
+            waiter.future.set_result(None)
+
+
+admission_controller = AdmissionController()
@@ -1,8 +1,10 @@
+import base64
 import secrets
 from typing import Annotated
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
+from fastapi.security.utils import get_authorization_scheme_param
 
 from settings import settings
 
@@ -12,7 +14,35 @@ security = HTTPBasic()
 # Decision: Using Basic Auth here for simplicity in this example. In a production application,
 # I would use JWTs
 async def verify_credentials(credentials: Annotated[HTTPBasicCredentials, Depends(security)]) -> None:
-    is_username_correct = secrets.compare_digest(credentials.username, settings.ADMIN_USERNAME)
-    is_password_correct = secrets.compare_digest(credentials.password, settings.ADMIN_PASSWORD)
-    if not (is_username_correct and is_password_correct):
+    if not credentials_are_valid(credentials.username, credentials.password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+
+
+def credentials_are_valid(username: str, password: str) -> bool:
+    # Checking both before returning so the time taken doesn't tell you which one was wrong
+    is_username_correct = secrets.compare_digest(username, settings.ADMIN_USERNAME)
+    is_password_correct = secrets.compare_digest(password, settings.ADMIN_PASSWORD)
+    return is_username_correct and is_password_correct
+
+
+def request_has_valid_credentials(authorization: str | None) -> bool:
+    """
+    For code that runs outside of a route (e.g. middleware) and so can't use the verify_credentials dependency.
+    """
+    return get_authenticated_username(authorization) is not None
+
+
+def get_authenticated_username(authorization: str | None) -> str | None:
+    """
+    Returns the username from a Basic auth header, or None if the credentials aren't valid.
+    """
+    scheme, param = get_authorization_scheme_param(authorization)
+    if scheme.lower() != "basic":
+        return None
+    try:
+        username, _, password = base64.b64decode(param).decode().partition(":")
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if not credentials_are_valid(username, password):
+        return None
+    return username
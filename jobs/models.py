@@ -0,0 +1,27 @@
+from datetime import datetime
+from typing import Literal
+
+from pydantic import BaseModel
+
+from scraping.models import FetchMode, ScrapeAskQuestionResponse, ScrapingResponse
+
+JobType = Literal["scrape", "ask"]
+JobStatus = Literal["queued", "running", "succeeded", "failed"]
+
+
+class JobError(BaseModel):
+    status_code: int
+    detail: str
+
+
+class Job(BaseModel):
+    id: str
+    type: JobType
+    status: JobStatus
+    url: str
+    question: str | None = None
+    fetch_mode: FetchMode | None = None
+    result: ScrapingResponse | ScrapeAskQuestionResponse | None = None
+    error: JobError | None = None
+    created_at: datetime
+    finished_at: datetime | None = None
@@ -0,0 +1,56 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.security import HTTPBasicCredentials
+
+from auth.dependencies import security, verify_credentials
+from jobs.models import Job, JobType
+from jobs.services.job_service import JobQueueFullError, job_manager
+from scraping.models import ScrapeAskQuestionRequest, ScrapeRequest
+from settings import settings
+
+router = APIRouter(prefix="/jobs", dependencies=[Depends(verify_credentials)])
+
+
+async def _submit(
+    job_type: JobType, request: ScrapeRequest, credentials: HTTPBasicCredentials, question: str | None = None
+) -> Job:
+    try:
+        return await job_manager.submit(
+            job_type, request.url, question, request.fetch_mode, username=credentials.username
+        )
+    except JobQueueFullError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many jobs queued, try again later",
+            headers={"Retry-After": str(settings.JOBS_RETRY_AFTER_SECONDS)},
+        )
+
+
+@router.post("/scrape", status_code=status.HTTP_202_ACCEPTED)
+async def create_scrape_job(
+    request: ScrapeRequest,
+    # Already checked by verify_credentials, this is just for the username
+    credentials: Annotated[HTTPBasicCredentials, Depends(security)],
+) -> Job:
+    return await _submit("scrape", request, credentials)
+
+
+@router.post("/ask", status_code=status.HTTP_202_ACCEPTED)
+async def create_ask_job(
+    request: ScrapeAskQuestionRequest,
+    credentials: Annotated[HTTPBasicCredentials, Depends(security)],
+) -> Job:
+    return await _submit("ask", request, credentials, request.question)
+
+
+@router.get("/{job_id}")
+async def get_job(
+    job_id: str,
+    # Long polling: how many seconds to wait for the job to finish before returning it as it is
+    wait: Annotated[float, Query(ge=0)] = 0,
+) -> Job:
+    job = await job_manager.wait(job_id, min(wait, settings.JOBS_MAX_WAIT_SECONDS))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
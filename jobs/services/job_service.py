@@ -0,0 +1,292 @@
+import asyncio
+import contextlib
+import logging
+import os
+import uuid
+from contextlib import AbstractAsyncContextManager
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+from fastapi import HTTPException
+
+from admission.services.admission_service import AdmissionRejectedError, admission_controller
+from jobs.models import Job, JobError, JobType
+from scraping.models import FetchMode, ScrapeAskQuestionResponse, ScrapingResponse
+from scraping.services.openai_service import get_ai_response
+from scraping.services.scraping_service import webscrape_url
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+# How often finished jobs past their TTL are removed
+SWEEP_INTERVAL_SECONDS = 60
+
+
+class JobQueueFullError(Exception):
+    pass
+
+
+class JobManager:
+    """
+    Runs scrape/ask jobs on a fixed number of worker tasks, so the number of open connections doesn't decide how much
+    work is in progress at once.
+
+    Decision: jobs and results are kept in memory, with a copy on disk (JOBS_STORAGE_DIR). The disk copy lets any
+    worker process answer a poll for a job another worker ran, and keeps finished results around if a worker restarts.
+    Something like redis would be the next step if we needed to share jobs between hosts. The file reads and writes
+    run in a thread so a slow disk doesn't hold up the event loop.
+
+    Decision: jobs go through the same admission control as /scrape and /ask requests before they run, so they share
+    the worker's capacity fairly with them instead of adding JOBS_CONCURRENCY on top. A job that would wait too long
+    for capacity fails with a 503, the same as a request would.
+    """
+
+    def __init__(self) -> None:
+        self._jobs: dict[str, Job] = {}
+        self._finished_events: dict[str, asyncio.Event] = {}
+        # (job id, username of whoever submitted it)
+        self._queue: asyncio.Queue[tuple[str, str]] | None = None
+        self._tasks: list[asyncio.Task[None]] = []
+
+    @property
+    def _storage_dir(self) -> Path | None:
+        if not settings.JOBS_STORAGE_DIR:
+            return None
+        return Path(settings.JOBS_STORAGE_DIR)
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        if self._storage_dir is not None:
+            # Job files hold results and questions, and are loaded back by every worker, so only we get to use them
+            self._storage_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+            _check_storage_dir_is_private(self._storage_dir)
+        self._queue = asyncio.Queue(maxsize=settings.JOBS_MAX_QUEUED)
+        self._tasks = [asyncio.create_task(self._run_worker()) for _ in range(settings.JOBS_CONCURRENCY)]
+        self._tasks.append(asyncio.create_task(self._run_sweeper()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+        # Anything still queued or running won't be picked up again, so let whoever is polling know
+        for job in self._jobs.values():
+            if job.finished_at is None:
+                await self._finish(
+                    job, error=JobError(status_code=503, detail="Server shut down before the job finished")
+                )
+
+    async def submit(
+        self,
+        job_type: JobType,
+        url: str,
+        question: str | None = None,
+        fetch_mode: FetchMode | None = None,
+        *,
+        username: str,
+    ) -> Job:
+        if self._queue is None:
+            raise RuntimeError("JobManager has not been started")
+        if self._queue.full():
+            raise JobQueueFullError()
+
+        job = Job(
+            id=uuid.uuid4().hex,
+            type=job_type,
+            status="queued",
+            url=url,
+            question=question,
+            fetch_mode=fetch_mode,
+            created_at=_now(),
+        )
+        self._jobs[job.id] = job
+        self._finished_events[job.id] = asyncio.Event()
+        # Saved before it's queued, so a worker can't pick it up and save a newer state first
+        await self._save(job)
+        try:
+            self._queue.put_nowait((job.id, username))
+        except asyncio.QueueFull:
+            # Other jobs were submitted while we were saving this one
+            del self._jobs[job.id]
+            del self._finished_events[job.id]
+            await asyncio.to_thread(self._delete, job.id)
+            raise JobQueueFullError()
+        return job
+
+    async def get(self, job_id: str) -> Job | None:
+        job = self._jobs.get(job_id)
+        if job is None:
+            job = await asyncio.to_thread(self._load, job_id)
+        if job is None or self._is_expired(job):
+            return None
+        return job
+
+    async def wait(self, job_id: str, timeout: float) -> Job | None:
+        """
+        Returns the job once it has finished, or as it is when the timeout runs out.
+        """
+        job = await self.get(job_id)
+        if job is None or job.finished_at is not None:
+            return job
+
+        event = self._finished_events.get(job_id)
+        if event is not None:
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except TimeoutError:
+                pass
+            return await self.get(job_id)
+
+        # The job is being run by another worker process, so the only way to see it change is through the disk copy
+        deadline = asyncio.get_running_loop().time() + timeout
+        while job is not None and job.finished_at is None and asyncio.get_running_loop().time() < deadline:
+            await asyncio.sleep(0.5)
+            job = await self.get(job_id)
+        return job
+
+    async def _run_worker(self) -> None:
+        assert self._queue is not None
+        while True:
+            job_id, username = await self._queue.get()
+            try:
+                await self._run_job(self._jobs[job_id], username)
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job: Job, username: str) -> None:
+        try:
+            # Stays queued until it has been admitted
+            async with _admit(job.type, username):
+                job.status = "running"
+                await self._save(job)
+                result = await self._execute(job)
+        except AdmissionRejectedError:
+            await self._finish(job, error=JobError(status_code=503, detail="Server is overloaded, try again later"))
+        except HTTPException as e:
+            await self._finish(job, error=JobError(status_code=e.status_code, detail=str(e.detail)))
+        except Exception:
+            logger.exception("Job %s failed", job.id)
+            await self._finish(job, error=JobError(status_code=500, detail="Job failed"))
+        else:
+            await self._finish(job, result=result)
+
+    async def _finish(
+        self,
+        job: Job,
+        result: ScrapingResponse | ScrapeAskQuestionResponse | None = None,
+        error: JobError | None = None,
+    ) -> None:
+        job.status = "failed" if error is not None else "succeeded"
+        job.result = result
+        job.error = error
+        job.finished_at = _now()
+        await self._save(job)
+        event = self._finished_events.pop(job.id, None)
+        if event is not None:
+            event.set()
+
+    async def _execute(self, job: Job) -> ScrapingResponse | ScrapeAskQuestionResponse:
+        webscrape_result = await webscrape_url(job.url, job.fetch_mode)
+        if job.type == "scrape":
+            return webscrape_result
+
+        if webscrape_result.content == "":
+            raise HTTPException(status_code=400, detail="Failed to get content from URL")
+        assert job.question is not None
+        # get_ai_response blocks on the OpenAI call, run it in a thread so the other workers can carry on
+        return await asyncio.to_thread(get_ai_response, webscrape_result.content, job.question)
+
+    async def _run_sweeper(self) -> None:
+        while True:
+            await asyncio.sleep(SWEEP_INTERVAL_SECONDS)
+            await self._sweep()
+
+    async def _sweep(self) -> None:
+        expired_job_ids = [job.id for job in self._jobs.values() if self._is_expired(job)]
+        for job_id in expired_job_ids:
+            del self._jobs[job_id]
+        await asyncio.to_thread(self._delete_files, expired_job_ids)
+
+    def _delete_files(self, expired_job_ids: list[str]) -> None:
+        for job_id in expired_job_ids:
+            self._delete(job_id)
+
+        # Also clean up files left behind by worker processes that have since exited
+        if self._storage_dir is not None:
+            cutoff = _now().timestamp() - settings.JOBS_RESULT_TTL_SECONDS
+            for path in self._storage_dir.glob("*.json"):
+                try:
+                    if path.stat().st_mtime < cutoff:
+                        path.unlink(missing_ok=True)
+                except FileNotFoundError:
+                    # Another worker process got to it first
+                    continue
+
+    def _is_expired(self, job: Job) -> bool:
+        if job.finished_at is None:
+            return False
+        return _now() - job.finished_at > timedelta(seconds=settings.JOBS_RESULT_TTL_SECONDS)
+
+    def _path(self, job_id: str) -> Path | None:
+        if self._storage_dir is None:
+            return None
+        return self._storage_dir / f"{job_id}.json"
+
+    async def _save(self, job: Job) -> None:
+        path = self._path(job.id)
+        if path is None:
+            return
+        # Serialised here rather than in the thread, the job can change while the write is in progress
+        await asyncio.to_thread(_write_atomically, path, job.model_dump_json())
+
+    def _load(self, job_id: str) -> Job | None:
+        # Job ids are uuid hex strings, anything else can't be a job and shouldn't be used to build a path
+        if not job_id.isalnum():
+            return None
+        path = self._path(job_id)
+        if path is None or not path.exists():
+            return None
+        return Job.model_validate_json(path.read_text())
+
+    def _delete(self, job_id: str) -> None:
+        path = self._path(job_id)
+        if path is not None:
+            path.unlink(missing_ok=True)
+
+
+def _admit(job_type: JobType, username: str) -> AbstractAsyncContextManager[None]:
+    if not settings.ADMISSION_CONTROL_ENABLED:
+        return contextlib.nullcontext()
+    return admission_controller.admit(job_type, username)
+
+
+def _check_storage_dir_is_private(path: Path) -> None:
+    """
+    Refuses a directory another user could read our job files from or plant their own in, e.g. one they created under
+    the shared temp dir before we did.
+    """
+    if not hasattr(os, "getuid"):
+        # Windows, the temp dir is already per user
+        return
+    stat = path.stat()
+    if stat.st_uid != os.getuid():
+        raise RuntimeError(f"JOBS_STORAGE_DIR {path} is owned by another user")
+    if stat.st_mode & 0o022:
+        raise RuntimeError(f"JOBS_STORAGE_DIR {path} can be written to by other users")
+
+
+def _write_atomically(path: Path, data: str) -> None:
+    # Write then rename, so a poll from another process never reads a half written file
+    temp_path = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+    temp_path.write_text(data)
+    os.replace(temp_path, path)
+
+
+def _now() -> datetime:
+    return datetime.now(UTC)
+
+
+job_manager = JobManager()
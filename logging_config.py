@@ -0,0 +1,35 @@
+"""
+Logging setup for the app's own loggers. uvicorn only configures its own loggers, so without this everything below a
+warning (including the metrics the services log in `extra` fields) was dropped.
+"""
+
+import logging
+
+from settings import settings
+
+# Attributes every LogRecord has, anything else on a record was passed in `extra`
+_STANDARD_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class ExtraFieldsFormatter(logging.Formatter):
+    """
+    Appends the fields passed with `extra` to the message as key=value pairs.
+    """
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        message = super().formatMessage(record)
+        extras = " ".join(
+            f"{key}={value}" for key, value in vars(record).items() if key not in _STANDARD_RECORD_ATTRIBUTES
+        )
+        return f"{message} {extras}" if extras else message
+
+
+def configure_logging() -> None:
+    root_logger = logging.getLogger()
+    if any(isinstance(handler.formatter, ExtraFieldsFormatter) for handler in root_logger.handlers):
+        return
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(ExtraFieldsFormatter("%(levelname)s:     %(name)s: %(message)s"))
+    root_logger.addHandler(handler)
+    root_logger.setLevel(settings.LOG_LEVEL)
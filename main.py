@@ -1,6 +1,44 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
+from admission.middleware import AdmissionControlMiddleware
+from jobs.router import router as jobs_router
+from jobs.services.job_service import job_manager
+from logging_config import configure_logging
+from profiling.middleware import RequestProfilingMiddleware
+from profiling.router import router as profiling_router
 from scraping.router import router
+from scraping.warm_up import warm_up
+from search.router import router as search_router
+from search.services.index_service import search_index
+from settings import settings
+
+configure_logging()
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    # Decision: warming up in a background thread means the worker can start accepting requests straight away, any
+    # request that arrives before it's done just waits on the import lock for the module it needs
+    warm_up_task = None
+    if settings.WARM_UP_ON_STARTUP:
+        warm_up_task = asyncio.create_task(asyncio.to_thread(warm_up))
+    job_manager.start()
+    search_index.start()
+    yield
+    await job_manager.stop()
+    await search_index.stop()
+    if warm_up_task is not None:
+        await warm_up_task
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 app.include_router(router)
+app.include_router(jobs_router)
+app.include_router(profiling_router)
+app.include_router(search_router)
+app.add_middleware(RequestProfilingMiddleware)
+app.add_middleware(AdmissionControlMiddleware)
@@ -0,0 +1,62 @@
+import cProfile
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from auth.dependencies import request_has_valid_credentials
+from profiling.services.profiling_service import request_profile_store, request_thread_profilers
+from settings import settings
+
+PROFILE_REQUEST_HEADER = "x-profile"
+PROFILE_ID_HEADER = "x-profile-id"
+
+
+class RequestProfilingMiddleware:
+    """
+    Runs cProfile on the event loop thread while a request sent with an "X-Profile" header is in progress. The id to
+    fetch the profile with from /admin/profiles/{profile_id} is returned in the "X-Profile-Id" response header.
+
+    Decision: this is a plain ASGI middleware rather than @app.middleware("http") since BaseHTTPMiddleware adds
+    overhead to every request, and almost none of them will be profiled. Only requests with valid credentials are
+    profiled, so the header can't be used by anyone else to slow the server down.
+
+    The request's blocking calls that run in worker threads through run_in_thread are profiled in those threads, only
+    for this request, and added to the profile.
+
+    Note: the event loop part of the profile isn't isolated to the request. It includes everything the event loop runs
+    in the meantime, which can be work for other requests running at the same time. Profile against a quiet worker for
+    a clean picture.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.PROFILING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        if PROFILE_REQUEST_HEADER not in headers or not request_has_valid_credentials(headers.get("authorization")):
+            await self.app(scope, receive, send)
+            return
+
+        started = request_profile_store.start()
+        if started is None:
+            # Another request is already being profiled
+            await self.app(scope, receive, send)
+            return
+        profile_id, profiler = started
+
+        async def send_with_profile_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[PROFILE_ID_HEADER] = profile_id
+            await send(message)
+
+        thread_profilers: list[cProfile.Profile] = []
+        token = request_thread_profilers.set(thread_profilers)
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            request_thread_profilers.reset(token)
+            request_profile_store.finish(profile_id, profiler, thread_profilers)
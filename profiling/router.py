@@ -0,0 +1,49 @@
+import asyncio
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from auth.dependencies import verify_credentials
+from profiling.services.profiling_service import format_collapsed_stacks, request_profile_store, sample_stacks
+from settings import settings
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(verify_credentials)])
+
+# Only one sampling profile per worker process at a time, they'd just be sampling each other otherwise
+_sampling_lock = asyncio.Lock()
+
+
+def _check_profiling_enabled() -> None:
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+@router.post("/profile", response_class=PlainTextResponse, dependencies=[Depends(_check_profiling_enabled)])
+async def run_sampling_profiler(
+    seconds: Annotated[float, Query(gt=0)] = 5,
+    interval_ms: Annotated[float, Query(ge=1, le=1000)] = 10,
+) -> PlainTextResponse:
+    """
+    Samples what the worker process handling this request is doing for the given number of seconds, and returns the
+    stacks in the collapsed format used by flamegraph.pl and speedscope.
+    """
+    if _sampling_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+
+    async with _sampling_lock:
+        # The sampling runs in a thread so the event loop is free to carry on with the work we want to profile
+        samples = await asyncio.to_thread(
+            sample_stacks, min(seconds, settings.PROFILING_MAX_SECONDS), interval_ms / 1000
+        )
+    return PlainTextResponse(format_collapsed_stacks(samples))
+
+
+@router.get(
+    "/profiles/{profile_id}", response_class=PlainTextResponse, dependencies=[Depends(_check_profiling_enabled)]
+)
+async def get_request_profile(profile_id: str) -> PlainTextResponse:
+    profile = request_profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(profile)
@@ -0,0 +1,151 @@
+import asyncio
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from collections.abc import Callable, Sequence
+from contextvars import ContextVar
+from types import FrameType
+
+from settings import settings
+
+# Set by RequestProfilingMiddleware while a request sent with "X-Profile" is handled, run_in_thread adds the profiles
+# of the request's calls in worker threads to it
+request_thread_profilers: ContextVar[list[cProfile.Profile] | None] = ContextVar(
+    "request_thread_profilers", default=None
+)
+
+
+def sample_stacks(duration: float, interval: float) -> Counter[str]:
+    """
+    Samples the stack of every other thread every `interval` seconds for `duration` seconds, and returns how many times
+    each stack was seen.
+
+    Decision: a sampling profiler only costs us one thread waking up every few milliseconds and doesn't slow down the
+    code being profiled, unlike cProfile which hooks every function call. That's what makes it safe to run against
+    production traffic.
+    """
+    own_thread_id = threading.get_ident()
+    thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+    samples: Counter[str] = Counter()
+
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread_id:
+                continue
+            thread_name = thread_names.get(thread_id)
+            if thread_name is None:
+                thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+                thread_name = thread_names.get(thread_id, str(thread_id))
+            samples[_collapse_stack(thread_name, frame)] += 1
+        time.sleep(interval)
+    return samples
+
+
+def _collapse_stack(thread_name: str, frame: FrameType | None) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{frame.f_globals.get('__name__', code.co_filename)}:{code.co_qualname}")
+        frame = frame.f_back
+    names.append(thread_name)
+    # Collapsed stacks go from the root of the stack to the leaf
+    return ";".join(reversed(names))
+
+
+def format_collapsed_stacks(samples: Counter[str]) -> str:
+    """
+    Formats the samples in the "collapsed" format used by flamegraph.pl and speedscope, one "frame;frame;frame count"
+    line per stack.
+    """
+    return "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
+
+
+async def run_in_thread[**P, T](func: Callable[P, T], /, *args: P.args, **kwargs: P.kwargs) -> T:
+    """
+    Same as asyncio.to_thread, except that if the request is being profiled the call is profiled as part of it.
+    cProfile only profiles the thread it's enabled on, so the request's work in worker threads would be missing
+    otherwise.
+    """
+    profilers = request_thread_profilers.get()
+    if profilers is None:
+        return await asyncio.to_thread(func, *args, **kwargs)
+    return await asyncio.to_thread(_call_profiled, profilers, func, *args, **kwargs)
+
+
+def _call_profiled[**P, T](
+    profilers: list[cProfile.Profile], func: Callable[P, T], /, *args: P.args, **kwargs: P.kwargs
+) -> T:
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Something else (e.g. a debugger) already has a profiler enabled on this thread
+        return func(*args, **kwargs)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profiler.disable()
+        profilers.append(profiler)
+
+
+class RequestProfileStore:
+    """
+    Keeps the most recent X-Profile profiles in memory so they can be fetched after the request has finished.
+    """
+
+    def __init__(self) -> None:
+        self._profiles: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        # cProfile can only have one profiler enabled per thread, and all requests run on the event loop thread
+        self._profiling = False
+
+    def start(self) -> tuple[str, cProfile.Profile] | None:
+        """
+        Starts profiling and returns the id the profile will be stored under, or None if a profile is already running.
+        """
+        with self._lock:
+            if self._profiling:
+                return None
+            self._profiling = True
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Something else (e.g. a debugger) already has a profiler enabled on this thread
+            with self._lock:
+                self._profiling = False
+            return None
+        return uuid.uuid4().hex, profiler
+
+    def finish(
+        self, profile_id: str, profiler: cProfile.Profile, thread_profilers: Sequence[cProfile.Profile] = ()
+    ) -> None:
+        """
+        Stores the profile of the event loop thread, combined with the profiles of the request's calls in worker
+        threads.
+        """
+        profiler.disable()
+        output = io.StringIO()
+        stats = pstats.Stats(profiler, stream=output)
+        for thread_profiler in list(thread_profilers):
+            stats.add(thread_profiler)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(settings.PROFILING_REQUEST_STATS_LIMIT)
+
+        with self._lock:
+            self._profiling = False
+            self._profiles[profile_id] = output.getvalue()
+            while len(self._profiles) > settings.PROFILING_MAX_STORED_PROFILES:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> str | None:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+
+request_profile_store = RequestProfileStore()
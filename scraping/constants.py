@@ -17,3 +17,7 @@ WIKIPEDIA_SUBJECT_NAMESPACES = {
     "Special:",
     "Media:",
 }
+
+# Decision: References are stored as "/wiki/..." paths and only joined with this base when serialized, so we don't
+# build a new full URL string for every link on the page while scraping
+WIKIPEDIA_BASE_URL = "https://en.wikipedia.org"
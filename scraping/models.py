@@ -1,8 +1,15 @@
-from pydantic import BaseModel, Field
+from typing import Annotated, Literal
+
+from pydantic import BaseModel, Field, field_serializer
+
+# "page" downloads the full wiki page, "parse_api" only fetches the article body through the MediaWiki parse API
+FetchMode = Literal["page", "parse_api"]
 
 
 class ScrapeRequest(BaseModel):
     url: str = Field(min_length=1, max_length=2048)  # 2048 is the max length of a URL
+    # Defaults to the SCRAPE_FETCH_MODE setting
+    fetch_mode: FetchMode | None = None
 
 
 class ScrapingResponse(BaseModel):
@@ -10,7 +17,16 @@ class ScrapingResponse(BaseModel):
     content: str
     image_url: str
     categories: list[str]
+    # Stored as path-only values (e.g. "/wiki/Mercia") when reference_base is set, see _find_wiki_references
     references: list[str]
+    reference_base: str = Field(default="", exclude=True)
+
+    @field_serializer("references")
+    def _serialize_references(self, references: list[str]) -> list[str]:
+        if self.reference_base == "":
+            return references
+        base = self.reference_base
+        return [base + path for path in references]
 
 
 class ScrapeAskQuestionRequest(ScrapeRequest):
@@ -19,3 +35,17 @@ class ScrapeAskQuestionRequest(ScrapeRequest):
 
 class ScrapeAskQuestionResponse(BaseModel):
     answer: str
+
+
+class ScrapeAskQuestionsRequest(ScrapeRequest):
+    # Decision: capped so a single request can't ask for an answer that won't fit in one completion
+    questions: list[Annotated[str, Field(min_length=1)]] = Field(min_length=1, max_length=20)
+
+
+class QuestionAnswer(BaseModel):
+    question: str
+    answer: str
+
+
+class ScrapeAskQuestionsResponse(BaseModel):
+    answers: list[QuestionAnswer]
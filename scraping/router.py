@@ -1,31 +1,58 @@
 import logging
+from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
 
 from auth.dependencies import verify_credentials
-from scraping.models import ScrapeAskQuestionRequest, ScrapeAskQuestionResponse, ScrapeRequest, ScrapingResponse
-from scraping.services.openai_service import get_ai_response
+from profiling.services.profiling_service import run_in_thread
+from scraping.models import (
+    ScrapeAskQuestionRequest,
+    ScrapeAskQuestionResponse,
+    ScrapeAskQuestionsRequest,
+    ScrapeAskQuestionsResponse,
+    ScrapeRequest,
+    ScrapingResponse,
+)
+from scraping.services.openai_service import get_ai_response, get_ai_responses
 from scraping.services.scraping_service import webscrape_url
+from scraping.services.serialization_service import encode_json_response
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(dependencies=[Depends(verify_credentials)])
 
 
-@router.post("/scrape")
+# Decision: response_model is still declared so the OpenAPI docs stay the same, but we return the encoded Response
+# ourselves since the scrape responses can be large
+@router.post("/scrape", response_model=ScrapingResponse)
 async def scrape_website(
     request: ScrapeRequest,
-) -> ScrapingResponse:
-    return await webscrape_url(request.url)
+    accept_encoding: Annotated[str | None, Header()] = None,
+) -> Response:
+    webscrape_result = await webscrape_url(request.url, request.fetch_mode)
+    return encode_json_response(webscrape_result, accept_encoding)
 
 
 @router.post("/ask")
 async def ask_wiki(
     request: ScrapeAskQuestionRequest,
 ) -> ScrapeAskQuestionResponse:
-    webscrape_result = await webscrape_url(request.url)
+    webscrape_result = await webscrape_url(request.url, request.fetch_mode)
     content = webscrape_result.content
     if content == "":
         raise HTTPException(status_code=400, detail="Failed to get content from URL")
     question = request.question
-    return get_ai_response(content, question)
+    # The openai client is synchronous, so the completion runs in a thread to keep the event loop free for other requests
+    return await run_in_thread(get_ai_response, content, question)
+
+
+@router.post("/ask/batch")
+async def ask_wiki_batch(
+    request: ScrapeAskQuestionsRequest,
+) -> ScrapeAskQuestionsResponse:
+    webscrape_result = await webscrape_url(request.url, request.fetch_mode)
+    content = webscrape_result.content
+    if content == "":
+        raise HTTPException(status_code=400, detail="Failed to get content from URL")
+    # The openai client is synchronous, so the completion runs in a thread to keep the event loop free for other requests
+    return await run_in_thread(get_ai_responses, content, request.questions)
@@ -0,0 +1,233 @@
+"""
+In-memory cache of scraped articles, keyed by url and fetch mode.
+
+Decision: most of the memory in a cached ScrapingResponse is the content string and the thousands of reference and
+category strings, which are mostly the same across articles ("/wiki/England", "Articles with short description").
+Entries are stored in a compact form instead: references and categories become ids into a symbol table shared by
+every entry, and the content is kept compressed (with a dictionary trained on the first articles cached) and only
+decompressed when the entry is read. scripts/cache_memory_report.py measures how many more articles that fits in the
+same memory.
+"""
+
+import time
+from array import array
+from collections import OrderedDict
+from typing import TYPE_CHECKING, NamedTuple
+
+from scraping.models import FetchMode, ScrapingResponse
+from settings import settings
+
+if TYPE_CHECKING:
+    import zstandard
+
+# Number of articles to collect before training the compression dictionary, and the most the dictionary can grow to
+DICTIONARY_TRAINING_SAMPLES = 32
+DICTIONARY_SIZE = 32 * 1024
+# Rough size of the python objects making up an entry, on top of the bytes of its fields
+ENTRY_OVERHEAD_BYTES = 400
+SYMBOL_OVERHEAD_BYTES = 120
+
+
+class SymbolTable:
+    """
+    Stores each distinct string once and gives out an integer id for it. Ids are reference counted so strings no longer
+    used by any entry are dropped and their ids reused.
+    """
+
+    def __init__(self) -> None:
+        self._ids: dict[str, int] = {}
+        self._strings: list[str | None] = []
+        self._counts = array("I")
+        self._free_ids: list[int] = []
+        self.nbytes = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def intern(self, value: str) -> int:
+        symbol_id = self._ids.get(value)
+        if symbol_id is not None:
+            self._counts[symbol_id] += 1
+            return symbol_id
+
+        if self._free_ids:
+            symbol_id = self._free_ids.pop()
+            self._strings[symbol_id] = value
+            self._counts[symbol_id] = 1
+        else:
+            symbol_id = len(self._strings)
+            self._strings.append(value)
+            self._counts.append(1)
+        self._ids[value] = symbol_id
+        self.nbytes += len(value) + SYMBOL_OVERHEAD_BYTES
+        return symbol_id
+
+    def lookup(self, symbol_id: int) -> str:
+        value = self._strings[symbol_id]
+        assert value is not None
+        return value
+
+    def release(self, symbol_id: int) -> None:
+        self._counts[symbol_id] -= 1
+        if self._counts[symbol_id] > 0:
+            return
+        value = self._strings[symbol_id]
+        assert value is not None
+        del self._ids[value]
+        self._strings[symbol_id] = None
+        self._free_ids.append(symbol_id)
+        self.nbytes -= len(value) + SYMBOL_OVERHEAD_BYTES
+
+
+class ContentCompressor:
+    """
+    Compresses article content with zstandard, using a dictionary trained on the first DICTIONARY_TRAINING_SAMPLES
+    articles once there are enough of them. Content compressed before then is stored without a dictionary.
+    """
+
+    def __init__(self) -> None:
+        # Typed the way zstandard.train_dictionary wants it, they are all bytes
+        self._samples: list[bytes | bytearray | memoryview] = []
+        # Set on the first compress, so zstandard isn't imported on startup just to create the cache
+        self._compressor: zstandard.ZstdCompressor | None = None
+        self._decompressor: zstandard.ZstdDecompressor | None = None
+        # Set once the dictionary has been trained
+        self._dictionary_compressor: zstandard.ZstdCompressor | None = None
+        self._dictionary_decompressor: zstandard.ZstdDecompressor | None = None
+
+    def compress(self, content: str) -> tuple[bytes, bool]:
+        """
+        Returns the compressed content and whether the dictionary was used.
+        """
+        import zstandard
+
+        data = content.encode()
+        if self._compressor is None:
+            self._compressor = zstandard.ZstdCompressor(level=3)
+            self._decompressor = zstandard.ZstdDecompressor()
+        if self._dictionary_compressor is None:
+            self._samples.append(data)
+            if len(self._samples) >= DICTIONARY_TRAINING_SAMPLES:
+                self._train()
+
+        if self._dictionary_compressor is not None:
+            return self._dictionary_compressor.compress(data), True
+        return self._compressor.compress(data), False
+
+    def decompress(self, compressed: bytes, used_dictionary: bool) -> str:
+        decompressor = self._dictionary_decompressor if used_dictionary else self._decompressor
+        assert decompressor is not None
+        return decompressor.decompress(compressed).decode()
+
+    def _train(self) -> None:
+        import zstandard
+
+        samples, self._samples = self._samples, []
+        try:
+            dictionary = zstandard.train_dictionary(DICTIONARY_SIZE, samples)
+        except zstandard.ZstdError:
+            # The samples were too small or too alike to build a dictionary from, try again with the next ones
+            return
+        self._dictionary_compressor = zstandard.ZstdCompressor(level=3, dict_data=dictionary)
+        self._dictionary_decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+
+
+class CompactEntry(NamedTuple):
+    title: str
+    image_url: str
+    reference_base: str
+    category_ids: array[int]
+    reference_ids: array[int]
+    compressed_content: bytes
+    used_dictionary: bool
+    expires_at: float
+    nbytes: int
+
+
+class ScrapeCache:
+    """
+    LRU cache of scraped articles stored as CompactEntry, limited to SCRAPE_CACHE_MAX_BYTES (entries plus the shared
+    symbol table) and SCRAPE_CACHE_TTL_SECONDS.
+    """
+
+    def __init__(self) -> None:
+        self._entries: OrderedDict[tuple[str, FetchMode], CompactEntry] = OrderedDict()
+        self._symbols = SymbolTable()
+        self._compressor = ContentCompressor()
+        self._entries_nbytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        return self._entries_nbytes + self._symbols.nbytes
+
+    def get(self, url: str, fetch_mode: FetchMode) -> ScrapingResponse | None:
+        key = (url, fetch_mode)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at < time.monotonic():
+            self._remove(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return ScrapingResponse(
+            title=entry.title,
+            content=self._compressor.decompress(entry.compressed_content, entry.used_dictionary),
+            image_url=entry.image_url,
+            categories=[self._symbols.lookup(symbol_id) for symbol_id in entry.category_ids],
+            references=[self._symbols.lookup(symbol_id) for symbol_id in entry.reference_ids],
+            reference_base=entry.reference_base,
+        )
+
+    def put(self, url: str, fetch_mode: FetchMode, response: ScrapingResponse) -> None:
+        if settings.SCRAPE_CACHE_MAX_BYTES <= 0:
+            return
+
+        key = (url, fetch_mode)
+        if key in self._entries:
+            self._remove(key)
+
+        compressed_content, used_dictionary = self._compressor.compress(response.content)
+        category_ids = array("I", [self._symbols.intern(category) for category in response.categories])
+        reference_ids = array("I", [self._symbols.intern(reference) for reference in response.references])
+        nbytes = (
+            ENTRY_OVERHEAD_BYTES
+            + len(url)
+            + len(response.title)
+            + len(response.image_url)
+            + len(compressed_content)
+            + category_ids.itemsize * (len(category_ids) + len(reference_ids))
+        )
+        self._entries[key] = CompactEntry(
+            title=response.title,
+            image_url=response.image_url,
+            reference_base=response.reference_base,
+            category_ids=category_ids,
+            reference_ids=reference_ids,
+            compressed_content=compressed_content,
+            used_dictionary=used_dictionary,
+            expires_at=time.monotonic() + settings.SCRAPE_CACHE_TTL_SECONDS,
+            nbytes=nbytes,
+        )
+        self._entries_nbytes += nbytes
+
+        while self._entries and self.nbytes > settings.SCRAPE_CACHE_MAX_BYTES:
+            self._remove(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        for key in list(self._entries):
+            self._remove(key)
+
+    def _remove(self, key: tuple[str, FetchMode]) -> None:
+        entry = self._entries.pop(key)
+        for symbol_id in entry.category_ids:
+            self._symbols.release(symbol_id)
+        for symbol_id in entry.reference_ids:
+            self._symbols.release(symbol_id)
+        self._entries_nbytes -= entry.nbytes
+
+
+scrape_cache = ScrapeCache()
@@ -0,0 +1,204 @@
+"""
+Answers simple factoid questions ("when was X built", "how long is X") straight from the article content, so they
+don't need an OpenAI completion.
+
+The content is split into sentences and every sentence is scored against the question with BM25. The best sentence
+is only returned if it covers nearly all of the question's (idf weighted) terms, clearly beats the next best sentence,
+and contains the kind of answer the question is asking for (e.g. a year for "when"). Anything else, including every
+"why"/"how" and yes/no question, is left to the LLM.
+
+Decision: a wrong answer from the fast path is worse than a slow answer from the LLM, so the thresholds are tuned for
+precision over hit rate. See scripts/extractive_qa_report.py for both on tests/fixtures/extractive-qa-eval.json.
+"""
+
+import functools
+import logging
+import math
+import re
+from collections import Counter
+from typing import NamedTuple
+
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Questions need at least this many terms (after stop words) to be specific enough to match a single sentence
+MIN_QUESTION_TERMS = 2
+
+_WORD_PATTERN = re.compile(r"\w+")
+_SENTENCE_BOUNDARY_PATTERN = re.compile(r"(?<=[.!?])\s+(?=[\"'(A-Z0-9])")
+# Sentences ending in one of these were split on an abbreviation and are joined back up with the next one
+_ABBREVIATION_PATTERN = re.compile(r"(\b(c|ca|St|Mr|Mrs|Dr|Jr|Sr|vs|etc|e\.g|i\.e|No)|\b[A-Z])\.$")
+_NUMBER_PATTERN = re.compile(
+    r"\d|\b(one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|twenty|hundred|thousand|million)\b",
+    re.IGNORECASE,
+)
+_DATE_PATTERN = re.compile(
+    r"\b\d{3,4}\b|\b\d{1,2}(st|nd|rd|th)[- ]century\b|\b(January|February|March|April|May|June|July|August"
+    r"|September|October|November|December)\b|\b\d+s\b",
+    re.IGNORECASE,
+)
+# A capitalised name after a preposition of place, e.g. "in Greater Manchester" or "between Ashton and Stretford"
+_PLACE_PATTERN = re.compile(
+    r"\b(in|at|near|between|beneath|under|through|along|across|beyond|within|outside|around)\s+(the\s+)?[A-Z]"
+)
+
+STOP_WORDS = frozenset(
+    "a an and are as at be been by did do does for from had has have he her his how in is it its of on or she that the"
+    " their them they this to was were what when where which who whom whose why with".split()
+)
+
+# Questions these start with are about reasons, processes or opinions, or need a yes/no, none of which a single
+# sentence from the article answers well
+_UNSUPPORTED_QUESTION_PATTERN = re.compile(
+    r"^\s*(why|how(?! (many|much|long|wide|deep|tall|high|far|big|old))|explain|describe|compare|summari[sz]e"
+    r"|is|are|was|were|did|does|do|can|could|should|would|will|has|have)\b",
+    re.IGNORECASE,
+)
+
+
+class ExtractiveAnswer(NamedTuple):
+    answer: str
+    confidence: float
+
+
+class _Article(NamedTuple):
+    sentences: list[str]
+    term_frequencies: list[Counter[str]]
+    lengths: list[int]
+    average_length: float
+    # term -> number of sentences containing it
+    sentence_frequencies: Counter[str]
+
+
+def answer_locally(content: str, question: str) -> ExtractiveAnswer | None:
+    """
+    Returns the sentence of the content that answers the question, or None if we aren't confident enough in any of
+    them and the question should go to the LLM.
+    """
+    if not settings.EXTRACTIVE_QA_ENABLED or _UNSUPPORTED_QUESTION_PATTERN.match(question):
+        return None
+
+    question_terms = set(_terms(question))
+    if len(question_terms) < MIN_QUESTION_TERMS:
+        return None
+
+    article = _analyse(content)
+    sentence_count = len(article.sentences)
+    if sentence_count == 0:
+        return None
+    idfs = {
+        term: math.log(
+            1 + (sentence_count - article.sentence_frequencies[term] + 0.5) / (article.sentence_frequencies[term] + 0.5)
+        )
+        for term in question_terms
+    }
+    # Terms that aren't in the article at all still count towards the total, a sentence can't cover them
+    total_weight = sum(
+        idfs[term] if article.sentence_frequencies[term] else math.log(1 + 2 * sentence_count)
+        for term in question_terms
+    )
+
+    scores = []
+    for index, frequencies in enumerate(article.term_frequencies):
+        score = 0.0
+        for term in question_terms & frequencies.keys():
+            frequency = frequencies[term]
+            length_norm = 1 - B + B * article.lengths[index] / article.average_length
+            score += idfs[term] * frequency * (K1 + 1) / (frequency + K1 * length_norm)
+        scores.append(score)
+
+    ranked = sorted(range(sentence_count), key=scores.__getitem__, reverse=True)
+    best = ranked[0]
+    if scores[best] == 0:
+        return None
+    runner_up_score = scores[ranked[1]] if sentence_count > 1 else 0.0
+
+    covered_weight = sum(idfs[term] for term in question_terms if term in article.term_frequencies[best])
+    coverage = covered_weight / total_weight
+    margin = (scores[best] - runner_up_score) / scores[best]
+    confidence = coverage * (0.7 + 0.3 * margin)
+
+    sentence = article.sentences[best]
+    if confidence < settings.EXTRACTIVE_QA_MIN_CONFIDENCE or not _has_expected_answer(question, sentence):
+        return None
+
+    logger.info("Answered question locally", extra={"confidence": confidence})
+    return ExtractiveAnswer(answer=sentence, confidence=confidence)
+
+
+@functools.lru_cache(maxsize=16)
+def _analyse(content: str) -> _Article:
+    # Cached since /ask/batch asks several questions about the same content, the str hash is cached by python too
+    sentences = split_sentences(content)
+    term_frequencies = [Counter(_terms(sentence)) for sentence in sentences]
+    lengths = [sum(frequencies.values()) for frequencies in term_frequencies]
+    sentence_frequencies: Counter[str] = Counter()
+    for frequencies in term_frequencies:
+        sentence_frequencies.update(frequencies.keys())
+    return _Article(
+        sentences=sentences,
+        term_frequencies=term_frequencies,
+        lengths=lengths,
+        average_length=max(1.0, sum(lengths) / len(lengths)) if lengths else 1.0,
+        sentence_frequencies=sentence_frequencies,
+    )
+
+
+def split_sentences(content: str) -> list[str]:
+    sentences: list[str] = []
+    # The content comes from _find_page_content, which puts each paragraph and section heading on its own line
+    for line in content.split("\n"):
+        pending = ""
+        for piece in _SENTENCE_BOUNDARY_PATTERN.split(line.strip()):
+            pending = f"{pending} {piece}" if pending else piece
+            if not _ABBREVIATION_PATTERN.search(pending):
+                sentences.append(pending)
+                pending = ""
+        if pending:
+            sentences.append(pending)
+    # Headings aren't sentences, and can't answer anything on their own
+    return [sentence for sentence in sentences if sentence.endswith((".", "!", "?", '"'))]
+
+
+def _terms(text: str) -> list[str]:
+    return [_stem(word) for word in _WORD_PATTERN.findall(text.lower()) if word not in STOP_WORDS]
+
+
+def _stem(word: str) -> str:
+    # Just enough stemming for "ditches"/"ditch" and "marked"/"marks" style mismatches between question and article
+    for suffix in ("ing", "ed", "es", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[: -len(suffix)]
+    return word
+
+
+def _has_expected_answer(question: str, sentence: str) -> bool:
+    """
+    Checks the sentence has something of the type the question asks for, which isn't already in the question.
+    """
+    lowered = question.lower()
+    # "when was X built in 1066" shouldn't be answered by the 1066, so the question's own words don't count
+    question_words = {word.lower() for word in _WORD_PATTERN.findall(question)}
+    # (position in the sentence, word) pairs
+    remaining = [
+        (position, word)
+        for position, word in enumerate(sentence.split())
+        if word.strip(".,;:()\"'").lower() not in question_words
+    ]
+    remaining_text = " ".join(word for _, word in remaining)
+
+    if lowered.startswith("when") or re.match(r"^(in )?(what|which) (year|century|date|decade)", lowered):
+        return _DATE_PATTERN.search(remaining_text) is not None
+    if re.match(r"^how (many|much|long|wide|deep|tall|high|far|big|old)", lowered):
+        return _NUMBER_PATTERN.search(remaining_text) is not None
+    if lowered.startswith("where"):
+        return _PLACE_PATTERN.search(remaining_text) is not None
+    if lowered.startswith("who"):
+        # The first word is capitalised anyway, so it doesn't tell us anything
+        return any(position > 0 and word[:1].isupper() for position, word in remaining)
+    return True
@@ -1,15 +1,32 @@
+import json
+
 from fastapi import HTTPException
-from openai import OpenAI
 
-from scraping.models import ScrapeAskQuestionResponse
+from scraping.models import QuestionAnswer, ScrapeAskQuestionResponse, ScrapeAskQuestionsResponse
+from scraping.services.extractive_qa_service import answer_locally
+from scraping.services.token_budget_service import fit_content_to_budget
 from settings import settings
 
+SYSTEM_MESSAGE = "You are a helpful assistant that answers questions based on provided Wikipedia content. Only use the provided content to answer questions."
+
+NO_ANSWER = "No answer found in content"
+
 
 def get_ai_response(content: str, question: str) -> ScrapeAskQuestionResponse:
     if content == "" or question == "":
         # Could possibly be a 422, but I think 400 is fine for this
         raise HTTPException(status_code=400, detail="Content and question cannot be empty")
 
+    # Simple factoid questions can often be answered with a sentence from the content, which saves a completion
+    local_answer = answer_locally(content, question)
+    if local_answer is not None:
+        return ScrapeAskQuestionResponse(answer=local_answer.answer)
+
+    content = fit_content_to_budget(content, question)
+
+    # Decision: the openai SDK is the slowest import in the app, so it's only loaded once we actually need a client
+    from openai import BadRequestError, OpenAI
+
     client = OpenAI(api_key=settings.OPENAI_API_KEY)
 
     prompt = f"""Based on the following Wikipedia content, please answer the question.
@@ -22,21 +39,107 @@ def get_ai_response(content: str, question: str) -> ScrapeAskQuestionResponse:
 
     try:
         response = client.chat.completions.create(
-            model="gpt-4o-mini",
+            model=settings.OPENAI_MODEL,
             messages=[
                 {
                     "role": "system",
-                    "content": "You are a helpful assistant that answers questions based on provided Wikipedia content. Only use the provided content to answer questions.",
+                    "content": SYSTEM_MESSAGE,
                 },
                 {"role": "user", "content": prompt},
             ],
         )
+    except BadRequestError as e:
+        # Shouldn't happen with the token budget, but the count can be approximate if tiktoken isn't available
+        if e.code == "context_length_exceeded":
+            raise HTTPException(status_code=413, detail="Content is too long to answer questions about")
+        raise HTTPException(status_code=500, detail="Failed to get response from AI")
     except Exception:
         raise HTTPException(status_code=500, detail="Failed to get response from AI")
 
     response_content = response.choices[0].message.content
     if response_content is None or response_content == "":
-        answer = "No answer found in content"
+        answer = NO_ANSWER
     else:
         answer = response_content
     return ScrapeAskQuestionResponse(answer=answer)
+
+
+def get_ai_responses(content: str, questions: list[str]) -> ScrapeAskQuestionsResponse:
+    """
+    Answers all the questions that can't be answered locally with a single completion, so the article content is only
+    sent (and paid for) once.
+    """
+    if content == "" or not questions or any(question == "" for question in questions):
+        raise HTTPException(status_code=400, detail="Content and questions cannot be empty")
+
+    local_answers: dict[int, str] = {}
+    for index, question in enumerate(questions):
+        local_answer = answer_locally(content, question)
+        if local_answer is not None:
+            local_answers[index] = local_answer.answer
+
+    # Only the questions we couldn't answer locally go to the LLM, and none at all if we answered every one
+    remaining_questions = [question for index, question in enumerate(questions) if index not in local_answers]
+    completion_answers = iter(_get_completion_answers(content, remaining_questions) if remaining_questions else [])
+    return ScrapeAskQuestionsResponse(
+        answers=[
+            QuestionAnswer(
+                question=question,
+                answer=local_answers[index] if index in local_answers else next(completion_answers),
+            )
+            for index, question in enumerate(questions)
+        ]
+    )
+
+
+def _get_completion_answers(content: str, questions: list[str]) -> list[str]:
+    content = fit_content_to_budget(content, "\n".join(questions))
+
+    from openai import BadRequestError, OpenAI
+
+    client = OpenAI(api_key=settings.OPENAI_API_KEY)
+
+    numbered_questions = "\n".join(f"{index}. {question}" for index, question in enumerate(questions, start=1))
+    prompt = f"""Based on the following Wikipedia content, please answer each of the numbered questions.
+        Answer each one directly and concisely. If an answer cannot be found in the content, say so.
+        Respond with a JSON object of the form {{"answers": ["answer to question 1", "answer to question 2", ...]}}
+        containing exactly {len(questions)} answers in the same order as the questions.
+
+        Content:
+        {content}
+
+        Questions:
+        {numbered_questions}"""
+
+    try:
+        response = client.chat.completions.create(
+            model=settings.OPENAI_MODEL,
+            messages=[
+                {"role": "system", "content": SYSTEM_MESSAGE},
+                {"role": "user", "content": prompt},
+            ],
+            response_format={"type": "json_object"},
+        )
+    except BadRequestError as e:
+        # Same as get_ai_response, the token count can be approximate
+        if e.code == "context_length_exceeded":
+            raise HTTPException(status_code=413, detail="Content is too long to answer questions about")
+        raise HTTPException(status_code=500, detail="Failed to get response from AI")
+    except Exception:
+        raise HTTPException(status_code=500, detail="Failed to get response from AI")
+
+    return _parse_answers(response.choices[0].message.content, len(questions))
+
+
+def _parse_answers(response_content: str | None, expected_count: int) -> list[str]:
+    try:
+        answers = json.loads(response_content or "")["answers"]
+    except (json.JSONDecodeError, KeyError, TypeError):
+        raise HTTPException(status_code=500, detail="Failed to get response from AI")
+
+    # Decision: if the model returned the wrong number of answers we can't tell which answer belongs to which
+    # question, so it's safer to fail than to return mismatched answers
+    if not isinstance(answers, list) or len(answers) != expected_count:
+        raise HTTPException(status_code=500, detail="Failed to get response from AI")
+
+    return [answer if isinstance(answer, str) and answer != "" else NO_ANSWER for answer in answers]
@@ -1,33 +1,138 @@
+import json
 import re
+from typing import TYPE_CHECKING, Any
+from urllib.parse import unquote, urlencode, urlsplit
 
-import aiohttp
-from bs4 import BeautifulSoup, Tag
 from fastapi import HTTPException
 
-from scraping.constants import WIKIPEDIA_SUBJECT_NAMESPACES
-from scraping.models import ScrapingResponse
+from scraping.constants import WIKIPEDIA_BASE_URL, WIKIPEDIA_SUBJECT_NAMESPACES
+from scraping.models import FetchMode, ScrapingResponse
+from scraping.services.cache_service import scrape_cache
+from scraping.services.transfer_service import fetch_text
+from search.services.index_service import search_index
+from settings import settings
 
+# Decision: aiohttp and bs4 (which pulls in html5lib) are imported inside the functions that use them, importing them
+# up front adds a couple of hundred milliseconds to every worker start before it can serve anything. After the first
+# call the import is just a lookup in sys.modules. See scraping/warm_up.py for loading them ahead of time.
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup, Tag
 
-async def webscrape_url(url: str) -> ScrapingResponse:
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            if response.status != 200:
-                raise HTTPException(status_code=500, detail="Failed to scrape website")
 
-            text = await response.text()
-            return extract_data_from_html(text)
+async def webscrape_url(url: str, fetch_mode: FetchMode | None = None) -> ScrapingResponse:
+    fetch_mode = fetch_mode or settings.SCRAPE_FETCH_MODE
+    cached_response = scrape_cache.get(url, fetch_mode)
+    if cached_response is not None:
+        return cached_response
+
+    import aiohttp
+
+    parse_api_url = _build_parse_api_url(url) if fetch_mode == "parse_api" else None
+
+    timeout = aiohttp.ClientTimeout(total=settings.SCRAPE_TIMEOUT_SECONDS)
+    async with aiohttp.ClientSession(auto_decompress=False, timeout=timeout) as session:
+        text = await fetch_text(session, parse_api_url or url)
+
+    if parse_api_url is not None:
+        try:
+            payload = json.loads(text)
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=500, detail="Failed to scrape website")
+        response = extract_data_from_parse_api(payload)
+    else:
+        response = extract_data_from_html(text)
+
+    scrape_cache.put(url, fetch_mode, response)
+    search_index.add(url, response)
+    return response
+
+
+def _build_parse_api_url(url: str) -> str | None:
+    """
+    Builds the MediaWiki parse API url for a "/wiki/<title>" page url, or returns None if the url isn't one.
+
+    Decision: the parse API returns just the rendered article body plus the categories, without the navigation,
+    sidebars, scripts and footer of the full page, so there is roughly half as much to download and parse. Any host is
+    allowed since other MediaWiki sites (and our local test server) use the same layout.
+    """
+    parts = urlsplit(url)
+    if not parts.path.startswith("/wiki/"):
+        return None
+
+    title = unquote(parts.path.removeprefix("/wiki/"))
+    if title == "":
+        return None
+
+    query = urlencode(
+        {
+            "action": "parse",
+            "page": title,
+            "prop": "text|categories|displaytitle",
+            "redirects": 1,
+            "format": "json",
+            "formatversion": 2,
+        }
+    )
+    return f"{parts.scheme}://{parts.netloc}/w/api.php?{query}"
 
 
 # Decision: Separate function for extracting the data so I can unit test this easier using pytest later
 def extract_data_from_html(html: str) -> ScrapingResponse:
+    from bs4 import BeautifulSoup
+
     soup = BeautifulSoup(html, "html5lib")
+    parser_output = _find_parser_output(soup)
 
     title = _find_page_title(soup)
-    content = _find_page_content(soup)
+    content = _find_page_content(parser_output)
     image_url = _find_main_image_url(soup)
     categories = _find_categories(soup)
-    references = _find_wiki_references(soup)
+    references = _find_wiki_references(parser_output)
+
+    return _build_scraping_response(title, content, image_url, categories, references)
+
 
+def extract_data_from_parse_api(payload: Any) -> ScrapingResponse:
+    """
+    Same as extract_data_from_html, but for the JSON returned by the MediaWiki parse API (see _build_parse_api_url).
+    """
+    from bs4 import BeautifulSoup
+
+    # The API returns a 200 with an "error" object instead of "parse" for things like missing pages, anything else
+    # missing means it isn't a parse API response at all
+    try:
+        parse = payload["parse"]
+        # Hidden categories are the maintenance ones (e.g. "Articles with short description"), these aren't shown on
+        # the page so they aren't in mw-normal-catlinks either
+        categories = [
+            category["category"].replace("_", " ")
+            for category in parse["categories"]
+            if not category.get("hidden", False)
+        ]
+        text = parse["text"]
+        display_title = parse["displaytitle"]
+    except (KeyError, TypeError, AttributeError):
+        raise HTTPException(status_code=500, detail="Failed to scrape website")
+    if not isinstance(text, str) or not isinstance(display_title, str):
+        raise HTTPException(status_code=500, detail="Failed to scrape website")
+
+    # "text" is the same mw-parser-output div that's inside mw-content-text on the full page
+    soup = BeautifulSoup(text, "html5lib")
+    parser_output = soup.find("div", class_="mw-parser-output")
+
+    # Decision: "displaytitle" is the heading shown on the page (e.g. "iPhone" rather than the "IPhone" in "title"),
+    # so it matches what _find_page_title gets from the full page. It's HTML, usually a span around the title
+    title = BeautifulSoup(display_title, "html5lib").get_text().strip()
+    content = _find_page_content(parser_output)
+    image_url = _find_main_image_url(soup)
+    references = _find_wiki_references(parser_output)
+
+    return _build_scraping_response(title, content, image_url, categories, references)
+
+
+def _build_scraping_response(
+    title: str | None, content: str | None, image_url: str | None, categories: list[str], references: list[str]
+) -> ScrapingResponse:
     # Decision: dealing with errors in this function instead of the lower level functions like _find_page_title, _find_page_content, _find_main_image_url
     # makes it easier to manage the error handling in one place.
     if image_url is None or content is None or title is None:
@@ -37,11 +142,16 @@ def extract_data_from_html(html: str) -> ScrapingResponse:
         raise HTTPException(status_code=500, detail="Failed to scrape website")
 
     return ScrapingResponse(
-        title=title, content=content, image_url=image_url, categories=categories, references=references
+        title=title,
+        content=content,
+        image_url=image_url,
+        categories=categories,
+        references=references,
+        reference_base=WIKIPEDIA_BASE_URL,
     )
 
 
-def _find_page_title(soup: BeautifulSoup) -> str | None:
+def _find_page_title(soup: "BeautifulSoup") -> str | None:
     # Looking at a random wiki page e.g. (https://en.wikipedia.org/wiki/Battle_of_Hastings), they seem to use an id of "firstHeading" as the title
     # Finding by this id is a naive approach, but it should work for most wiki pages. Will have to text a few pages to see if this is consistent.
     title = soup.find(id="firstHeading")
@@ -50,7 +160,7 @@ def _find_page_title(soup: BeautifulSoup) -> str | None:
     return title.get_text().strip()
 
 
-def _find_page_content(soup: BeautifulSoup) -> str | None:
+def _find_parser_output(soup: "BeautifulSoup") -> "Tag | None":
     # Content seems to always be inside the div with id "mw-content-text" so this will be the starting point
     top_level_text_element = soup.find(id="mw-content-text")
     if top_level_text_element is None:
@@ -58,7 +168,10 @@ def _find_page_content(soup: BeautifulSoup) -> str | None:
 
     # Within that there seems to always be a div with class "mw-parser-output" which contains the main content
     # This is a bit more risky as it's a class, but it seems to be consistent across pages
-    div = top_level_text_element.find("div", class_="mw-parser-output")
+    return top_level_text_element.find("div", class_="mw-parser-output")
+
+
+def _find_page_content(div: "Tag | None") -> str | None:
     if div is None:
         return None
 
@@ -70,6 +183,8 @@ def _find_page_content(soup: BeautifulSoup) -> str | None:
     if not last_p:
         return None
 
+    from bs4 import Tag
+
     texts = []
     # Loop through all the immediate children of the div, and add the text of the p tags and mw-heading tags since this
     # is where the main content seems to be
@@ -119,7 +234,7 @@ def _clean_text(text: str) -> str:
     return text
 
 
-def _find_main_image_url(soup: BeautifulSoup) -> str | None:
+def _find_main_image_url(soup: "BeautifulSoup") -> str | None:
     info_box = soup.find("table", class_="infobox")
     if not info_box:
         return None
@@ -133,7 +248,7 @@ def _find_main_image_url(soup: BeautifulSoup) -> str | None:
     return f"https:{src}"
 
 
-def _find_categories(soup: BeautifulSoup) -> list[str]:
+def _find_categories(soup: "BeautifulSoup") -> list[str]:
     # Categories are always in a div with id "mw-normal-catlinks"
     categories_div = soup.find(id="mw-normal-catlinks")
     if not categories_div:
@@ -149,13 +264,12 @@ def _find_categories(soup: BeautifulSoup) -> list[str]:
     return categories
 
 
-def _find_wiki_references(soup: BeautifulSoup) -> list[str]:
+def _find_wiki_references(parser_output: "Tag | None") -> list[str]:
+    """
+    Returns the "/wiki/..." paths of the references, these are joined with WIKIPEDIA_BASE_URL when the response is
+    serialized.
+    """
     # Assumption: I'm assuming that references are always in the main content div
-    content_div = soup.find(id="mw-content-text")
-    if not content_div:
-        return []
-
-    parser_output = content_div.find("div", class_="mw-parser-output")
     if not parser_output:
         return []
 
@@ -171,7 +285,6 @@ def _find_wiki_references(soup: BeautifulSoup) -> list[str]:
         if any(namespace in href for namespace in WIKIPEDIA_SUBJECT_NAMESPACES):
             continue
 
-        full_url = f"https://en.wikipedia.org{href}"
-        references.append(full_url)
+        references.append(href)
 
     return references
@@ -0,0 +1,178 @@
+import functools
+import logging
+import re
+from typing import Any
+
+from fastapi import HTTPException
+
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Decision: tiktoken downloads its encoding files the first time they're used. The Docker image fetches the one for
+# the default OPENAI_MODEL at build time and warm up loads it on startup, so requests don't wait on the download. If
+# it fails anyway (no network) we fall back to a regex that splits words into chunks of up to 4 characters, which
+# lands within ~10-15% of the real BPE count for english text. That is good enough for a budget.
+_APPROXIMATE_TOKEN_PATTERN = re.compile(r"\w{1,4}|[^\w\s]")
+_SENTENCE_BOUNDARY_PATTERN = re.compile(r"(?<=[.!?])\s+")
+_WORD_PATTERN = re.compile(r"\w+")
+
+# Tokens used by the system message and prompt template around the content
+PROMPT_OVERHEAD_TOKENS = 100
+
+
+@functools.cache
+def _get_encoding(model: str) -> Any | None:
+    import tiktoken
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        logger.warning("Failed to load tokenizer for %s, falling back to approximate token counts", model)
+        return None
+
+
+def count_tokens(text: str, model: str | None = None) -> int:
+    encoding = _get_encoding(model or settings.OPENAI_MODEL)
+    if encoding is None:
+        return len(_APPROXIMATE_TOKEN_PATTERN.findall(text))
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def fit_content_to_budget(content: str, question: str, model: str | None = None) -> str:
+    """
+    Shrinks the content with the configured policy so the prompt fits in OPENAI_MAX_INPUT_TOKENS. Content that already
+    fits is returned untouched.
+    """
+    model = model or settings.OPENAI_MODEL
+    budget = settings.OPENAI_MAX_INPUT_TOKENS - PROMPT_OVERHEAD_TOKENS - count_tokens(question, model)
+    if budget <= 0:
+        # There's no room left for any of the content, the completion couldn't answer anything
+        raise HTTPException(status_code=413, detail="Question is too long to answer")
+    original_tokens = count_tokens(content, model)
+    if original_tokens <= budget:
+        return content
+
+    policy = settings.TOKEN_TRUNCATION_POLICY
+    # The content comes from _find_page_content, which puts each paragraph and section heading on its own line
+    lines = [line for line in content.split("\n") if line.strip()]
+    if policy == "sentence_dedup":
+        lines = _deduplicate_sentences(lines)
+        selected = _select_lead_first(lines, budget, model)
+    elif policy == "section_priority":
+        selected = _select_by_section_priority(lines, question, budget, model)
+    else:
+        selected = _select_lead_first(lines, budget, model)
+
+    budgeted_content = "\n".join(selected)
+    budgeted_tokens = count_tokens(budgeted_content, model)
+    logger.info(
+        "Content truncated to fit token budget",
+        extra={
+            "policy": policy,
+            "token_budget": budget,
+            "original_tokens": original_tokens,
+            "budgeted_tokens": budgeted_tokens,
+            "tokens_saved": original_tokens - budgeted_tokens,
+        },
+    )
+    return budgeted_content
+
+
+def _select_lead_first(lines: list[str], budget: int, model: str) -> list[str]:
+    """
+    Keeps lines from the start of the article until the budget runs out, the lead section usually has the summary.
+    """
+    selected: list[str] = []
+    used = 0
+    for line in lines:
+        # +1 for the newline joining the lines
+        tokens = count_tokens(line, model) + 1
+        if used + tokens > budget:
+            if not selected:
+                # Even the first paragraph doesn't fit, so cut it down to the sentences that do
+                selected.append(_truncate_by_sentences(line, budget, model))
+            break
+        selected.append(line)
+        used += tokens
+    return selected
+
+
+def _select_by_section_priority(lines: list[str], question: str, budget: int, model: str) -> list[str]:
+    """
+    Always keeps the lead section, then fills the rest of the budget with the sections sharing the most words with the
+    question. The selected sections are returned in their original order.
+    """
+    sections = _split_into_sections(lines)
+    question_words = _significant_words(question)
+
+    lead, *rest = sections
+    # Stable sort, so sections with the same score keep the order they appear in the article
+    ranked = sorted(
+        range(len(rest)),
+        key=lambda index: len(question_words & _significant_words(" ".join(rest[index]))),
+        reverse=True,
+    )
+
+    selected_lead = _select_lead_first(lead, budget, model)
+    used = count_tokens("\n".join(selected_lead), model)
+    selected_sections: dict[int, list[str]] = {}
+    for index in ranked:
+        section_text = "\n".join(rest[index])
+        tokens = count_tokens(section_text, model) + 1
+        if used + tokens > budget:
+            continue
+        selected_sections[index] = rest[index]
+        used += tokens
+
+    selected = list(selected_lead)
+    for index in sorted(selected_sections):
+        selected.extend(selected_sections[index])
+    return selected
+
+
+def _split_into_sections(lines: list[str]) -> list[list[str]]:
+    sections: list[list[str]] = [[]]
+    for line in lines:
+        if _is_heading(line) and sections[-1]:
+            sections.append([])
+        sections[-1].append(line)
+    return sections
+
+
+def _is_heading(line: str) -> bool:
+    # Headings are short and, unlike paragraphs, don't end with punctuation
+    return len(line) < 80 and not line.rstrip().endswith((".", "!", "?", ":", ";", ",", ")", '"'))
+
+
+def _significant_words(text: str) -> set[str]:
+    # Short words are mostly stop words ("the", "was", "who") which would make every section look relevant
+    return {word for word in _WORD_PATTERN.findall(text.lower()) if len(word) > 3}
+
+
+def _deduplicate_sentences(lines: list[str]) -> list[str]:
+    seen: set[str] = set()
+    deduplicated = []
+    for line in lines:
+        sentences = []
+        for sentence in _SENTENCE_BOUNDARY_PATTERN.split(line):
+            key = " ".join(sentence.lower().split())
+            if key in seen:
+                continue
+            seen.add(key)
+            sentences.append(sentence)
+        if sentences:
+            deduplicated.append(" ".join(sentences))
+    return deduplicated
+
+
+def _truncate_by_sentences(text: str, budget: int, model: str) -> str:
+    sentences = []
+    used = 0
+    for sentence in _SENTENCE_BOUNDARY_PATTERN.split(text):
+        tokens = count_tokens(sentence, model) + 1
+        if used + tokens > budget:
+            break
+        sentences.append(sentence)
+        used += tokens
+    return " ".join(sentences)
@@ -0,0 +1,162 @@
+import codecs
+import io
+import logging
+import time
+import zlib
+from collections.abc import Buffer, Callable
+from typing import TYPE_CHECKING
+
+from fastapi import HTTPException
+
+from settings import settings
+
+if TYPE_CHECKING:
+    import aiohttp
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Takes a compressed chunk and the most bytes it needs to return, getting at least that many back means the limit was
+# hit. max_length is what stops a small chunk that expands massively (a "zip bomb") from being fully inflated in memory
+Decompressor = Callable[[bytes, int], bytes]
+
+
+def _zlib_decompressor(wbits: int) -> Decompressor:
+    decompressor = zlib.decompressobj(wbits)
+    return lambda chunk, max_length: decompressor.decompress(chunk, max_length)
+
+
+# Decision: brotli and zstandard are imported when a response using them comes in rather than at startup, like
+# openai they'd otherwise add to every worker's startup
+def _brotli_decompressor() -> Decompressor:
+    import brotli  # type: ignore[import-untyped]
+
+    decompressor = brotli.Decompressor()
+    # The output stops growing once it reaches the limit, the rest of the input is kept back inside the decompressor
+    return lambda chunk, max_length: decompressor.process(chunk, output_buffer_limit=max_length)
+
+
+class _OutputLimitExceededError(Exception):
+    pass
+
+
+class _BoundedBuffer(io.BytesIO):
+    """
+    Collects what a zstandard stream_writer decompresses, raising as soon as it holds more than max_length bytes.
+    """
+
+    max_length = 0
+
+    def write(self, data: Buffer, /) -> int:
+        written = super().write(data)
+        if self.tell() > self.max_length:
+            raise _OutputLimitExceededError
+        return written
+
+
+def _zstd_decompressor() -> Decompressor:
+    # Decision: zstandard's decompressobj has no output limit, but a stream_writer hands the output to our buffer
+    # write_size bytes at a time, so raising from the buffer stops the decompression at most CHUNK_SIZE past the limit
+    import zstandard
+
+    buffer = _BoundedBuffer()
+    writer = zstandard.ZstdDecompressor().stream_writer(buffer, write_size=CHUNK_SIZE)
+
+    def decompress(chunk: bytes, max_length: int) -> bytes:
+        buffer.max_length = max_length
+        try:
+            writer.write(chunk)
+        except _OutputLimitExceededError:
+            pass
+        output = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return output
+
+    return decompress
+
+
+# Ordered by preference, this is also the order they're advertised in
+DECOMPRESSOR_FACTORIES: dict[str, Callable[[], Decompressor]] = {
+    "zstd": _zstd_decompressor,
+    "br": _brotli_decompressor,
+    # 16 + MAX_WBITS tells zlib to expect the gzip header
+    "gzip": lambda: _zlib_decompressor(16 + zlib.MAX_WBITS),
+    "deflate": lambda: _zlib_decompressor(zlib.MAX_WBITS),
+}
+ACCEPT_ENCODING = ", ".join(DECOMPRESSOR_FACTORIES)
+
+
+async def fetch_text(session: "aiohttp.ClientSession", url: str) -> str:
+    """
+    Downloads the url and returns the decoded body, aborting as soon as either the compressed or the decompressed size
+    goes over the configured limits.
+
+    Decision: the session should be created with auto_decompress=False, so we can decompress the body chunk by chunk
+    as it arrives and stop early, instead of aiohttp inflating the whole thing before we get to check the size.
+    """
+    import aiohttp
+    import brotli
+    import zstandard
+
+    try:
+        async with session.get(url, headers={"Accept-Encoding": ACCEPT_ENCODING}) as response:
+            if response.status != 200:
+                raise HTTPException(status_code=500, detail="Failed to scrape website")
+
+            # Cheap early exit when the server tells us the size up front
+            content_length = response.content_length
+            if content_length is not None and content_length > settings.SCRAPE_MAX_COMPRESSED_BYTES:
+                raise HTTPException(status_code=502, detail="Page is too large to scrape")
+
+            content_encoding = response.headers.get("Content-Encoding", "identity").strip().lower()
+            decompressor_factory = DECOMPRESSOR_FACTORIES.get(content_encoding)
+            if decompressor_factory is None and content_encoding != "identity":
+                raise HTTPException(status_code=500, detail="Failed to scrape website")
+            decompressor = decompressor_factory() if decompressor_factory is not None else None
+
+            compressed_bytes = 0
+            decode_seconds = 0.0
+            chunks = []
+            decompressed_bytes = 0
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                compressed_bytes += len(chunk)
+                if compressed_bytes > settings.SCRAPE_MAX_COMPRESSED_BYTES:
+                    raise HTTPException(status_code=502, detail="Page is too large to scrape")
+
+                if decompressor is not None:
+                    remaining = settings.SCRAPE_MAX_DECOMPRESSED_BYTES - decompressed_bytes
+                    decode_start = time.perf_counter()
+                    chunk = decompressor(chunk, remaining + 1)
+                    decode_seconds += time.perf_counter() - decode_start
+
+                decompressed_bytes += len(chunk)
+                if decompressed_bytes > settings.SCRAPE_MAX_DECOMPRESSED_BYTES:
+                    raise HTTPException(status_code=502, detail="Page is too large to scrape")
+                chunks.append(chunk)
+
+            charset = response.charset or "utf-8"
+    except (aiohttp.ClientError, TimeoutError, zlib.error, brotli.error, zstandard.ZstdError):
+        raise HTTPException(status_code=500, detail="Failed to scrape website")
+
+    try:
+        codecs.lookup(charset)
+    except LookupError:
+        charset = "utf-8"
+
+    decode_start = time.perf_counter()
+    text = b"".join(chunks).decode(charset, errors="replace")
+    decode_seconds += time.perf_counter() - decode_start
+
+    logger.info(
+        "Fetched page",
+        extra={
+            "url": url,
+            "content_encoding": content_encoding,
+            "compressed_bytes": compressed_bytes,
+            "decompressed_bytes": decompressed_bytes,
+            "decode_seconds": decode_seconds,
+        },
+    )
+    return text
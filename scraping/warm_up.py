@@ -0,0 +1,18 @@
+from scraping.services.token_budget_service import count_tokens
+
+
+def warm_up() -> None:
+    """
+    Loads the heavy dependencies that the services import lazily, so the first request doesn't have to pay for them.
+    """
+    import aiohttp  # noqa: F401
+    import brotli  # type: ignore[import-untyped]  # noqa: F401
+    import openai  # noqa: F401
+    import zstandard  # noqa: F401
+    from bs4 import BeautifulSoup
+
+    # html5lib builds some of its lookup tables on first use
+    BeautifulSoup("<p>warm up</p>", "html5lib")
+
+    # Loads (and downloads, if it isn't cached yet) the tokenizer for OPENAI_MODEL
+    count_tokens("warm up")
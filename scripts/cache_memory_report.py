@@ -0,0 +1,129 @@
+"""
+Reports how many scraped articles fit in a GB of memory when cached as plain ScrapingResponse objects, compared to
+the compact entries used by scraping/services/cache_service.py.
+
+Usage: `uv run --env-file .env python scripts/cache_memory_report.py [--entries 500] [--json]`
+
+Without any urls the articles are variations of tests/fixtures/nico-ditch.html (paragraphs shuffled, a random subset
+of the references kept). They share most of their text, which flatters the trained dictionary, so pass `--urls` to
+measure real articles instead.
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import random
+import sys
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from scraping.models import ScrapingResponse  # noqa: E402
+from scraping.services.cache_service import ScrapeCache  # noqa: E402
+from scraping.services.scraping_service import extract_data_from_html, webscrape_url  # noqa: E402
+from settings import settings  # noqa: E402
+
+GIGABYTE = 1024**3
+
+
+def build_fixture_articles(count: int) -> list[tuple[str, ScrapingResponse]]:
+    html = (PROJECT_ROOT / "tests" / "fixtures" / "nico-ditch.html").read_text()
+    article = extract_data_from_html(html)
+    paragraphs = article.content.split("\n")
+
+    rng = random.Random(0)
+    articles = []
+    for number in range(count):
+        rng.shuffle(paragraphs)
+        # Fresh copies of every string, a real cache gets its strings from separate scrapes
+        articles.append(
+            (
+                f"https://en.wikipedia.org/wiki/Article_{number}",
+                ScrapingResponse(
+                    title=f"{article.title} {number}",
+                    content="\n".join(paragraphs).encode().decode(),
+                    image_url=(article.image_url + str(number)),
+                    categories=[category.encode().decode() for category in article.categories],
+                    references=[reference.encode().decode() for reference in article.references if rng.random() < 0.8],
+                    reference_base=article.reference_base,
+                ),
+            )
+        )
+    return articles
+
+
+async def scrape_articles(urls: list[str]) -> list[tuple[str, ScrapingResponse]]:
+    return [(url, await webscrape_url(url)) for url in urls]
+
+
+def measure_bytes(build: Callable[[], Any]) -> tuple[int, Any]:
+    """
+    Returns how much memory the object returned by build is still holding on to once it has been built.
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    built = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, built
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=500, help="Number of fixture based articles to cache")
+    parser.add_argument("--urls", nargs="*", help="Scrape and cache these urls instead of using the fixture")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON so it can be tracked over time")
+    args = parser.parse_args()
+
+    articles = asyncio.run(scrape_articles(args.urls)) if args.urls else build_fixture_articles(args.entries)
+    # Serialise and rebuild each article so both measurements start from objects nobody else holds on to
+    serialized = [(url, article.model_dump_json(), article.reference_base) for url, article in articles]
+    del articles
+
+    def build_plain() -> dict[str, ScrapingResponse]:
+        plain = {}
+        for url, article_json, reference_base in serialized:
+            article = ScrapingResponse.model_validate_json(article_json)
+            article.reference_base = reference_base
+            plain[url] = article
+        return plain
+
+    def build_compact() -> ScrapeCache:
+        settings.SCRAPE_CACHE_MAX_BYTES = sys.maxsize
+        cache = ScrapeCache()
+        for url, article_json, _ in serialized:
+            cache.put(url, "page", ScrapingResponse.model_validate_json(article_json))
+        return cache
+
+    plain_bytes, _ = measure_bytes(build_plain)
+    compact_bytes, cache = measure_bytes(build_compact)
+    entries = len(serialized)
+    report = {
+        "entries": entries,
+        "plain_bytes": plain_bytes,
+        "compact_bytes": compact_bytes,
+        "compact_estimated_bytes": cache.nbytes,
+        "plain_entries_per_gb": round(entries * GIGABYTE / plain_bytes),
+        "compact_entries_per_gb": round(entries * GIGABYTE / compact_bytes),
+        "improvement": round(plain_bytes / compact_bytes, 1),
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"entries:                 {entries}")
+    print(f"plain ScrapingResponse:  {plain_bytes / 1024 / 1024:.1f} MiB, {report['plain_entries_per_gb']} per GB")
+    print(f"compact cache entries:   {compact_bytes / 1024 / 1024:.1f} MiB, {report['compact_entries_per_gb']} per GB")
+    print(f"improvement:             {report['improvement']}x")
+
+
+if __name__ == "__main__":
+    main()
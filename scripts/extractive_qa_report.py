@@ -0,0 +1,80 @@
+"""
+Reports how often the local extractive answer fast path answers a question without the LLM (hit rate), and how often
+those answers are right (accuracy), on a labelled evaluation set.
+
+Usage: `uv run --env-file .env python scripts/extractive_qa_report.py [--eval-set tests/fixtures/extractive-qa-eval.json]
+[--min-confidence 0.8] [--json]`
+
+Each question in the evaluation set lists the phrases a correct answer contains. Questions with no phrases should be
+left to the LLM, so any local answer to them counts as wrong.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from scraping.services.extractive_qa_service import answer_locally  # noqa: E402
+from scraping.services.scraping_service import extract_data_from_html  # noqa: E402
+from settings import settings  # noqa: E402
+
+
+def evaluate(eval_set_path: Path) -> dict[str, Any]:
+    eval_set = json.loads(eval_set_path.read_text())
+    html = (eval_set_path.parent / eval_set["article"]).read_text()
+    content = extract_data_from_html(html).content
+
+    results = []
+    for item in eval_set["questions"]:
+        local_answer = answer_locally(content, item["question"])
+        answer = local_answer.answer if local_answer is not None else None
+        results.append(
+            {
+                "question": item["question"],
+                "answer": answer,
+                "correct": answer is not None and any(phrase in answer for phrase in item["expected"]),
+            }
+        )
+
+    answered = [result for result in results if result["answer"] is not None]
+    return {
+        "questions": len(results),
+        "answered_locally": len(answered),
+        "hit_rate": len(answered) / len(results),
+        "accuracy": sum(result["correct"] for result in answered) / len(answered) if answered else None,
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--eval-set", type=Path, default=PROJECT_ROOT / "tests" / "fixtures" / "extractive-qa-eval.json"
+    )
+    parser.add_argument("--min-confidence", type=float, help="Override EXTRACTIVE_QA_MIN_CONFIDENCE")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON so it can be tracked over time")
+    args = parser.parse_args()
+
+    if args.min_confidence is not None:
+        settings.EXTRACTIVE_QA_MIN_CONFIDENCE = args.min_confidence
+    settings.EXTRACTIVE_QA_ENABLED = True
+    report = evaluate(args.eval_set)
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+
+    for result in report["results"]:
+        outcome = "llm" if result["answer"] is None else ("ok" if result["correct"] else "WRONG")
+        print(f"{outcome:5}  {result['question']}")
+    print(f"hit rate: {report['answered_locally']}/{report['questions']} ({report['hit_rate']:.0%})")
+    if report["accuracy"] is not None:
+        print(f"accuracy: {report['accuracy']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
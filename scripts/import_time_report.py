@@ -0,0 +1,125 @@
+"""
+Reports how long a fresh worker takes to import the app and to answer its first request.
+
+Usage: `uv run --env-file .env python scripts/import_time_report.py [--top 15] [--json]`
+
+The import breakdown comes from `python -X importtime`, the numbers are cumulative microseconds per top level module.
+The first request is a /scrape of tests/fixtures/nico-ditch.html served from a local http server, so it goes through
+the whole fetch, parse and serialise path (and the app's lifespan startup) without depending on the network.
+"""
+
+import argparse
+import functools
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, TypedDict
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Prints the time.time() at which the first response came back, so the lifespan shutdown isn't counted
+FIRST_REQUEST_SCRIPT = """
+import base64
+import sys
+import time
+from fastapi.testclient import TestClient
+import main
+from settings import settings
+
+credentials = base64.b64encode(f"{settings.ADMIN_USERNAME}:{settings.ADMIN_PASSWORD}".encode()).decode()
+with TestClient(main.app) as client:
+    response = client.post("/scrape", json={"url": sys.argv[1]}, headers={"Authorization": f"Basic {credentials}"})
+    print(time.time())
+    response.raise_for_status()
+"""
+
+
+class ImportTimeReport(TypedDict):
+    import_main_ms: float
+    first_response_ms: float
+    slowest_imports_ms: dict[str, float]
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+@contextmanager
+def serve_fixtures() -> Iterator[str]:
+    """
+    Serves tests/fixtures over http for the duration of the context, yields the base url.
+    """
+    handler = functools.partial(_QuietHandler, directory=str(PROJECT_ROOT / "tests" / "fixtures"))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _run_python(args: list[str]) -> subprocess.CompletedProcess[str]:
+    return subprocess.run(
+        [sys.executable, *args], cwd=PROJECT_ROOT, env=os.environ.copy(), capture_output=True, text=True, check=True
+    )
+
+
+def measure_import_times() -> dict[str, int]:
+    """
+    Returns the cumulative import time in microseconds of every module imported by `import main`.
+    """
+    result = _run_python(["-X", "importtime", "-c", "import main"])
+    import_times = {}
+    for line in result.stderr.splitlines():
+        # Lines look like "import time:       462 |     124569 |       aiohttp"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.removeprefix("import time:").split("|")
+        import_times[module.strip()] = int(cumulative)
+    return import_times
+
+
+def measure_first_response_seconds() -> float:
+    with serve_fixtures() as base_url:
+        start = time.time()
+        result = _run_python(["-c", FIRST_REQUEST_SCRIPT, f"{base_url}/nico-ditch.html"])
+    return float(result.stdout.split()[-1]) - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest modules to show")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON so it can be tracked over time")
+    args = parser.parse_args()
+
+    import_times = measure_import_times()
+    slowest = sorted(import_times.items(), key=lambda item: item[1], reverse=True)[: args.top]
+    report: ImportTimeReport = {
+        "import_main_ms": import_times["main"] / 1000,
+        "first_response_ms": measure_first_response_seconds() * 1000,
+        "slowest_imports_ms": {module: cumulative / 1000 for module, cumulative in slowest},
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"import main:          {report['import_main_ms']:.1f} ms")
+    print(f"cold start -> response: {report['first_response_ms']:.1f} ms")
+    print("slowest imports (cumulative):")
+    for module, milliseconds in report["slowest_imports_ms"].items():
+        print(f"  {milliseconds:8.1f} ms  {module}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Reports how long SearchIndex.search takes on a large synthetic index, for queries made of common terms (long posting
+lists), rare terms and a mix of both.
+
+Usage: `uv run --env-file .env python scripts/search_latency_report.py [--documents 200000] [--segment-size 20000]
+[--repeat 5] [--json]`
+
+The articles are random words with a Zipf-like frequency, so a handful of words appear in most articles like they do
+in real ones. Building the index takes a while, the report only times the searches.
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from scraping.models import ScrapingResponse  # noqa: E402
+from search.services.index_service import SearchIndex  # noqa: E402
+from settings import settings  # noqa: E402
+
+VOCABULARY_SIZE = 20_000
+WORDS_PER_ARTICLE = 40
+
+QUERIES = {
+    # The most frequent words, in nearly every article
+    "common": "w0 w1",
+    "rare": "w15000 w18000",
+    "mixed": "w0 w2 w12000",
+}
+
+
+def build_index(directory: Path, documents: int, segment_size: int) -> SearchIndex:
+    settings.SEARCH_INDEX_DIR = str(directory)
+    settings.SEARCH_MAX_SEGMENTS = sys.maxsize
+    index = SearchIndex()
+
+    rng = random.Random(0)
+    words = [f"w{number}" for number in range(VOCABULARY_SIZE)]
+    weights = [1 / (rank + 1) for rank in range(VOCABULARY_SIZE)]
+    for number in range(documents):
+        index.add(
+            f"https://en.wikipedia.org/wiki/Article_{number}",
+            ScrapingResponse(
+                title=f"Article {number}",
+                content=" ".join(rng.choices(words, weights, k=WORDS_PER_ARTICLE)),
+                image_url="",
+                categories=[],
+                references=[],
+            ),
+        )
+        if (number + 1) % segment_size == 0:
+            index.flush()
+    index.flush()
+    return index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=200_000, help="Number of articles to index")
+    parser.add_argument("--segment-size", type=int, default=20_000, help="Number of articles per segment")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of times each query is timed")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON so it can be tracked over time")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = build_index(Path(directory), args.documents, args.segment_size)
+        # The first search opens the segments
+        index.search("w0", limit=10)
+
+        report: dict[str, dict[str, float]] = {}
+        for name, query in QUERIES.items():
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                index.search(query, limit=10)
+                timings.append((time.perf_counter() - start) * 1000)
+            report[name] = {"median_ms": round(statistics.median(timings), 1), "max_ms": round(max(timings), 1)}
+
+    if args.json:
+        print(json.dumps({"documents": args.documents, "queries": report}, indent=2))
+        return
+
+    print(f"documents: {args.documents}")
+    for name, query_report in report.items():
+        print(f"{name:<8} {QUERIES[name]!r:<20} median {query_report['median_ms']} ms, max {query_report['max_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
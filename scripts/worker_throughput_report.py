@@ -0,0 +1,201 @@
+"""
+Reports how many /scrape requests per second server.py handles with different numbers of workers.
+
+Usage: `uv run --env-file .env python scripts/worker_throughput_report.py [--workers 1,4] [--concurrency 32]
+[--seconds 10] [--json]`
+
+Each worker count gets a fresh `python server.py` on a free local port. The requests scrape
+tests/fixtures/nico-ditch.html from a local http server, so they go through the whole fetch, parse and serialise path
+without depending on the network. The load is generated from this process, which takes some of the CPU away from
+the server, so compare the numbers with each other rather than reading them as absolute capacity.
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import TypedDict
+
+import aiohttp
+from import_time_report import serve_fixtures
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from settings import settings  # noqa: E402
+
+# Longest to wait for the server to start answering requests
+STARTUP_TIMEOUT_SECONDS = 60
+
+
+def _cpu_count() -> int:
+    # Same as server.py's default number of workers
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class WorkerThroughput(TypedDict):
+    workers: int
+    requests_per_second: float
+    median_latency_ms: float
+    p99_latency_ms: float
+    errors: int
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port: int = sock.getsockname()[1]
+        return port
+
+
+def start_server(workers: int, port: int, jobs_dir: str) -> subprocess.Popen[bytes]:
+    env = {
+        **os.environ,
+        "SERVER_HOST": "127.0.0.1",
+        "SERVER_PORT": str(port),
+        "SERVER_WORKERS": str(workers),
+        # Every request should do the full scrape rather than be answered from the cache
+        "SCRAPE_CACHE_MAX_BYTES": "0",
+        "JOBS_STORAGE_DIR": jobs_dir,
+        "LOG_LEVEL": "WARNING",
+    }
+    return subprocess.Popen(
+        [sys.executable, "server.py"], cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def stop_server(process: subprocess.Popen[bytes]) -> None:
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=settings.SERVER_GRACEFUL_SHUTDOWN_TIMEOUT + 5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+async def _wait_until_ready(session: aiohttp.ClientSession, base_url: str, process: subprocess.Popen[bytes]) -> None:
+    end = time.monotonic() + STARTUP_TIMEOUT_SECONDS
+    while time.monotonic() < end:
+        if process.poll() is not None:
+            raise RuntimeError(f"server.py exited with code {process.returncode}")
+        try:
+            async with session.get(f"{base_url}/openapi.json"):
+                return
+        except aiohttp.ClientError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("server.py didn't start in time")
+
+
+async def _run_load(
+    session: aiohttp.ClientSession, base_url: str, page_url: str, concurrency: int, seconds: float
+) -> tuple[list[float], int]:
+    """
+    Keeps `concurrency` requests in flight for `seconds`, returns the latency of every successful request and the
+    number of failed ones.
+    """
+    credentials = base64.b64encode(f"{settings.ADMIN_USERNAME}:{settings.ADMIN_PASSWORD}".encode()).decode()
+    headers = {"Authorization": f"Basic {credentials}"}
+    latencies: list[float] = []
+    errors = 0
+    end = time.monotonic() + seconds
+
+    async def client() -> None:
+        nonlocal errors
+        while time.monotonic() < end:
+            start = time.perf_counter()
+            try:
+                async with session.post(f"{base_url}/scrape", json={"url": page_url}, headers=headers) as response:
+                    await response.read()
+                    ok = response.status == 200
+            except aiohttp.ClientError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies, errors
+
+
+async def measure_throughput(
+    workers: int, page_url: str, concurrency: int, seconds: float, warm_up_seconds: float
+) -> WorkerThroughput:
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as jobs_dir:
+        process = start_server(workers, port, jobs_dir)
+        try:
+            connector = aiohttp.TCPConnector(limit=concurrency)
+            async with aiohttp.ClientSession(connector=connector) as session:
+                await _wait_until_ready(session, base_url, process)
+                # Gives every worker the chance to finish starting up and answer its first (slower) requests
+                await _run_load(session, base_url, page_url, concurrency, warm_up_seconds)
+                start = time.perf_counter()
+                latencies, errors = await _run_load(session, base_url, page_url, concurrency, seconds)
+                elapsed = time.perf_counter() - start
+        finally:
+            stop_server(process)
+
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    return {
+        "workers": workers,
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "median_latency_ms": round(statistics.median(latencies_ms), 1) if latencies_ms else 0.0,
+        "p99_latency_ms": round(latencies_ms[int(len(latencies_ms) * 0.99)], 1) if latencies_ms else 0.0,
+        "errors": errors,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--workers",
+        default=f"1,{_cpu_count()}",
+        help="Comma separated worker counts to compare, defaults to 1 and the number of CPUs",
+    )
+    parser.add_argument("--concurrency", type=int, default=32, help="Number of requests kept in flight")
+    parser.add_argument("--seconds", type=float, default=10, help="How long to measure each worker count for")
+    parser.add_argument("--warm-up-seconds", type=float, default=3, help="Load sent before measuring")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON so it can be tracked over time")
+    args = parser.parse_args()
+
+    worker_counts = sorted({int(workers) for workers in args.workers.split(",")})
+    report: list[WorkerThroughput] = []
+    with serve_fixtures() as fixtures_url:
+        for workers in worker_counts:
+            report.append(
+                asyncio.run(
+                    measure_throughput(
+                        workers, f"{fixtures_url}/nico-ditch.html", args.concurrency, args.seconds, args.warm_up_seconds
+                    )
+                )
+            )
+
+    if args.json:
+        print(json.dumps({"cpus": _cpu_count(), "concurrency": args.concurrency, "runs": report}, indent=2))
+        return
+
+    print(f"cpus: {_cpu_count()}, concurrency: {args.concurrency}")
+    baseline = report[0]["requests_per_second"]
+    for run in report:
+        speedup = run["requests_per_second"] / baseline if baseline else 0.0
+        print(
+            f"{run['workers']:>3} workers  {run['requests_per_second']:8.1f} req/s ({speedup:.2f}x)  "
+            f"median {run['median_latency_ms']} ms, p99 {run['p99_latency_ms']} ms, errors {run['errors']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
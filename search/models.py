@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+
+
+class SearchHit(BaseModel):
+    url: str
+    title: str
+    categories: list[str]
+    snippet: str
+    score: float
+
+
+class SearchResponse(BaseModel):
+    hits: list[SearchHit]
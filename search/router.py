@@ -0,0 +1,26 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from auth.dependencies import verify_credentials
+from profiling.services.profiling_service import run_in_thread
+from search.models import SearchResponse
+from search.services.index_service import search_index
+from settings import settings
+
+router = APIRouter(dependencies=[Depends(verify_credentials)])
+
+
+@router.get("/search")
+async def search(
+    q: Annotated[str, Query(min_length=1, max_length=500)],
+    limit: Annotated[int, Query(ge=1, le=50)] = 10,
+) -> SearchResponse:
+    """
+    Searches the title, categories and content of every article scraped so far.
+    """
+    if settings.SEARCH_INDEX_DIR is None:
+        raise HTTPException(status_code=404, detail="Search is not enabled")
+    # Scoring and reading the segments is blocking work, so it's kept off the event loop
+    hits = await run_in_thread(search_index.search, q, limit)
+    return SearchResponse(hits=hits)
@@ -0,0 +1,281 @@
+import asyncio
+import fcntl
+import heapq
+import logging
+import math
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+from scraping.models import ScrapingResponse
+from search.models import SearchHit
+from search.services.segment_service import Document, SegmentReader, tokenize, write_segment
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+# BM25 parameters, these are the usual defaults
+K1 = 1.2
+B = 0.75
+
+SNIPPET_LENGTH = 200
+
+
+class SearchIndex:
+    """
+    Incremental full text index over every article we scrape, stored as immutable segment files in SEARCH_INDEX_DIR.
+
+    Scraped articles are buffered in memory and written out as a new small segment every SEARCH_FLUSH_INTERVAL_SECONDS
+    by a background task, which also merges the smallest segments together once there are more than
+    SEARCH_MAX_SEGMENTS. Every worker process writes its own segments and searches all of them, so the index is shared
+    between the workers started by server.py.
+
+    Decision: if an article is scraped again, the new version is added without removing the old one. Search skips
+    every version but the most recently indexed one of each url (tracked as segments are opened), and merges drop the
+    older versions they come across.
+    """
+
+    def __init__(self) -> None:
+        self._pending: list[Document] = []
+        self._pending_lock = threading.Lock()
+        self._segments: dict[str, SegmentReader] = {}
+        # url -> (indexed at, segment name, doc id) of the latest version of each url in self._segments
+        self._latest_versions: dict[str, tuple[float, str, int]] = {}
+        # segment name -> doc ids of the documents with a newer version of their url in another segment
+        self._superseded: dict[str, set[int]] = {}
+        # Guards the three above, searches and segment refreshes run in worker threads
+        self._segments_lock = threading.Lock()
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def _directory(self) -> Path | None:
+        if settings.SEARCH_INDEX_DIR is None:
+            return None
+        return Path(settings.SEARCH_INDEX_DIR)
+
+    def start(self) -> None:
+        if self._directory is None or self._task is not None:
+            return
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._task = asyncio.create_task(self._run_background())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        # Write out whatever hasn't been flushed yet so it isn't lost
+        await asyncio.to_thread(self.flush)
+
+    def add(self, url: str, article: ScrapingResponse) -> None:
+        """
+        Queues the article to be indexed, this is cheap so it's fine to call on the request path.
+        """
+        if self._directory is None:
+            return
+        # model_dump gives the full reference urls, but we only need the fields we search and show
+        document = Document(
+            url=url,
+            title=article.title,
+            categories=article.categories,
+            content=article.content,
+            indexed_at=time.time(),
+        )
+        with self._pending_lock:
+            self._pending.append(document)
+
+    def flush(self) -> None:
+        directory = self._directory
+        with self._pending_lock:
+            pending, self._pending = self._pending, []
+        if directory is None or not pending:
+            return
+        try:
+            write_segment(directory / _new_segment_name(), pending)
+        except BaseException:
+            # Put them back in front of anything added since, so they go out with the next flush
+            with self._pending_lock:
+                self._pending[:0] = pending
+            raise
+
+    def merge(self) -> None:
+        """
+        Merges the smallest segments into one when there are more than SEARCH_MAX_SEGMENTS.
+        """
+        directory = self._directory
+        if directory is None:
+            return
+
+        # Only one process should merge at a time, otherwise two of them could merge the same segments. If someone
+        # else is already merging we just try again next time.
+        with open(directory / "merge.lock", "w") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return
+
+            paths = sorted(directory.glob("*.seg"), key=lambda path: path.stat().st_size)
+            if len(paths) <= settings.SEARCH_MAX_SEGMENTS:
+                return
+
+            to_merge = paths[: settings.SEARCH_MERGE_FACTOR]
+            # Keep only the latest version of each url
+            latest: dict[str, Document] = {}
+            for path in to_merge:
+                reader = SegmentReader(path)
+                try:
+                    for document in reader.documents():
+                        current = latest.get(document.url)
+                        if current is None or current.indexed_at < document.indexed_at:
+                            latest[document.url] = document
+                finally:
+                    reader.close()
+
+            write_segment(directory / _new_segment_name(), latest.values())
+            # Processes that have these open can keep reading them until they refresh, unlinking doesn't affect
+            # existing memory maps
+            for path in to_merge:
+                path.unlink(missing_ok=True)
+            logger.info("Merged %s search index segments (%s articles)", len(to_merge), len(latest))
+
+    def search(self, query: str, limit: int) -> list[SearchHit]:
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        # Decision: only the refresh happens under the lock, the scoring works on a snapshot of the segments so
+        # searches don't queue up behind each other. Readers dropped by a later refresh stay usable until we're done
+        # with them, see _refresh_segments.
+        with self._segments_lock:
+            self._refresh_segments()
+            segments = list(self._segments.values())
+            # Later refreshes only ever add to these sets, which is safe to do while we check them for doc ids
+            superseded_by_segment = [self._superseded[name] for name in self._segments]
+
+        document_count = sum(segment.document_count for segment in segments)
+        if document_count == 0:
+            return []
+        average_length = sum(segment.total_document_length for segment in segments) / document_count
+
+        document_frequencies = {term: sum(segment.document_frequency(term) for segment in segments) for term in terms}
+
+        # (score, segment index, doc id), the best few of each segment
+        candidates: list[tuple[float, int, int]] = []
+        for segment_index, segment in enumerate(segments):
+            superseded = superseded_by_segment[segment_index]
+            # doc id -> score
+            scores: dict[int, float] = {}
+            for term in terms:
+                segment_frequency = segment.document_frequency(term)
+                if segment_frequency == 0:
+                    continue
+                document_frequency = document_frequencies[term]
+                idf = math.log(1 + (document_count - document_frequency + 0.5) / (document_frequency + 0.5))
+
+                # Decision: a term that's in most articles has an idf close to zero, so scoring every one of its
+                # postings takes most of the search time and barely changes the ranking. Only its
+                # SEARCH_MAX_POSTINGS_PER_TERM highest impact postings are scored, shared out between the segments,
+                # so articles that only mention it in passing miss out on its (small) contribution.
+                postings_limit = math.ceil(
+                    settings.SEARCH_MAX_POSTINGS_PER_TERM * segment_frequency / document_frequency
+                )
+                term_postings = segment.postings(term, postings_limit)
+                assert term_postings is not None
+                lengths = segment.document_lengths
+                for doc_id, frequency in zip(*term_postings, strict=True):
+                    if doc_id in superseded:
+                        continue
+                    normalised = (
+                        frequency * (K1 + 1) / (frequency + K1 * (1 - B + B * lengths[doc_id] / average_length))
+                    )
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * normalised
+            candidates.extend(
+                (score, segment_index, doc_id)
+                for doc_id, score in heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            )
+
+        hits = []
+        for score, segment_index, doc_id in heapq.nlargest(limit, candidates):
+            fields = segments[segment_index].stored_fields(doc_id)
+            hits.append(
+                SearchHit(
+                    url=fields["url"],
+                    title=fields["title"],
+                    categories=fields["categories"],
+                    snippet=_build_snippet(fields["content"], terms),
+                    score=round(score, 4),
+                )
+            )
+        return hits
+
+    def _refresh_segments(self) -> None:
+        directory = self._directory
+        names = {path.name for path in directory.glob("*.seg")} if directory is not None else set()
+        for name in list(self._segments):
+            if name not in names:
+                # Not closed, a search running in another thread may still be reading it. The memory map is closed
+                # once the last search holding on to the reader is done with it
+                segment = self._segments.pop(name)
+                del self._superseded[name]
+                # Segments are only removed by merges, which write the latest version of these urls to the merged
+                # segment, so it takes their place when it's added below
+                for url, _ in segment.urls_and_indexed_ats():
+                    latest = self._latest_versions.get(url)
+                    if latest is not None and latest[1] == name:
+                        del self._latest_versions[url]
+        for name in names - self._segments.keys():
+            assert directory is not None
+            try:
+                segment = SegmentReader(directory / name)
+            except FileNotFoundError:
+                # Merged away by another process since we listed the directory
+                continue
+            superseded = set()
+            for doc_id, (url, indexed_at) in enumerate(segment.urls_and_indexed_ats()):
+                latest = self._latest_versions.get(url)
+                if latest is not None and latest[0] >= indexed_at:
+                    superseded.add(doc_id)
+                    continue
+                if latest is not None:
+                    self._superseded[latest[1]].add(latest[2])
+                self._latest_versions[url] = (indexed_at, name, doc_id)
+            self._superseded[name] = superseded
+            self._segments[name] = segment
+
+    async def _run_background(self) -> None:
+        while True:
+            await asyncio.sleep(settings.SEARCH_FLUSH_INTERVAL_SECONDS)
+            try:
+                await asyncio.to_thread(self.flush)
+                await asyncio.to_thread(self.merge)
+            except Exception:
+                logger.exception("Failed to update the search index")
+
+
+def _new_segment_name() -> str:
+    # Unique across the worker processes sharing the directory
+    return f"{time.time_ns()}-{os.getpid()}.seg"
+
+
+def _build_snippet(content: str, terms: list[str]) -> str:
+    """
+    Returns the part of the content around the first match of any of the terms, or the start of the content if the
+    article only matched on its title or categories.
+    """
+    pattern = re.compile(r"\b(" + "|".join(re.escape(term) for term in terms) + r")\b", re.IGNORECASE)
+    match = pattern.search(content)
+    start = 0 if match is None else max(0, match.start() - SNIPPET_LENGTH // 4)
+    end = start + SNIPPET_LENGTH
+
+    snippet = content[start:end].replace("\n", " ")
+    # Don't cut words in half
+    if start > 0:
+        snippet = "…" + snippet.split(" ", 1)[-1]
+    if end < len(content):
+        snippet = snippet.rsplit(" ", 1)[0] + "…"
+    return snippet
+
+
+search_index = SearchIndex()
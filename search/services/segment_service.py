@@ -0,0 +1,295 @@
+"""
+On-disk format for a search index segment. A segment is written once and never changed, new articles go into new
+segments and small segments are merged into bigger ones in the background (see index_service.py).
+
+Layout of a segment file, all integers little endian:
+
+    header        see HEADER
+    stored fields zlib compressed JSON of each article (url, title, categories, content), used for results/snippets
+    documents     DOCUMENT_ENTRY per document, doc ids are the position in this table
+    urls          utf-8 urls, referenced from the document entries
+    terms         TERM_ENTRY per term, sorted by the term's utf-8 bytes so they can be binary searched in place
+    term text     utf-8 terms, referenced from the term entries
+    postings      per term: zlib compressed (uint32 doc id, uint32 term frequency) pairs, in impact order
+
+Decision: the file is memory mapped and the term table is binary searched in place, so opening a segment doesn't
+read the whole thing into memory and the OS page cache decides what stays resident.
+
+Decision: postings are stored in impact order (highest weighted term frequency first, then shortest document first),
+which is roughly the order BM25 ranks the documents in for that term. Searches can then score just the start of a
+very common term's postings (see SEARCH_MAX_POSTINGS_PER_TERM) and only decompress that much of it. This costs some
+compression, doc ids in doc id order could be stored as small deltas.
+"""
+
+import json
+import mmap
+import re
+import struct
+import zlib
+from array import array
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any, NamedTuple
+
+MAGIC = b"WIKISEG2"
+# magic, document count, term count, total document length, then the offsets of the documents, urls, terms, term
+# text and postings sections
+HEADER = struct.Struct("<8sIIQQQQQQ")
+# stored fields offset, stored fields length, url offset, url length, document length (in tokens), indexed at
+DOCUMENT_ENTRY = struct.Struct("<QIIHId")
+# term text offset, term text length, postings offset, postings length, document frequency
+TERM_ENTRY = struct.Struct("<IHQII")
+
+# Title and category matches count for more than matches in the body
+FIELD_WEIGHTS = {"title": 3, "categories": 2, "content": 1}
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+# Longer "words" are things like base64 data or long numbers run together, nobody searches for them and the term table
+# only has 16 bits for a term's length (up to 4 bytes per character in utf-8)
+MAX_TOKEN_LENGTH = 64
+# Decision: dropping the most common words keeps the biggest posting lists (which are the slowest to score and
+# barely change the ranking) out of the index
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from has he his in is it its of on or that the this to was were which with".split()
+)
+
+
+class Document(NamedTuple):
+    url: str
+    title: str
+    categories: list[str]
+    content: str
+    indexed_at: float
+
+
+def tokenize(text: str) -> list[str]:
+    return [
+        token
+        for token in _TOKEN_PATTERN.findall(text.lower())
+        if token not in STOP_WORDS and len(token) <= MAX_TOKEN_LENGTH
+    ]
+
+
+def write_segment(path: Path, documents: Iterable[Document]) -> None:
+    stored_blobs = []
+    url_blobs = []
+    document_lengths = []
+    indexed_ats = []
+    # term -> (doc ids, weighted term frequencies)
+    postings: dict[str, tuple[array[int], array[int]]] = {}
+
+    for doc_id, document in enumerate(documents):
+        stored_blobs.append(
+            zlib.compress(
+                json.dumps(
+                    {
+                        "url": document.url,
+                        "title": document.title,
+                        "categories": document.categories,
+                        "content": document.content,
+                    }
+                ).encode()
+            )
+        )
+        url_blobs.append(document.url.encode())
+        indexed_ats.append(document.indexed_at)
+
+        frequencies: dict[str, int] = {}
+        document_length = 0
+        for field, text in (
+            ("title", document.title),
+            ("categories", " ".join(document.categories)),
+            ("content", document.content),
+        ):
+            weight = FIELD_WEIGHTS[field]
+            for token in tokenize(text):
+                frequencies[token] = frequencies.get(token, 0) + weight
+                document_length += weight
+        document_lengths.append(document_length)
+
+        for term, frequency in frequencies.items():
+            if term not in postings:
+                postings[term] = (array("I"), array("I"))
+            doc_ids, term_frequencies = postings[term]
+            doc_ids.append(doc_id)
+            term_frequencies.append(frequency)
+
+    sections = bytearray(HEADER.size)
+
+    stored_offsets = []
+    for blob in stored_blobs:
+        stored_offsets.append(len(sections))
+        sections += blob
+
+    documents_offset = len(sections)
+    url_offset = 0
+    url_offsets = []
+    for url_blob in url_blobs:
+        url_offsets.append(url_offset)
+        url_offset += len(url_blob)
+    for doc_id, blob in enumerate(stored_blobs):
+        sections += DOCUMENT_ENTRY.pack(
+            stored_offsets[doc_id],
+            len(blob),
+            url_offsets[doc_id],
+            len(url_blobs[doc_id]),
+            document_lengths[doc_id],
+            indexed_ats[doc_id],
+        )
+
+    urls_offset = len(sections)
+    for url_blob in url_blobs:
+        sections += url_blob
+
+    encoded_terms = sorted((term.encode(), term) for term in postings)
+    term_text = bytearray()
+    postings_section = bytearray()
+    term_entries = bytearray()
+    for encoded_term, term in encoded_terms:
+        doc_ids, term_frequencies = postings[term]
+        pairs = array("I")
+        for position in sorted(
+            range(len(doc_ids)),
+            key=lambda position: (-term_frequencies[position], document_lengths[doc_ids[position]]),
+        ):
+            pairs.append(doc_ids[position])
+            pairs.append(term_frequencies[position])
+        compressed = zlib.compress(pairs.tobytes())
+        term_entries += TERM_ENTRY.pack(
+            len(term_text), len(encoded_term), len(postings_section), len(compressed), len(doc_ids)
+        )
+        term_text += encoded_term
+        postings_section += compressed
+
+    terms_offset = len(sections)
+    sections += term_entries
+    term_text_offset = len(sections)
+    sections += term_text
+    postings_offset = len(sections)
+    sections += postings_section
+
+    HEADER.pack_into(
+        sections,
+        0,
+        MAGIC,
+        len(stored_blobs),
+        len(encoded_terms),
+        sum(document_lengths),
+        documents_offset,
+        urls_offset,
+        terms_offset,
+        term_text_offset,
+        postings_offset,
+    )
+
+    # Written under a temporary name and renamed, so readers never see a half written segment
+    temp_path = path.with_suffix(".tmp")
+    temp_path.write_bytes(sections)
+    temp_path.replace(path)
+
+
+class SegmentReader:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (
+            magic,
+            self.document_count,
+            self.term_count,
+            self.total_document_length,
+            self._documents_offset,
+            self._urls_offset,
+            self._terms_offset,
+            self._term_text_offset,
+            self._postings_offset,
+        ) = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a search index segment")
+
+        # Needed for every scored document, so these are read once up front (4 bytes per document)
+        documents_end = self._documents_offset + self.document_count * DOCUMENT_ENTRY.size
+        self.document_lengths = array(
+            "I", (entry[4] for entry in DOCUMENT_ENTRY.iter_unpack(self._mmap[self._documents_offset : documents_end]))
+        )
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def _term_entry(self, index: int) -> tuple[int, int, int, int, int]:
+        return TERM_ENTRY.unpack_from(self._mmap, self._terms_offset + index * TERM_ENTRY.size)
+
+    def _term_at(self, index: int) -> tuple[bytes, tuple[int, int, int, int, int]]:
+        entry = self._term_entry(index)
+        start = self._term_text_offset + entry[0]
+        return self._mmap[start : start + entry[1]], entry
+
+    def _find_term(self, term: str) -> tuple[int, int, int, int, int] | None:
+        target = term.encode()
+        low, high = 0, self.term_count
+        while low < high:
+            middle = (low + high) // 2
+            candidate, entry = self._term_at(middle)
+            if candidate < target:
+                low = middle + 1
+            elif candidate > target:
+                high = middle
+            else:
+                return entry
+        return None
+
+    def document_frequency(self, term: str) -> int:
+        entry = self._find_term(term)
+        return entry[4] if entry is not None else 0
+
+    def postings(self, term: str, limit: int | None = None) -> tuple[array[int], array[int]] | None:
+        """
+        Returns the doc ids containing the term and the (weighted) number of times it appears in each, in impact order.
+        With a limit only that many of the highest impact postings are decompressed and returned.
+        """
+        entry = self._find_term(term)
+        if entry is None:
+            return None
+        _, _, postings_offset, postings_length, _ = entry
+        start = self._postings_offset + postings_offset
+        decompressor = zlib.decompressobj()
+        # 0 means no limit to zlib
+        max_length = 2 * limit * array("I").itemsize if limit is not None else 0
+        values = array("I")
+        values.frombytes(decompressor.decompress(self._mmap[start : start + postings_length], max_length))
+        return values[0::2], values[1::2]
+
+    def url_and_indexed_at(self, doc_id: int) -> tuple[str, float]:
+        entry = DOCUMENT_ENTRY.unpack_from(self._mmap, self._documents_offset + doc_id * DOCUMENT_ENTRY.size)
+        start = self._urls_offset + entry[2]
+        return self._mmap[start : start + entry[3]].decode(), entry[5]
+
+    def urls_and_indexed_ats(self) -> list[tuple[str, float]]:
+        """
+        Same as url_and_indexed_at for every document, in doc id order.
+        """
+        documents_end = self._documents_offset + self.document_count * DOCUMENT_ENTRY.size
+        urls_and_indexed_ats = []
+        for entry in DOCUMENT_ENTRY.iter_unpack(self._mmap[self._documents_offset : documents_end]):
+            start = self._urls_offset + entry[2]
+            urls_and_indexed_ats.append((self._mmap[start : start + entry[3]].decode(), entry[5]))
+        return urls_and_indexed_ats
+
+    def stored_fields(self, doc_id: int) -> dict[str, Any]:
+        entry = DOCUMENT_ENTRY.unpack_from(self._mmap, self._documents_offset + doc_id * DOCUMENT_ENTRY.size)
+        start = entry[0]
+        return json.loads(zlib.decompress(self._mmap[start : start + entry[1]]))  # type: ignore[no-any-return]
+
+    def documents(self) -> Iterable[Document]:
+        for doc_id in range(self.document_count):
+            fields = self.stored_fields(doc_id)
+            _, indexed_at = self.url_and_indexed_at(doc_id)
+            yield Document(
+                url=fields["url"],
+                title=fields["title"],
+                categories=fields["categories"],
+                content=fields["content"],
+                indexed_at=indexed_at,
+            )
@@ -0,0 +1,205 @@
+"""
+Production entry point, run with `python server.py`.
+
+Decision: uvicorn's own --workers supervisor spawns fresh interpreters, so every worker pays for importing the app
+again. Here the app is imported once in the parent and the workers are forked from it, which shares the already
+imported modules (copy-on-write) between them, similar to gunicorn's preload_app.
+"""
+
+import gc
+import heapq
+import importlib.util
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from collections import deque
+from types import FrameType
+
+import uvicorn
+
+from scraping.warm_up import warm_up
+from settings import settings
+
+# Using uvicorn's logger so these messages go through the same handlers as the server logs
+logger = logging.getLogger("uvicorn.error")
+
+# Exit code of a worker that never finished starting up, same as gunicorn's WORKER_BOOT_ERROR
+WORKER_STARTUP_FAILED_EXIT_CODE = 3
+# How often the master checks on its workers while it has a restart scheduled
+RESTART_POLL_INTERVAL_SECONDS = 0.1
+
+
+def get_worker_count() -> int:
+    if settings.SERVER_WORKERS is not None:
+        return settings.SERVER_WORKERS
+    # sched_getaffinity respects CPU pinning (e.g. docker --cpuset-cpus), cpu_count doesn't
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def build_config() -> uvicorn.Config:
+    # Decision: uvloop and httptools ship with fastapi[standard] but fall back to the pure python versions in case
+    # they aren't available on the platform
+    loop = "uvloop" if importlib.util.find_spec("uvloop") is not None else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") is not None else "h11"
+
+    from main import app
+
+    return uvicorn.Config(
+        app,
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
+        loop=loop,
+        http=http,
+        proxy_headers=True,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_SHUTDOWN_TIMEOUT,
+    )
+
+
+class RestartPolicy:
+    """
+    Works out how long to wait before replacing a crashed worker. The delay starts at SERVER_RESTART_BACKOFF_SECONDS
+    and doubles for every other crash within the last SERVER_WORKER_RESTART_WINDOW_SECONDS, up to
+    SERVER_MAX_RESTART_BACKOFF_SECONDS. Once there have been more than SERVER_MAX_WORKER_RESTARTS crashes in the window
+    the workers are crash looping and the server should give up instead.
+    """
+
+    def __init__(self) -> None:
+        self._crashes: deque[float] = deque()
+
+    def record_crash(self, now: float) -> float | None:
+        """
+        Returns the seconds to wait before restarting the worker, or None if the server should shut down.
+        """
+        while self._crashes and self._crashes[0] <= now - settings.SERVER_WORKER_RESTART_WINDOW_SECONDS:
+            self._crashes.popleft()
+        self._crashes.append(now)
+        if len(self._crashes) > settings.SERVER_MAX_WORKER_RESTARTS:
+            return None
+        return min(
+            settings.SERVER_MAX_RESTART_BACKOFF_SECONDS,
+            settings.SERVER_RESTART_BACKOFF_SECONDS * 2.0 ** (len(self._crashes) - 1),
+        )
+
+
+def _preload() -> None:
+    """
+    Does the one-off setup work before forking so the workers don't each have to do it.
+    """
+    warm_up()
+
+    # Objects that exist before the fork are never freed, moving them out of the GC's tracked generations stops the
+    # collector from touching (and so copying) the shared memory pages in every worker
+    gc.freeze()
+
+
+def _run_worker(server: uvicorn.Server, sock: socket.socket) -> None:
+    # The parent's handlers are inherited through fork, uvicorn installs its own ones when the server starts
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    server.run(sockets=[sock])
+
+
+def main() -> int:
+    """
+    Runs the workers until the server is stopped, returns the exit code for the master process.
+    """
+    worker_count = get_worker_count()
+    if worker_count > 1 and not settings.JOBS_STORAGE_DIR:
+        # Jobs would only be visible to the worker that accepted them, so polls landing on any other worker get a 404
+        logger.error("JOBS_STORAGE_DIR must be set to run more than one worker")
+        return 1
+
+    config = build_config()
+    sock = config.bind_socket()
+    _preload()
+
+    workers: set[int] = set()
+    shutting_down = False
+    exit_code = 0
+    restart_policy = RestartPolicy()
+    # time.monotonic() at which to start each replacement for a crashed worker
+    scheduled_restarts: list[float] = []
+
+    def spawn_worker() -> None:
+        pid = os.fork()
+        if pid == 0:
+            server = uvicorn.Server(config)
+            worker_exit_code = 1
+            try:
+                _run_worker(server, sock)
+                worker_exit_code = 0
+            except BaseException:
+                logger.exception("Worker exited with an error")
+            finally:
+                # uvicorn returns normally when the app's lifespan startup fails (e.g. SEARCH_INDEX_DIR can't be
+                # created), a replacement worker would only fail the same way so the master needs to know
+                if not server.started:
+                    worker_exit_code = WORKER_STARTUP_FAILED_EXIT_CODE
+                os._exit(worker_exit_code)
+        workers.add(pid)
+
+    def stop_workers() -> None:
+        nonlocal shutting_down
+        shutting_down = True
+        scheduled_restarts.clear()
+        # Workers stop accepting new connections and drain in-flight requests for up to timeout_graceful_shutdown
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def handle_shutdown(_signum: int, _frame: FrameType | None) -> None:
+        stop_workers()
+
+    signal.signal(signal.SIGTERM, handle_shutdown)
+    signal.signal(signal.SIGINT, handle_shutdown)
+
+    logger.info("Starting %s workers on %s:%s", worker_count, config.host, config.port)
+    for _ in range(worker_count):
+        spawn_worker()
+
+    while workers or scheduled_restarts:
+        while scheduled_restarts and scheduled_restarts[0] <= time.monotonic():
+            heapq.heappop(scheduled_restarts)
+            spawn_worker()
+
+        if scheduled_restarts:
+            # Can't block in os.wait() while a restart is due, there may be no other worker to wake us up
+            pid, status = os.waitpid(-1, os.WNOHANG) if workers else (0, 0)
+            if pid == 0:
+                time.sleep(min(RESTART_POLL_INTERVAL_SECONDS, max(0.0, scheduled_restarts[0] - time.monotonic())))
+                continue
+        else:
+            pid, status = os.wait()
+
+        workers.discard(pid)
+        if shutting_down:
+            continue
+
+        if os.waitstatus_to_exitcode(status) == WORKER_STARTUP_FAILED_EXIT_CODE:
+            logger.error("Worker %s failed to start, shutting down", pid)
+            exit_code = 1
+            stop_workers()
+            continue
+
+        delay = restart_policy.record_crash(time.monotonic())
+        if delay is None:
+            logger.error("Workers keep crashing, shutting down")
+            exit_code = 1
+            stop_workers()
+            continue
+        logger.warning("Worker %s died with status %s, restarting it in %.1f seconds", pid, status, delay)
+        heapq.heappush(scheduled_restarts, time.monotonic() + delay)
+
+    sock.close()
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
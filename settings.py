@@ -1,3 +1,7 @@
+import os
+import tempfile
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 
@@ -5,5 +9,91 @@ class Settings(BaseSettings):
     ADMIN_USERNAME: str
     ADMIN_PASSWORD: str
     OPENAI_API_KEY: str
+    OPENAI_MODEL: str = "gpt-4o-mini"
+    # Level of the app's own log messages, see logging_config.py
+    LOG_LEVEL: str = "INFO"
+    # Max prompt tokens for OPENAI_MODEL, well below the context window to keep cost and latency predictable
+    OPENAI_MAX_INPUT_TOKENS: int = 16000
+    # How to shrink the article content when it doesn't fit in OPENAI_MAX_INPUT_TOKENS
+    TOKEN_TRUNCATION_POLICY: Literal["lead_first", "section_priority", "sentence_dedup"] = "section_priority"
+    # Answer simple factoid questions from the article content without calling OpenAI when we're confident enough,
+    # see scraping/services/extractive_qa_service.py
+    EXTRACTIVE_QA_ENABLED: bool = True
+    EXTRACTIVE_QA_MIN_CONFIDENCE: float = 0.7
+    # Responses smaller than this (in bytes) are sent uncompressed
+    RESPONSE_COMPRESSION_MIN_SIZE: int = 1024
+    # Default for how pages are fetched, see FetchMode in scraping/models.py
+    SCRAPE_FETCH_MODE: Literal["page", "parse_api"] = "page"
+    # Pages bigger than these (as downloaded, and once decompressed) are rejected as soon as the limit is reached
+    SCRAPE_MAX_COMPRESSED_BYTES: int = 5 * 1024 * 1024
+    SCRAPE_MAX_DECOMPRESSED_BYTES: int = 20 * 1024 * 1024
+    SCRAPE_TIMEOUT_SECONDS: float = 30
+    # Memory (in bytes) used to cache scraped articles, see scraping/services/cache_service.py. 0 disables the cache
+    SCRAPE_CACHE_MAX_BYTES: int = 0
+    SCRAPE_CACHE_TTL_SECONDS: int = 300
+    # Load the lazily imported dependencies in the background as soon as the app starts
+    WARM_UP_ON_STARTUP: bool = True
+    # Number of jobs processed at the same time per worker process
+    JOBS_CONCURRENCY: int = 4
+    # Jobs waiting to be processed before new ones are rejected with a 503
+    JOBS_MAX_QUEUED: int = 100
+    JOBS_RETRY_AFTER_SECONDS: int = 5
+    # How long finished job results can be fetched for
+    JOBS_RESULT_TTL_SECONDS: int = 3600
+    # Longest a poll for a job result can wait for the job to finish
+    JOBS_MAX_WAIT_SECONDS: float = 30
+    # Directory to keep a copy of job states in, so they can be polled from any of the worker processes started by
+    # server.py, so it has to be shared by all of them. Set to "" to keep jobs in memory only, server.py then refuses to
+    # start more than one worker. The default is per user (the temp dir is shared on most systems), it's created with
+    # mode 0o700 and the jobs refuse to start if another user owns it or can write to it
+    JOBS_STORAGE_DIR: str = os.path.join(
+        tempfile.gettempdir(), f"wiki-scraper-jobs-{os.getuid()}" if hasattr(os, "getuid") else "wiki-scraper-jobs"
+    )
+    # Admission control for /scrape and /ask, see admission/services/admission_service.py
+    ADMISSION_CONTROL_ENABLED: bool = True
+    # Requests to /scrape and /ask handled at the same time per worker process, across both routes
+    ADMISSION_MAX_IN_FLIGHT: int = 64
+    # Upper bounds for each route's adaptive concurrency limit
+    ADMISSION_SCRAPE_MAX_CONCURRENCY: int = 48
+    ADMISSION_ASK_MAX_CONCURRENCY: int = 16
+    # A route's concurrency limit is lowered while its requests take longer than this
+    ADMISSION_SCRAPE_TARGET_LATENCY_SECONDS: float = 3
+    ADMISSION_ASK_TARGET_LATENCY_SECONDS: float = 15
+    # Relative share of free capacity each route gets while both have requests queued
+    ADMISSION_SCRAPE_WEIGHT: float = 4
+    ADMISSION_ASK_WEIGHT: float = 1
+    # Requests that would wait (or have waited) longer than this for capacity are rejected with a 503
+    ADMISSION_MAX_QUEUE_WAIT_SECONDS: float = 5
+    # Directory the full text search index is kept in, search is disabled if unset
+    SEARCH_INDEX_DIR: str | None = None
+    # How often newly scraped articles are written to the index
+    SEARCH_FLUSH_INTERVAL_SECONDS: float = 1
+    # Segments are merged once there are more than this many, and this many of the smallest are merged at a time
+    SEARCH_MAX_SEGMENTS: int = 10
+    SEARCH_MERGE_FACTOR: int = 4
+    # Most postings of a single query term that are scored, across all the segments. Only matters for terms in more
+    # articles than this, whose idf is close to zero anyway
+    SEARCH_MAX_POSTINGS_PER_TERM: int = 20_000
+    # Enables the /admin profiling endpoints and the X-Profile request header
+    PROFILING_ENABLED: bool = True
+    # Longest a sampling profile can run for
+    PROFILING_MAX_SECONDS: float = 60
+    # Number of X-Profile profiles kept in memory to be fetched
+    PROFILING_MAX_STORED_PROFILES: int = 20
+    # Number of functions included in an X-Profile profile
+    PROFILING_REQUEST_STATS_LIMIT: int = 50
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    # Defaults to the number of CPUs available to the process
+    SERVER_WORKERS: int | None = None
+    # Seconds to let in-flight requests finish on shutdown
+    SERVER_GRACEFUL_SHUTDOWN_TIMEOUT: int = 30
+    # Delay before replacing a crashed worker, doubled for each further crash in SERVER_WORKER_RESTART_WINDOW_SECONDS
+    SERVER_RESTART_BACKOFF_SECONDS: float = 0.5
+    SERVER_MAX_RESTART_BACKOFF_SECONDS: float = 30
+    # The server shuts down if workers crash more than this many times within the window
+    SERVER_MAX_WORKER_RESTARTS: int = 5
+    SERVER_WORKER_RESTART_WINDOW_SECONDS: float = 60
+
 
 settings = Settings()
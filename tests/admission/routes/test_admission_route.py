@@ -0,0 +1,80 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from pytest_mock import MockerFixture
+
+from admission.services.admission_service import AdmissionController
+from main import app
+from scraping.models import ScrapeAskQuestionResponse, ScrapingResponse
+
+
+class TestAdmissionControl:
+    def test_overloaded__returns_503_with_retry_after(
+        self, client: TestClient, auth_headers: dict[str, str], mocker: MockerFixture
+    ) -> None:
+        controller = AdmissionController()
+        route = controller.route("scrape")
+        route.in_flight = route.maximum
+        route.average_latency = 1000
+        mocker.patch("admission.middleware.admission_controller", controller)
+
+        response = client.post("/scrape", json={"url": "https://example.com"}, headers=auth_headers)
+
+        assert response.status_code == 503
+        assert int(response.headers["Retry-After"]) > 0
+
+    def test_not_overloaded__request_runs_and_slot_is_released(
+        self, client: TestClient, auth_headers: dict[str, str], mocker: MockerFixture
+    ) -> None:
+        controller = AdmissionController()
+        mocker.patch("admission.middleware.admission_controller", controller)
+        mocker.patch(
+            "scraping.router.webscrape_url",
+            return_value=ScrapingResponse(title="Title", content="Content", image_url="", categories=[], references=[]),
+        )
+
+        response = client.post("/scrape", json={"url": "https://example.com"}, headers=auth_headers)
+
+        assert response.status_code == 200
+        assert controller.route("scrape").in_flight == 0
+        assert controller.route("scrape").average_latency is not None
+
+
+@pytest.mark.asyncio
+class TestAdmissionControlWithSlowAsk:
+    async def test_ask_blocked_on_openai__scrape_is_still_admitted_and_served(
+        self, auth_headers: dict[str, str], mocker: MockerFixture
+    ) -> None:
+        mocker.patch("admission.middleware.admission_controller", AdmissionController())
+        mocker.patch(
+            "scraping.router.webscrape_url",
+            return_value=ScrapingResponse(title="Title", content="Content", image_url="", categories=[], references=[]),
+        )
+
+        def slow_completion(_content: str, _question: str) -> ScrapeAskQuestionResponse:
+            # The openai client blocks the thread it runs on for the whole completion
+            time.sleep(1)
+            return ScrapeAskQuestionResponse(answer="Answer")
+
+        mocker.patch("scraping.router.get_ai_response", side_effect=slow_completion)
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            start = time.perf_counter()
+            ask = asyncio.create_task(
+                client.post("/ask", json={"url": "https://example.com", "question": "Question?"}, headers=auth_headers)
+            )
+            # Gives /ask time to get to the completion
+            await asyncio.sleep(0.1)
+
+            scrape_response = await client.post("/scrape", json={"url": "https://example.com"}, headers=auth_headers)
+            scrape_seconds = time.perf_counter() - start
+            ask_was_running = not ask.done()
+            ask_response = await ask
+
+        assert scrape_response.status_code == 200
+        assert scrape_seconds < 0.5
+        assert ask_was_running
+        assert ask_response.status_code == 200
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+from pytest_mock import MockerFixture
+
+from admission.services.admission_service import AdmissionController, AdmissionRejectedError, RouteLimit
+from settings import settings
+
+
+async def _hold(controller: AdmissionController, route_class: str, username: str, release: asyncio.Event) -> None:
+    async with controller.admit(route_class, username):  # type: ignore[arg-type]
+        await release.wait()
+
+
+@pytest.mark.asyncio
+class TestAdmissionController:
+    async def test_under_limits__admitted_straight_away(self) -> None:
+        controller = AdmissionController()
+
+        async with controller.admit("scrape", "admin"):
+            assert controller.route("scrape").in_flight == 1
+
+        assert controller.route("scrape").in_flight == 0
+
+    async def test_both_routes_queued__weighted_fair_order(self, mocker: MockerFixture) -> None:
+        mocker.patch.object(settings, "ADMISSION_MAX_IN_FLIGHT", 1)
+        mocker.patch.object(settings, "ADMISSION_SCRAPE_WEIGHT", 2)
+        mocker.patch.object(settings, "ADMISSION_ASK_WEIGHT", 1)
+        controller = AdmissionController()
+        release = asyncio.Event()
+        blocker = asyncio.create_task(_hold(controller, "ask", "admin", release))
+        await asyncio.sleep(0)
+
+        order = []
+
+        async def run(route_class: str) -> None:
+            async with controller.admit(route_class, "admin"):  # type: ignore[arg-type]
+                order.append(route_class)
+
+        tasks = [asyncio.create_task(run("ask")) for _ in range(3)]
+        tasks += [asyncio.create_task(run("scrape")) for _ in range(6)]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(blocker, *tasks)
+
+        # The queued /ask burst arrived first, but /scrape gets two turns for every one of them
+        assert order == ["scrape", "ask", "scrape", "scrape", "ask", "scrape", "scrape", "ask", "scrape"]
+
+    async def test_queue_wait_over_threshold__rejected_with_retry_after(self, mocker: MockerFixture) -> None:
+        mocker.patch.object(settings, "ADMISSION_SCRAPE_MAX_CONCURRENCY", 1)
+        mocker.patch.object(settings, "ADMISSION_MAX_QUEUE_WAIT_SECONDS", 0.05)
+        controller = AdmissionController()
+        release = asyncio.Event()
+        blocker = asyncio.create_task(_hold(controller, "scrape", "admin", release))
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejectedError) as exc_info:
+            async with controller.admit("scrape", "admin"):
+                pass
+
+        assert exc_info.value.retry_after_seconds == 1
+        release.set()
+        await blocker
+        # The rejected request doesn't hold up the next one
+        async with controller.admit("scrape", "admin"):
+            pass
+
+    async def test_slot_given_in_same_iteration_as_timeout__slot_is_released(self, mocker: MockerFixture) -> None:
+        mocker.patch.object(settings, "ADMISSION_SCRAPE_MAX_CONCURRENCY", 1)
+        controller = AdmissionController()
+        await controller._acquire("scrape", "admin")
+
+        async def time_out_as_slot_frees_up(future: asyncio.Future[None], _timeout: float) -> None:
+            # The request holding the slot finishes, which hands it to the waiting future, then wait_for times out
+            controller._release("scrape", 0.01)
+            assert future.done()
+            raise TimeoutError
+
+        mocker.patch("admission.services.admission_service.asyncio.wait_for", side_effect=time_out_as_slot_frees_up)
+
+        with pytest.raises(AdmissionRejectedError):
+            async with controller.admit("scrape", "admin"):
+                pass
+
+        assert controller.route("scrape").in_flight == 0
+        assert controller._in_flight == 0
+
+    async def test_expected_wait_over_threshold__rejected_without_queueing(self, mocker: MockerFixture) -> None:
+        mocker.patch.object(settings, "ADMISSION_SCRAPE_MAX_CONCURRENCY", 1)
+        mocker.patch.object(settings, "ADMISSION_MAX_QUEUE_WAIT_SECONDS", 5)
+        controller = AdmissionController()
+        controller.route("scrape").average_latency = 10
+        release = asyncio.Event()
+        blocker = asyncio.create_task(_hold(controller, "scrape", "admin", release))
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejectedError) as exc_info:
+            async with controller.admit("scrape", "admin"):
+                pass
+
+        assert exc_info.value.retry_after_seconds == 10
+        assert controller.queued("scrape") == 0
+        release.set()
+        await blocker
+
+
+class TestRouteLimit:
+    def test_slow_requests__limit_decreases_once_per_target_latency(self) -> None:
+        route = RouteLimit(maximum=10, target_latency=1, weight=1)
+
+        route.record_latency(2, was_saturated=True)
+        route.record_latency(2, was_saturated=True)
+
+        assert route.limit == 9
+
+    def test_fast_requests_while_saturated__limit_increases_up_to_maximum(self) -> None:
+        route = RouteLimit(maximum=10, target_latency=1, weight=1)
+        route.limit = 4
+
+        for _ in range(4):
+            route.record_latency(0.1, was_saturated=True)
+        assert route.limit == pytest.approx(5, abs=0.1)
+
+        for _ in range(100):
+            route.record_latency(0.1, was_saturated=True)
+        assert route.limit == 10
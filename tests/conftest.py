@@ -1,7 +1,9 @@
 import base64
+from pathlib import Path
 
 import pytest
 from fastapi.testclient import TestClient
+from pytest_mock import MockerFixture
 
 from main import app
 from settings import settings
@@ -17,3 +19,9 @@ def auth_headers() -> dict[str, str]:
     credentials = f"{settings.ADMIN_USERNAME}:{settings.ADMIN_PASSWORD}"
     encoded = base64.b64encode(credentials.encode()).decode()
     return {"Authorization": f"Basic {encoded}"}
+
+
+@pytest.fixture(autouse=True)
+def jobs_storage_dir(mocker: MockerFixture, tmp_path: Path) -> None:
+    # Keeps the job files written by tests out of the shared default directory
+    mocker.patch.object(settings, "JOBS_STORAGE_DIR", str(tmp_path / "jobs"))
@@ -0,0 +1,128 @@
+import base64
+from collections.abc import Generator
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from pytest_mock import MockerFixture
+
+from jobs.services.job_service import JobQueueFullError
+from main import app
+from scraping.models import ScrapeAskQuestionResponse, ScrapingResponse
+from settings import settings
+
+
+# Decision: the job workers are started in the app's lifespan, which TestClient only runs when used as a context manager
+@pytest.fixture
+def client(mocker: MockerFixture) -> Generator[TestClient, None, None]:
+    mocker.patch.object(settings, "WARM_UP_ON_STARTUP", False)
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def mock_scrape_response() -> ScrapingResponse:
+    return ScrapingResponse(
+        title="Test Title",
+        content="Test Content",
+        image_url="https://example.com/image.jpg",
+        categories=["test"],
+        references=["test"],
+    )
+
+
+class TestPOSTScrape:
+    endpoint = "/jobs/scrape"
+
+    def test_job_is_accepted__and_result_can_be_polled(
+        self,
+        client: TestClient,
+        auth_headers: dict[str, str],
+        mocker: MockerFixture,
+        mock_scrape_response: ScrapingResponse,
+    ) -> None:
+        mock_scrape = mocker.patch("jobs.services.job_service.webscrape_url", return_value=mock_scrape_response)
+
+        response = client.post(self.endpoint, json={"url": "https://example.com"}, headers=auth_headers)
+
+        assert response.status_code == 202
+        job = response.json()
+        assert job["type"] == "scrape"
+        assert job["status"] == "queued"
+
+        response = client.get(f"/jobs/{job['id']}", params={"wait": 5}, headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "succeeded"
+        assert response.json()["result"] == mock_scrape_response.model_dump()
+        mock_scrape.assert_called_once_with("https://example.com", None)
+
+    def test_scrape_fails__job_has_error(
+        self, client: TestClient, auth_headers: dict[str, str], mocker: MockerFixture
+    ) -> None:
+        mocker.patch(
+            "jobs.services.job_service.webscrape_url",
+            side_effect=HTTPException(status_code=500, detail="Failed to scrape website"),
+        )
+
+        job = client.post(self.endpoint, json={"url": "https://example.com"}, headers=auth_headers).json()
+        response = client.get(f"/jobs/{job['id']}", params={"wait": 5}, headers=auth_headers)
+
+        assert response.json()["status"] == "failed"
+        assert response.json()["error"] == {"status_code": 500, "detail": "Failed to scrape website"}
+
+    def test_queue_is_full__returns_503(
+        self, client: TestClient, auth_headers: dict[str, str], mocker: MockerFixture
+    ) -> None:
+        mocker.patch("jobs.router.job_manager.submit", side_effect=JobQueueFullError())
+
+        response = client.post(self.endpoint, json={"url": "https://example.com"}, headers=auth_headers)
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == str(settings.JOBS_RETRY_AFTER_SECONDS)
+
+    def test_user_is_unauthenticated(self, client: TestClient) -> None:
+        response = client.post(self.endpoint, json={"url": "https://example.com"})
+
+        assert response.status_code == 401
+
+
+class TestPOSTAsk:
+    endpoint = "/jobs/ask"
+
+    def test_job_is_accepted__and_answer_can_be_polled(
+        self,
+        client: TestClient,
+        auth_headers: dict[str, str],
+        mocker: MockerFixture,
+        mock_scrape_response: ScrapingResponse,
+    ) -> None:
+        mocker.patch("jobs.services.job_service.webscrape_url", return_value=mock_scrape_response)
+        mock_ai = mocker.patch(
+            "jobs.services.job_service.get_ai_response",
+            return_value=ScrapeAskQuestionResponse(answer="This is the answer"),
+        )
+
+        job = client.post(
+            self.endpoint, json={"url": "https://example.com", "question": "What is this about?"}, headers=auth_headers
+        ).json()
+        response = client.get(f"/jobs/{job['id']}", params={"wait": 5}, headers=auth_headers)
+
+        assert response.json()["status"] == "succeeded"
+        assert response.json()["result"] == {"answer": "This is the answer"}
+        mock_ai.assert_called_once_with("Test Content", "What is this about?")
+
+
+class TestGET:
+    def test_unknown_job__returns_404(self, client: TestClient, auth_headers: dict[str, str]) -> None:
+        response = client.get("/jobs/doesnotexist", headers=auth_headers)
+
+        assert response.status_code == 404
+        assert response.json() == {"detail": "Job not found"}
+
+    def test_user_has_incorrect_credentials(self, client: TestClient) -> None:
+        encoded = base64.b64encode(b"incorrect:credentials").decode()
+
+        response = client.get("/jobs/doesnotexist", headers={"Authorization": f"Basic {encoded}"})
+
+        assert response.status_code == 401
@@ -0,0 +1,164 @@
+import asyncio
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+
+from admission.services.admission_service import AdmissionController
+from jobs.services.job_service import JobManager, JobQueueFullError
+from scraping.models import ScrapingResponse
+from settings import settings
+
+SCRAPE_RESPONSE = ScrapingResponse(
+    title="Test Title",
+    content="Test Content",
+    image_url="https://example.com/image.jpg",
+    categories=["test"],
+    references=["/wiki/Mercia"],
+    reference_base="https://en.wikipedia.org",
+)
+
+
+@pytest.mark.asyncio
+class TestJobManager:
+    async def test_job_runs__result_is_persisted_and_readable_by_another_manager(
+        self, mocker: MockerFixture, tmp_path: Path
+    ) -> None:
+        mocker.patch.object(settings, "JOBS_STORAGE_DIR", str(tmp_path))
+        mocker.patch("jobs.services.job_service.webscrape_url", return_value=SCRAPE_RESPONSE)
+        manager = JobManager()
+        manager.start()
+
+        job = await manager.submit("scrape", "https://example.com", username="admin")
+        finished_job = await manager.wait(job.id, timeout=5)
+        await manager.stop()
+
+        assert finished_job is not None
+        assert finished_job.status == "succeeded"
+        # A different worker process only has the disk copy to go on
+        other_process_job = await JobManager().get(job.id)
+        assert other_process_job is not None
+        assert other_process_job.status == "succeeded"
+        assert other_process_job.result == ScrapingResponse.model_validate(SCRAPE_RESPONSE.model_dump())
+
+    async def test_wait_times_out__returns_unfinished_job(self, mocker: MockerFixture) -> None:
+        async def slow_scrape(_url: str, _fetch_mode: str | None) -> ScrapingResponse:
+            await asyncio.sleep(10)
+            return SCRAPE_RESPONSE
+
+        mocker.patch("jobs.services.job_service.webscrape_url", side_effect=slow_scrape)
+        manager = JobManager()
+        manager.start()
+
+        job = await manager.submit("scrape", "https://example.com", username="admin")
+        unfinished_job = await manager.wait(job.id, timeout=0.1)
+
+        assert unfinished_job is not None
+        assert unfinished_job.status == "running"
+
+        await manager.stop()
+        # Stopping the manager fails the job so pollers aren't left waiting forever
+        stopped_job = await manager.get(job.id)
+        assert stopped_job is not None
+        assert stopped_job.status == "failed"
+        assert stopped_job.error is not None and stopped_job.error.status_code == 503
+
+    async def test_job_runs__holds_an_admission_slot_while_running(self, mocker: MockerFixture) -> None:
+        controller = AdmissionController()
+        mocker.patch("jobs.services.job_service.admission_controller", controller)
+        in_flight_while_running = []
+
+        async def record_in_flight(_url: str, _fetch_mode: str | None) -> ScrapingResponse:
+            in_flight_while_running.append(controller.route("scrape").in_flight)
+            return SCRAPE_RESPONSE
+
+        mocker.patch("jobs.services.job_service.webscrape_url", side_effect=record_in_flight)
+        manager = JobManager()
+        manager.start()
+
+        job = await manager.submit("scrape", "https://example.com", username="admin")
+        finished_job = await manager.wait(job.id, timeout=5)
+        await manager.stop()
+
+        assert finished_job is not None and finished_job.status == "succeeded"
+        assert in_flight_while_running == [1]
+        assert controller.route("scrape").in_flight == 0
+
+    async def test_overloaded__job_fails_with_503(self, mocker: MockerFixture) -> None:
+        controller = AdmissionController()
+        route = controller.route("ask")
+        route.in_flight = route.maximum
+        route.average_latency = 1000
+        mocker.patch("jobs.services.job_service.admission_controller", controller)
+        webscrape_url = mocker.patch("jobs.services.job_service.webscrape_url", return_value=SCRAPE_RESPONSE)
+        manager = JobManager()
+        manager.start()
+
+        job = await manager.submit("ask", "https://example.com", "When was it built?", username="admin")
+        finished_job = await manager.wait(job.id, timeout=5)
+        await manager.stop()
+
+        assert finished_job is not None
+        assert finished_job.status == "failed"
+        assert finished_job.error is not None and finished_job.error.status_code == 503
+        webscrape_url.assert_not_called()
+
+    async def test_storage_dir_missing__is_created_private(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        mocker.patch.object(settings, "JOBS_STORAGE_DIR", str(tmp_path / "jobs"))
+        manager = JobManager()
+        manager.start()
+        await manager.stop()
+
+        assert (tmp_path / "jobs").stat().st_mode & 0o777 == 0o700
+
+    async def test_storage_dir_writable_by_other_users__refuses_to_start(
+        self, mocker: MockerFixture, tmp_path: Path
+    ) -> None:
+        mocker.patch.object(settings, "JOBS_STORAGE_DIR", str(tmp_path))
+        tmp_path.chmod(0o777)
+        manager = JobManager()
+
+        with pytest.raises(RuntimeError, match="can be written to by other users"):
+            manager.start()
+
+    async def test_storage_dir_owned_by_another_user__refuses_to_start(
+        self, mocker: MockerFixture, tmp_path: Path
+    ) -> None:
+        mocker.patch.object(settings, "JOBS_STORAGE_DIR", str(tmp_path))
+        mocker.patch("jobs.services.job_service.os.getuid", return_value=tmp_path.stat().st_uid + 1)
+        manager = JobManager()
+
+        with pytest.raises(RuntimeError, match="owned by another user"):
+            manager.start()
+
+    async def test_queue_is_full__raises_error(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        mocker.patch.object(settings, "JOBS_STORAGE_DIR", str(tmp_path))
+        mocker.patch.object(settings, "JOBS_MAX_QUEUED", 1)
+        mocker.patch.object(settings, "JOBS_CONCURRENCY", 0)
+        manager = JobManager()
+        manager.start()
+
+        await manager.submit("scrape", "https://example.com", username="admin")
+        with pytest.raises(JobQueueFullError):
+            await manager.submit("scrape", "https://example.com", username="admin")
+        await manager.stop()
+
+        # Only the accepted job was saved
+        assert len(list(tmp_path.glob("*.json"))) == 1
+
+    async def test_finished_job_past_ttl__is_not_returned(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        mocker.patch.object(settings, "JOBS_STORAGE_DIR", str(tmp_path))
+        mocker.patch("jobs.services.job_service.webscrape_url", return_value=SCRAPE_RESPONSE)
+        manager = JobManager()
+        manager.start()
+        job = await manager.submit("scrape", "https://example.com", username="admin")
+        await manager.wait(job.id, timeout=5)
+        await manager.stop()
+
+        future = job.finished_at + timedelta(seconds=settings.JOBS_RESULT_TTL_SECONDS + 1)  # type: ignore[operator]
+        mocker.patch("jobs.services.job_service._now", return_value=future)
+
+        assert await manager.get(job.id) is None
+        await manager._sweep()
+        assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,93 @@
+from fastapi.testclient import TestClient
+from pytest_mock import MockerFixture
+
+from scraping.models import ScrapeAskQuestionResponse, ScrapingResponse
+from settings import settings
+
+
+def _answer_in_worker_thread(content: str, question: str) -> ScrapeAskQuestionResponse:
+    return ScrapeAskQuestionResponse(answer=f"{question} {content}")
+
+
+class TestPOSTProfile:
+    endpoint = "/admin/profile"
+
+    def test_returns_collapsed_stacks(self, client: TestClient, auth_headers: dict[str, str]) -> None:
+        response = client.post(self.endpoint, params={"seconds": 0.1, "interval_ms": 5}, headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        lines = response.text.splitlines()
+        assert lines
+        for line in lines:
+            stack, count = line.rsplit(" ", 1)
+            assert stack
+            assert int(count) > 0
+
+    def test_profiling_disabled__returns_404(
+        self, client: TestClient, auth_headers: dict[str, str], mocker: MockerFixture
+    ) -> None:
+        mocker.patch.object(settings, "PROFILING_ENABLED", False)
+
+        response = client.post(self.endpoint, params={"seconds": 0.1}, headers=auth_headers)
+
+        assert response.status_code == 404
+
+    def test_user_is_unauthenticated(self, client: TestClient) -> None:
+        response = client.post(self.endpoint, params={"seconds": 0.1})
+
+        assert response.status_code == 401
+
+
+class TestRequestProfiling:
+    def test_profile_header__profiles_request_and_profile_can_be_fetched(
+        self, client: TestClient, auth_headers: dict[str, str], mocker: MockerFixture
+    ) -> None:
+        mock_response = ScrapingResponse(
+            title="Test Title", content="Test Content", image_url="", categories=[], references=[]
+        )
+        mocker.patch("scraping.router.webscrape_url", return_value=mock_response)
+        # The first request can spend longer building pydantic schemas than in the route, keep every function
+        mocker.patch.object(settings, "PROFILING_REQUEST_STATS_LIMIT", 10_000)
+
+        response = client.post(
+            "/scrape", json={"url": "https://example.com"}, headers={**auth_headers, "X-Profile": "1"}
+        )
+
+        assert response.status_code == 200
+        profile_id = response.headers["X-Profile-Id"]
+        profile_response = client.get(f"/admin/profiles/{profile_id}", headers=auth_headers)
+        assert profile_response.status_code == 200
+        assert "scrape_website" in profile_response.text
+
+    def test_profile_header__includes_request_work_in_worker_threads(
+        self, client: TestClient, auth_headers: dict[str, str], mocker: MockerFixture
+    ) -> None:
+        mock_response = ScrapingResponse(
+            title="Test Title", content="Test Content", image_url="", categories=[], references=[]
+        )
+        mocker.patch("scraping.router.webscrape_url", return_value=mock_response)
+        mocker.patch("scraping.router.get_ai_response", _answer_in_worker_thread)
+        mocker.patch.object(settings, "PROFILING_REQUEST_STATS_LIMIT", 10_000)
+
+        response = client.post(
+            "/ask",
+            json={"url": "https://example.com", "question": "What is it?"},
+            headers={**auth_headers, "X-Profile": "1"},
+        )
+
+        assert response.status_code == 200
+        profile_id = response.headers["X-Profile-Id"]
+        profile_response = client.get(f"/admin/profiles/{profile_id}", headers=auth_headers)
+        assert "_answer_in_worker_thread" in profile_response.text
+
+    def test_profile_header_without_credentials__is_not_profiled(self, client: TestClient) -> None:
+        response = client.post("/scrape", json={"url": "https://example.com"}, headers={"X-Profile": "1"})
+
+        assert response.status_code == 401
+        assert "X-Profile-Id" not in response.headers
+
+    def test_unknown_profile__returns_404(self, client: TestClient, auth_headers: dict[str, str]) -> None:
+        response = client.get("/admin/profiles/doesnotexist", headers=auth_headers)
+
+        assert response.status_code == 404
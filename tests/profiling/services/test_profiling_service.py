@@ -0,0 +1,116 @@
+import cProfile
+import threading
+import time
+from collections import Counter
+
+import pytest
+from pytest_mock import MockerFixture
+
+from profiling.services.profiling_service import (
+    RequestProfileStore,
+    format_collapsed_stacks,
+    request_thread_profilers,
+    run_in_thread,
+    sample_stacks,
+)
+from settings import settings
+
+
+def _busy_loop(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class TestSampleStacks:
+    def test_busy_thread__is_sampled_with_its_full_stack(self) -> None:
+        stop = threading.Event()
+        thread = threading.Thread(target=_busy_loop, args=(stop,), name="busy-thread")
+        thread.start()
+        try:
+            samples = sample_stacks(duration=0.2, interval=0.005)
+        finally:
+            stop.set()
+            thread.join()
+
+        busy_stacks = [stack for stack in samples if stack.startswith("busy-thread;")]
+        assert busy_stacks
+        assert all(
+            stack.endswith(f"{__name__}:_busy_loop") or f"{__name__}:_busy_loop;" in stack for stack in busy_stacks
+        )
+        # The sampling thread shouldn't sample itself
+        assert not any("sample_stacks" in stack for stack in samples)
+
+
+def _work_in_thread(value: int) -> int:
+    return value * 2
+
+
+@pytest.mark.asyncio
+class TestRunInThread:
+    async def test_request_not_profiled__runs_call_without_profiling(self) -> None:
+        assert await run_in_thread(_work_in_thread, 2) == 4
+
+    async def test_request_profiled__adds_profile_of_call_in_worker_thread(self) -> None:
+        thread_profilers: list[cProfile.Profile] = []
+        token = request_thread_profilers.set(thread_profilers)
+        try:
+            assert await run_in_thread(_work_in_thread, 2) == 4
+        finally:
+            request_thread_profilers.reset(token)
+
+        assert len(thread_profilers) == 1
+        store = RequestProfileStore()
+        started = store.start()
+        assert started is not None
+        store.finish(*started, thread_profilers)
+        profile = store.get(started[0])
+        assert profile is not None
+        assert "_work_in_thread" in profile
+
+
+class TestFormatCollapsedStacks:
+    def test_returns_one_line_per_stack__most_common_first(self) -> None:
+        samples = Counter({"MainThread;main:a;main:b": 2, "MainThread;main:a": 5})
+
+        assert format_collapsed_stacks(samples) == "MainThread;main:a 5\nMainThread;main:a;main:b 2\n"
+
+
+class TestRequestProfileStore:
+    def test_profile_is_stored__and_can_be_fetched(self) -> None:
+        store = RequestProfileStore()
+
+        started = store.start()
+        assert started is not None
+        profile_id, profiler = started
+        time.sleep(0.001)
+        store.finish(profile_id, profiler)
+
+        profile = store.get(profile_id)
+        assert profile is not None
+        assert "function calls" in profile
+
+    def test_profile_already_running__does_not_start_another(self) -> None:
+        store = RequestProfileStore()
+
+        started = store.start()
+        assert started is not None
+        assert store.start() is None
+        store.finish(*started)
+        restarted = store.start()
+        assert restarted is not None
+        store.finish(*restarted)
+
+    def test_only_most_recent_profiles_are_kept(self, mocker: MockerFixture) -> None:
+        mocker.patch.object(settings, "PROFILING_MAX_STORED_PROFILES", 2)
+        store = RequestProfileStore()
+
+        profile_ids = []
+        for _ in range(3):
+            started = store.start()
+            assert started is not None
+            store.finish(*started)
+            profile_ids.append(started[0])
+
+        assert store.get(profile_ids[0]) is None
+        assert store.get(profile_ids[1]) is not None
+        assert store.get(profile_ids[2]) is not None
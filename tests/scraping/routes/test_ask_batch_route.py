@@ -0,0 +1,83 @@
+from fastapi.testclient import TestClient
+from pytest_mock import MockerFixture
+
+from scraping.models import QuestionAnswer, ScrapeAskQuestionsResponse, ScrapingResponse
+
+
+class TestPOST:
+    endpoint = "/ask/batch"
+
+    def test_successful_request__scrapes_once_and_returns_answers(
+        self, client: TestClient, auth_headers: dict[str, str], mocker: MockerFixture
+    ) -> None:
+        mock_scrape_response = ScrapingResponse(
+            title="Test Title",
+            content="Test Content",
+            image_url="https://example.com/image.jpg",
+            categories=["test"],
+            references=["test"],
+        )
+        mock_scrape = mocker.patch("scraping.router.webscrape_url", return_value=mock_scrape_response)
+        mock_ai_response = ScrapeAskQuestionsResponse(
+            answers=[
+                QuestionAnswer(question="What is this about?", answer="Testing"),
+                QuestionAnswer(question="Who wrote it?", answer="No answer found in content"),
+            ]
+        )
+        mock_ai = mocker.patch("scraping.router.get_ai_responses", return_value=mock_ai_response)
+
+        response = client.post(
+            self.endpoint,
+            json={"url": "https://example.com", "questions": ["What is this about?", "Who wrote it?"]},
+            headers=auth_headers,
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "answers": [
+                {"question": "What is this about?", "answer": "Testing"},
+                {"question": "Who wrote it?", "answer": "No answer found in content"},
+            ]
+        }
+        mock_scrape.assert_called_once_with("https://example.com", None)
+        mock_ai.assert_called_once_with("Test Content", ["What is this about?", "Who wrote it?"])
+
+    def test_content_is_empty_on_wiki_page__returns_400(
+        self, client: TestClient, auth_headers: dict[str, str], mocker: MockerFixture
+    ) -> None:
+        mock_response = ScrapingResponse(
+            title="Test Title",
+            content="",
+            image_url="https://example.com/image.jpg",
+            categories=["test"],
+            references=["test"],
+        )
+        mocker.patch("scraping.router.webscrape_url", return_value=mock_response)
+
+        response = client.post(
+            self.endpoint,
+            json={"url": "https://example.com", "questions": ["What is this about?"]},
+            headers=auth_headers,
+        )
+
+        assert response.json() == {"detail": "Failed to get content from URL"}
+        assert response.status_code == 400
+
+    def test_no_questions__returns_422(self, client: TestClient, auth_headers: dict[str, str]) -> None:
+        response = client.post(
+            self.endpoint, json={"url": "https://example.com", "questions": []}, headers=auth_headers
+        )
+
+        assert response.status_code == 422
+
+    def test_empty_question__returns_422(self, client: TestClient, auth_headers: dict[str, str]) -> None:
+        response = client.post(
+            self.endpoint, json={"url": "https://example.com", "questions": ["What?", ""]}, headers=auth_headers
+        )
+
+        assert response.status_code == 422
+
+    def test_user_is_unauthenticated(self, client: TestClient) -> None:
+        response = client.post(self.endpoint, json={"url": "https://example.com", "questions": ["What?"]})
+
+        assert response.status_code == 401
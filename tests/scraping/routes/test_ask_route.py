@@ -35,7 +35,7 @@ class TestPOST:
             "answer": mock_ai_response.answer,
         }
 
-        mock_scrape.assert_called_once_with("https://example.com")
+        mock_scrape.assert_called_once_with("https://example.com", None)
         mock_ai.assert_called_once_with("Test Content", "What is this about?")
 
     def test_ask_endpoint_failed_scraping__returns_error(
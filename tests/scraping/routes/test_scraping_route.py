@@ -32,7 +32,28 @@ class TestPOST:
             "references": mock_response.references,
         }
         assert response.status_code == 200
-        mock_scrape.assert_called_once_with(test_url)
+        mock_scrape.assert_called_once_with(test_url, None)
+
+    def test_large_response_and_client_accepts_gzip__returns_compressed_response(
+        self, client: TestClient, auth_headers: dict[str, str], mocker: MockerFixture
+    ) -> None:
+        mock_response = ScrapingResponse(
+            title="Test Title",
+            content="Test Content " * 200,
+            image_url="https://example.com/image.jpg",
+            categories=["test"],
+            references=["/wiki/Mercia"],
+            reference_base="https://en.wikipedia.org",
+        )
+        mocker.patch("scraping.router.webscrape_url", return_value=mock_response)
+
+        response = client.post(
+            self.endpoint, json={"url": "https://example.com"}, headers={**auth_headers, "Accept-Encoding": "gzip"}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.json()["references"] == ["https://en.wikipedia.org/wiki/Mercia"]
 
     def test_scrape_endpoint_failed_request(
         self, client: TestClient, auth_headers: dict[str, str], mocker: MockerFixture
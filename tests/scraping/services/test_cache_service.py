@@ -0,0 +1,107 @@
+from pytest_mock import MockerFixture
+
+import scraping.services.cache_service
+from scraping.models import ScrapingResponse
+from scraping.services.cache_service import ContentCompressor, ScrapeCache, SymbolTable
+from settings import settings
+
+
+def _article(number: int) -> ScrapingResponse:
+    return ScrapingResponse(
+        title=f"Article {number}",
+        content=f"Article {number} is about the Kingdom of Mercia and Offa's Dyke. " * 20,
+        image_url="https://example.com/image.jpg",
+        categories=["Mercia", f"Category {number}"],
+        references=["/wiki/Mercia", "/wiki/Offa", f"/wiki/Page_{number}"],
+        reference_base="https://en.wikipedia.org",
+    )
+
+
+class TestScrapeCache:
+    def test_put_and_get__round_trips_the_article(self, mocker: MockerFixture) -> None:
+        mocker.patch.object(settings, "SCRAPE_CACHE_MAX_BYTES", 1024 * 1024)
+        cache = ScrapeCache()
+
+        cache.put("https://example.com", "page", _article(1))
+
+        assert cache.get("https://example.com", "page") == _article(1)
+        assert cache.get("https://example.com", "parse_api") is None
+
+    def test_shared_strings__are_stored_once(self, mocker: MockerFixture) -> None:
+        mocker.patch.object(settings, "SCRAPE_CACHE_MAX_BYTES", 1024 * 1024)
+        cache = ScrapeCache()
+
+        cache.put("https://example.com/1", "page", _article(1))
+        cache.put("https://example.com/2", "page", _article(2))
+
+        # "Mercia", "/wiki/Mercia" and "/wiki/Offa" are shared, the rest are one per article
+        assert len(cache._symbols) == 3 + 2 * 2
+
+    def test_over_max_bytes__least_recently_used_is_evicted_and_its_symbols_released(
+        self, mocker: MockerFixture
+    ) -> None:
+        mocker.patch.object(settings, "SCRAPE_CACHE_MAX_BYTES", 1024 * 1024)
+        cache = ScrapeCache()
+        cache.put("https://example.com/1", "page", _article(1))
+        cache.put("https://example.com/2", "page", _article(2))
+        cache.get("https://example.com/1", "page")
+
+        mocker.patch.object(settings, "SCRAPE_CACHE_MAX_BYTES", cache.nbytes)
+        cache.put("https://example.com/3", "page", _article(3))
+
+        assert cache.get("https://example.com/2", "page") is None
+        assert cache.get("https://example.com/1", "page") == _article(1)
+        assert cache.get("https://example.com/3", "page") == _article(3)
+        assert len(cache._symbols) == 3 + 2 * 2
+
+    def test_expired__returns_none(self, mocker: MockerFixture) -> None:
+        mocker.patch.object(settings, "SCRAPE_CACHE_MAX_BYTES", 1024 * 1024)
+        mocker.patch.object(settings, "SCRAPE_CACHE_TTL_SECONDS", -1)
+        cache = ScrapeCache()
+
+        cache.put("https://example.com", "page", _article(1))
+
+        assert cache.get("https://example.com", "page") is None
+        assert cache.nbytes == 0
+
+    def test_disabled__nothing_is_cached(self) -> None:
+        cache = ScrapeCache()
+
+        cache.put("https://example.com", "page", _article(1))
+
+        assert len(cache) == 0
+
+
+class TestContentCompressor:
+    def test_after_training__dictionary_is_used_and_content_round_trips(self, mocker: MockerFixture) -> None:
+        mocker.patch.object(scraping.services.cache_service, "DICTIONARY_TRAINING_SAMPLES", 8)
+        compressor = ContentCompressor()
+        untrained = [compressor.compress(_article(number).content) for number in range(7)]
+
+        compressed, used_dictionary = compressor.compress(_article(8).content)
+
+        assert used_dictionary
+        assert compressor.decompress(compressed, used_dictionary) == _article(8).content
+        # Content compressed before the dictionary existed can still be read
+        assert not untrained[0][1]
+        assert compressor.decompress(*untrained[0]) == _article(0).content
+
+    def test_too_few_samples_to_train__content_is_compressed_without_dictionary(self, mocker: MockerFixture) -> None:
+        mocker.patch.object(scraping.services.cache_service, "DICTIONARY_TRAINING_SAMPLES", 2)
+        compressor = ContentCompressor()
+        compressor.compress(_article(1).content)
+
+        compressed, used_dictionary = compressor.compress(_article(2).content)
+
+        assert not used_dictionary
+        assert compressor.decompress(compressed, used_dictionary) == _article(2).content
+
+
+class TestSymbolTable:
+    def test_released_symbol__id_is_reused(self) -> None:
+        symbols = SymbolTable()
+        first = symbols.intern("a")
+        symbols.release(first)
+
+        assert symbols.intern("b") == first
+        assert symbols.lookup(first) == "b"
@@ -0,0 +1,62 @@
+import json
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+
+from scraping.services.extractive_qa_service import answer_locally, split_sentences
+from scraping.services.scraping_service import extract_data_from_html
+from settings import settings
+
+FIXTURES_DIR = Path(__file__).parent.parent.parent / "fixtures"
+CONTENT = (
+    "Offa was King of Mercia. The Mercian dyke was built in 785 by King Offa. It runs along the border with Wales."
+)
+
+
+class TestAnswerLocally:
+    def test_factoid_question__returns_matching_sentence(self) -> None:
+        local_answer = answer_locally(CONTENT, "When was the Mercian dyke built?")
+
+        assert local_answer is not None
+        assert local_answer.answer == "The Mercian dyke was built in 785 by King Offa."
+
+    @pytest.mark.parametrize(
+        "question",
+        [
+            "Why was the Mercian dyke built?",
+            "Was the Mercian dyke built by Offa?",
+            # The best sentence has no date in it
+            "When did the dyke run along the border with Wales?",
+            "What is the population of Wales today?",
+        ],
+    )
+    def test_not_confident__returns_none(self, question: str) -> None:
+        assert answer_locally(CONTENT, question) is None
+
+    def test_disabled__returns_none(self, mocker: MockerFixture) -> None:
+        mocker.patch.object(settings, "EXTRACTIVE_QA_ENABLED", False)
+
+        assert answer_locally(CONTENT, "When was the Mercian dyke built?") is None
+
+    def test_evaluation_set__local_answers_are_all_correct(self) -> None:
+        eval_set = json.loads((FIXTURES_DIR / "extractive-qa-eval.json").read_text())
+        content = extract_data_from_html((FIXTURES_DIR / eval_set["article"]).read_text()).content
+
+        answered = 0
+        for item in eval_set["questions"]:
+            local_answer = answer_locally(content, item["question"])
+            if local_answer is None:
+                continue
+            answered += 1
+            assert any(phrase in local_answer.answer for phrase in item["expected"]), item["question"]
+
+        # Catches the thresholds being tightened so far that the fast path stops doing anything
+        assert answered >= len(eval_set["questions"]) // 4
+
+
+class TestSplitSentences:
+    def test_abbreviations_and_headings__are_not_split_or_kept(self) -> None:
+        content = "History\nIt was dug c. 800 by St. Chad's men. It is 6 mi long!"
+
+        assert split_sentences(content) == ["It was dug c. 800 by St. Chad's men.", "It is 6 mi long!"]
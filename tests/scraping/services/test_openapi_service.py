@@ -1,12 +1,18 @@
 from collections.abc import Generator
 from unittest.mock import Mock, patch
 
+import httpx
 import pytest
 from fastapi import HTTPException
+from openai import BadRequestError
 from openai.types.chat import ChatCompletionMessage
 from openai.types.chat.chat_completion import ChatCompletion, Choice
 
-from scraping.services.openai_service import get_ai_response
+from scraping.models import QuestionAnswer
+from scraping.services.openai_service import get_ai_response, get_ai_responses
+
+LOCAL_ANSWER = "The Mercian dyke was built in 785 by King Offa."
+LOCAL_ANSWER_CONTENT = f"Offa was King of Mercia. {LOCAL_ANSWER} It runs along the border with Wales."
 
 
 class TestGetAIResponse:
@@ -35,7 +41,7 @@ class TestGetAIResponse:
 
     @pytest.fixture
     def mock_openai_client(self) -> Generator[Mock, None, None]:
-        with patch("scraping.services.openai_service.OpenAI") as mock_client:
+        with patch("openai.OpenAI") as mock_client:
             instance = mock_client.return_value
             yield instance
 
@@ -77,6 +83,12 @@ class TestGetAIResponse:
 
         assert response.answer == "No answer found in content"
 
+    def test_answered_locally__does_not_call_api(self, mock_openai_client: Mock) -> None:
+        response = get_ai_response(LOCAL_ANSWER_CONTENT, "When was the Mercian dyke built?")
+
+        assert response.answer == LOCAL_ANSWER
+        mock_openai_client.chat.completions.create.assert_not_called()
+
     def test_empty_content__raises_error(self, mock_openai_client: Mock) -> None:
         test_content = ""
         test_question = "Test question?"
@@ -95,8 +107,103 @@ class TestGetAIResponse:
 
         mock_openai_client.chat.completions.create.assert_not_called()
 
+    def test_context_length_exceeded__raises_413(self, mock_openai_client: Mock) -> None:
+        response = httpx.Response(400, request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+        mock_openai_client.chat.completions.create.side_effect = BadRequestError(
+            "Too many tokens", response=response, body={"code": "context_length_exceeded"}
+        )
+
+        with pytest.raises(HTTPException) as exc_info:
+            get_ai_response("Test content", "Test question")
+
+        assert exc_info.value.status_code == 413
+
     def test_api_error__raises_http_exception(self, mock_openai_client: Mock) -> None:
         mock_openai_client.chat.completions.create.side_effect = Exception("API Error")
 
         with pytest.raises(HTTPException) as exc_info:
             get_ai_response("Test content", "Test question")
+
+
+class TestGetAIResponses:
+    @pytest.fixture
+    def mock_openai_client(self) -> Generator[Mock, None, None]:
+        with patch("openai.OpenAI") as mock_client:
+            instance = mock_client.return_value
+            yield instance
+
+    def _completion(self, content: str | None) -> ChatCompletion:
+        return ChatCompletion(
+            id="test-id",
+            model="gpt-4-mini",
+            object="chat.completion",
+            created=1234567890,
+            choices=[
+                Choice(
+                    finish_reason="stop",
+                    index=0,
+                    message=ChatCompletionMessage(content=content, role="assistant"),
+                )
+            ],
+        )
+
+    def test_valid_input__returns_answer_per_question_from_one_completion(self, mock_openai_client: Mock) -> None:
+        mock_openai_client.chat.completions.create.return_value = self._completion('{"answers": ["First answer", ""]}')
+
+        response = get_ai_responses("Test Wikipedia content", ["First question?", "Second question?"])
+
+        assert response.answers == [
+            QuestionAnswer(question="First question?", answer="First answer"),
+            QuestionAnswer(question="Second question?", answer="No answer found in content"),
+        ]
+        mock_openai_client.chat.completions.create.assert_called_once()
+        call_kwargs = mock_openai_client.chat.completions.create.call_args.kwargs
+        assert call_kwargs["response_format"] == {"type": "json_object"}
+        prompt = call_kwargs["messages"][1]["content"]
+        assert prompt.count("Test Wikipedia content") == 1
+        assert "1. First question?\n2. Second question?" in prompt
+
+    @pytest.mark.parametrize("content", ["not json", '{"answers": ["Only one answer"]}', '{"other": []}', None])
+    def test_invalid_or_mismatched_answers__raises_http_exception(
+        self, mock_openai_client: Mock, content: str | None
+    ) -> None:
+        mock_openai_client.chat.completions.create.return_value = self._completion(content)
+
+        with pytest.raises(HTTPException) as exc_info:
+            get_ai_responses("Test Wikipedia content", ["First question?", "Second question?"])
+
+        assert exc_info.value.status_code == 500
+
+    def test_context_length_exceeded__raises_413(self, mock_openai_client: Mock) -> None:
+        response = httpx.Response(400, request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+        mock_openai_client.chat.completions.create.side_effect = BadRequestError(
+            "Too many tokens", response=response, body={"code": "context_length_exceeded"}
+        )
+
+        with pytest.raises(HTTPException) as exc_info:
+            get_ai_responses("Test Wikipedia content", ["First question?", "Second question?"])
+
+        assert exc_info.value.status_code == 413
+
+    def test_some_questions_answered_locally__only_the_rest_go_to_the_completion(
+        self, mock_openai_client: Mock
+    ) -> None:
+        mock_openai_client.chat.completions.create.return_value = self._completion('{"answers": ["LLM answer"]}')
+
+        response = get_ai_responses(
+            LOCAL_ANSWER_CONTENT, ["When was the Mercian dyke built?", "Why was the dyke built?"]
+        )
+
+        assert response.answers == [
+            QuestionAnswer(question="When was the Mercian dyke built?", answer=LOCAL_ANSWER),
+            QuestionAnswer(question="Why was the dyke built?", answer="LLM answer"),
+        ]
+        prompt = mock_openai_client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+        assert "1. Why was the dyke built?" in prompt
+        assert "When was the Mercian dyke built?" not in prompt
+
+    def test_empty_question__does_not_call_api(self, mock_openai_client: Mock) -> None:
+        with pytest.raises(HTTPException):
+            get_ai_responses("Test Wikipedia content", ["First question?", ""])
+
+        mock_openai_client.chat.completions.create.assert_not_called()
@@ -1,18 +1,69 @@
-from typing import Self
+import json
+from collections.abc import AsyncGenerator, AsyncIterator
+from typing import Any, Self
 
 import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
 from fastapi import HTTPException
 from pytest_mock import MockerFixture
 
 from scraping.models import ScrapingResponse
-from scraping.services.scraping_service import extract_data_from_html, webscrape_url
+from scraping.services.scraping_service import (
+    _build_parse_api_url,
+    extract_data_from_html,
+    extract_data_from_parse_api,
+    webscrape_url,
+)
+
+# Written by hand rather than taken from a real response, so it doesn't have to agree with the full page fixture
+IPOD_PARSE_API_PAYLOAD: dict[str, Any] = {
+    "parse": {
+        "title": "IPod",
+        "pageid": 1,
+        "displaytitle": '<span class="mw-page-title-main">iPod</span>',
+        "text": (
+            '<div class="mw-content-ltr mw-parser-output" lang="en" dir="ltr">'
+            '<table class="infobox"><tbody><tr><td><a href="/wiki/File:IPod.jpg" class="mw-file-description">'
+            '<img src="//upload.wikimedia.org/wikipedia/commons/thumb/a/ab/IPod.jpg/220px-IPod.jpg"></a></td></tr>'
+            "</tbody></table>"
+            "<p>The <b>iPod</b> is a discontinued series of portable media players designed by "
+            '<a href="/wiki/Apple_Inc.">Apple Inc.</a><sup class="reference"><a href="#cite_note-1">[1]</a></sup></p>'
+            '<div class="mw-heading mw-heading2"><h2 id="History">History</h2><span class="mw-editsection">'
+            '[<a href="/w/index.php?title=IPod&amp;action=edit&amp;section=1">edit</a>]</span></div>'
+            '<p>The first version was released on <a href="/wiki/October_23">October 23</a>, 2001.</p>'
+            '<div class="mw-heading mw-heading2"><h2 id="See_also">See also</h2></div>'
+            '<ul><li><a href="/wiki/Zune">Zune</a></li></ul>'
+            "</div>"
+        ),
+        "categories": [
+            {"sortkey": "", "category": "Apple_Inc._hardware"},
+            {"sortkey": "", "category": "Portable_media_players"},
+            {"sortkey": "", "category": "Articles_with_short_description", "hidden": True},
+        ],
+    }
+}
 
 
 # Decision: This could have been in another file to allow better re-use in a real project but I'll leave it here for now
+class MockStreamReader:
+    def __init__(self, body: bytes) -> None:
+        self._body = body
+
+    async def iter_chunked(self, size: int) -> AsyncIterator[bytes]:
+        for start in range(0, len(self._body), size):
+            yield self._body[start : start + size]
+
+
 class MockAsyncResponse:
     def __init__(self, text: str, status: int) -> None:
         self._text = text
         self.status = status
+        self.headers: dict[str, str] = {}
+        self.content = MockStreamReader(text.encode())
+        self.content_length = None
+        self.charset = "utf-8"
 
     async def text(self) -> str:
         return self._text
@@ -59,6 +110,131 @@ class TestWebscrapeURL:
             await webscrape_url("https://test.com")
 
 
+@pytest_asyncio.fixture
+async def mediawiki_server() -> AsyncGenerator[TestServer, None]:
+    """
+    Local stand in for en.wikipedia.org, serving the Nico Ditch fixtures as both the full page and the parse API.
+    """
+    with open("tests/fixtures/nico-ditch.html") as f:
+        page_html = f.read()
+    with open("tests/fixtures/nico-ditch-parse.json") as f:
+        parse_api_json = f.read()
+
+    async def page(_request: web.Request) -> web.Response:
+        return web.Response(text=page_html, content_type="text/html")
+
+    async def api(request: web.Request) -> web.Response:
+        # MediaWiki treats underscores and spaces in titles the same
+        title = request.query.get("page", "").replace("_", " ")
+        if title == "Broken Page":
+            # e.g. an error page from a proxy in front of the api
+            return web.Response(text="<html>Service unavailable</html>", content_type="text/html")
+        if request.query.get("action") != "parse" or title != "Nico Ditch":
+            error = {"error": {"code": "missingtitle", "info": "The page you specified doesn't exist."}}
+            return web.Response(text=json.dumps(error), content_type="application/json")
+        return web.Response(text=parse_api_json, content_type="application/json")
+
+    app = web.Application()
+    app.router.add_get("/wiki/Nico_Ditch", page)
+    app.router.add_get("/w/api.php", api)
+    server = TestServer(app)
+    await server.start_server()
+    yield server
+    await server.close()
+
+
+@pytest.mark.asyncio
+class TestWebscrapeURLFetchModes:
+    async def test_parse_api_mode__returns_same_data_as_page_mode(self, mediawiki_server: TestServer) -> None:
+        url = str(mediawiki_server.make_url("/wiki/Nico_Ditch"))
+
+        page_response = await webscrape_url(url, "page")
+        parse_api_response = await webscrape_url(url, "parse_api")
+
+        assert parse_api_response == page_response
+
+    async def test_parse_api_mode_from_settings__uses_parse_api(
+        self, mediawiki_server: TestServer, mocker: MockerFixture
+    ) -> None:
+        mocker.patch("scraping.services.scraping_service.settings.SCRAPE_FETCH_MODE", "parse_api")
+        extract_mock = mocker.patch("scraping.services.scraping_service.extract_data_from_html")
+
+        response = await webscrape_url(str(mediawiki_server.make_url("/wiki/Nico_Ditch")))
+
+        assert response.title == "Nico Ditch"
+        extract_mock.assert_not_called()
+
+    async def test_parse_api_returns_error__raises_http_exception(self, mediawiki_server: TestServer) -> None:
+        with pytest.raises(HTTPException):
+            await webscrape_url(str(mediawiki_server.make_url("/wiki/Missing_Page")), "parse_api")
+
+    async def test_parse_api_returns_invalid_json__raises_http_exception(self, mediawiki_server: TestServer) -> None:
+        with pytest.raises(HTTPException) as exc_info:
+            await webscrape_url(str(mediawiki_server.make_url("/wiki/Broken_Page")), "parse_api")
+
+        assert exc_info.value.status_code == 500
+
+
+class TestBuildParseAPIURL:
+    def test_wiki_url__returns_parse_api_url(self) -> None:
+        assert _build_parse_api_url("https://en.wikipedia.org/wiki/Denton,_Greater_Manchester") == (
+            "https://en.wikipedia.org/w/api.php?action=parse&page=Denton%2C_Greater_Manchester"
+            "&prop=text%7Ccategories%7Cdisplaytitle&redirects=1&format=json&formatversion=2"
+        )
+
+    @pytest.mark.parametrize("url", ["https://example.com", "https://en.wikipedia.org/wiki/", "not a url"])
+    def test_not_a_wiki_page_url__returns_none(self, url: str) -> None:
+        assert _build_parse_api_url(url) is None
+
+
+class TestExtractDataFromParseAPI:
+    def test_real_world_example__matches_full_page_extraction(self) -> None:
+        with open("tests/fixtures/nico-ditch-parse.json") as f:
+            payload = json.load(f)
+        with open("tests/fixtures/nico-ditch.html") as f:
+            html = f.read()
+
+        response = extract_data_from_parse_api(payload)
+
+        assert response == extract_data_from_html(html)
+        # Hidden maintenance categories shouldn't be included
+        assert "Articles with short description" not in response.categories
+
+    def test_handwritten_payload__returns_expected_data(self) -> None:
+        response = extract_data_from_parse_api(IPOD_PARSE_API_PAYLOAD)
+
+        assert response == ScrapingResponse(
+            # From displaytitle, "title" has MediaWiki's capitalised first letter
+            title="iPod",
+            content=(
+                "The iPod is a discontinued series of portable media players designed by Apple Inc.\n"
+                "History\n"
+                "The first version was released on October 23, 2001."
+            ),
+            image_url="https://upload.wikimedia.org/wikipedia/commons/thumb/a/ab/IPod.jpg/220px-IPod.jpg",
+            categories=["Apple Inc. hardware", "Portable media players"],
+            references=["/wiki/Apple_Inc.", "/wiki/October_23", "/wiki/Zune"],
+            reference_base="https://en.wikipedia.org",
+        )
+
+    @pytest.mark.parametrize(
+        "payload",
+        [
+            {"error": {"code": "missingtitle"}},
+            [],
+            None,
+            {"parse": {"title": "IPod"}},
+            {"parse": {**IPOD_PARSE_API_PAYLOAD["parse"], "categories": [{"sortkey": ""}]}},
+            {"parse": {**IPOD_PARSE_API_PAYLOAD["parse"], "text": None}},
+        ],
+    )
+    def test_error_or_incomplete_payload__raises_http_exception(self, payload: Any) -> None:
+        with pytest.raises(HTTPException) as exc_info:
+            extract_data_from_parse_api(payload)
+
+        assert exc_info.value.status_code == 500
+
+
 class TestExtractDataFromHTML:
     def test_real_world_example(self) -> None:
         with open("tests/fixtures/nico-ditch.html") as f:
@@ -83,7 +259,9 @@ class TestExtractDataFromHTML:
             "Scheduled monuments in Greater Manchester",
             "Linear earthworks",
         ]
-        assert response.references == [
+        # References are stored as paths and only joined with the base url when serialized
+        assert response.references[0] == "/wiki/Levenshulme"
+        assert response.model_dump()["references"] == [
             "https://en.wikipedia.org/wiki/Levenshulme",
             "https://en.wikipedia.org/wiki/Greater_Manchester",
             "https://en.wikipedia.org/wiki/Anglo-Saxon_England",
@@ -0,0 +1,83 @@
+import gzip
+import json
+from collections.abc import Callable
+
+import brotli  # type: ignore[import-untyped]
+import pytest
+import zstandard
+
+from scraping.models import ScrapingResponse
+from scraping.services.serialization_service import encode_json_response, negotiate_encoding
+
+
+class TestNegotiateEncoding:
+    @pytest.mark.parametrize(
+        "accept_encoding, expected",
+        [
+            (None, None),
+            ("", None),
+            ("identity", None),
+            ("gzip", "gzip"),
+            ("deflate, gzip;q=0.5", "gzip"),
+            ("gzip;q=0", None),
+            ("*", "zstd"),
+            ("GZIP", "gzip"),
+            ("gzip, br", "br"),
+            ("gzip, br, zstd", "zstd"),
+            ("br;q=0.5, gzip", "gzip"),
+            ("zstd;q=0, *", "br"),
+        ],
+    )
+    def test_accept_encoding__returns_expected_encoding(
+        self, accept_encoding: str | None, expected: str | None
+    ) -> None:
+        assert negotiate_encoding(accept_encoding) == expected
+
+
+class TestEncodeJSONResponse:
+    @pytest.fixture
+    def scraping_response(self) -> ScrapingResponse:
+        return ScrapingResponse(
+            title="Test Title",
+            content="Test Content " * 200,
+            image_url="https://example.com/image.jpg",
+            categories=["test"],
+            references=["/wiki/Mercia", "/wiki/Wessex"],
+            reference_base="https://en.wikipedia.org",
+        )
+
+    def test_references_are_joined_with_base__and_base_is_not_serialized(
+        self, scraping_response: ScrapingResponse
+    ) -> None:
+        response = encode_json_response(scraping_response)
+
+        body = json.loads(bytes(response.body))
+        assert body["references"] == ["https://en.wikipedia.org/wiki/Mercia", "https://en.wikipedia.org/wiki/Wessex"]
+        assert "reference_base" not in body
+        assert "Content-Encoding" not in response.headers
+
+    @pytest.mark.parametrize(
+        "encoding, decompress",
+        [
+            ("gzip", gzip.decompress),
+            ("br", brotli.decompress),
+            ("zstd", zstandard.decompress),
+        ],
+    )
+    def test_client_accepts_encoding__returns_compressed_body(
+        self, scraping_response: ScrapingResponse, encoding: str, decompress: Callable[[bytes], bytes]
+    ) -> None:
+        response = encode_json_response(scraping_response, encoding)
+
+        assert response.headers["Content-Encoding"] == encoding
+        assert json.loads(decompress(bytes(response.body))) == scraping_response.model_dump()
+
+    def test_small_body__is_not_compressed(self) -> None:
+        small_response = ScrapingResponse(
+            title="Test Title", content="Test Content", image_url="", categories=[], references=[]
+        )
+
+        response = encode_json_response(small_response, "gzip")
+
+        assert "Content-Encoding" not in response.headers
+        assert json.loads(bytes(response.body)) == small_response.model_dump()
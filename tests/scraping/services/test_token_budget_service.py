@@ -0,0 +1,83 @@
+import logging
+
+import pytest
+from fastapi import HTTPException
+from pytest_mock import MockerFixture
+
+from scraping.services.token_budget_service import PROMPT_OVERHEAD_TOKENS, count_tokens, fit_content_to_budget
+from settings import settings
+
+LEAD = "Nico Ditch is a six-mile long linear earthwork between Ashton-under-Lyne and Stretford."
+HISTORY_HEADING = "History"
+HISTORY = "The ditch was probably built as a defensive fortification in the Anglo-Saxon period."
+ETYMOLOGY_HEADING = "Etymology"
+ETYMOLOGY = "The name Nico is thought to derive from the Old English word Nickar, meaning a water spirit."
+CONTENT = "\n".join([LEAD, HISTORY_HEADING, HISTORY, ETYMOLOGY_HEADING, ETYMOLOGY])
+
+
+class TestFitContentToBudget:
+    @pytest.fixture(autouse=True)
+    def approximate_tokenizer(self, mocker: MockerFixture) -> None:
+        # Use the regex tokenizer so the counts don't depend on whether tiktoken is installed
+        mocker.patch("scraping.services.token_budget_service._get_encoding", return_value=None)
+
+    def _set_content_budget(self, mocker: MockerFixture, question: str, content_tokens: int) -> None:
+        mocker.patch.object(
+            settings, "OPENAI_MAX_INPUT_TOKENS", content_tokens + PROMPT_OVERHEAD_TOKENS + count_tokens(question)
+        )
+
+    def test_content_fits__returns_content_unchanged(self, mocker: MockerFixture) -> None:
+        self._set_content_budget(mocker, "Where is it?", count_tokens(CONTENT))
+
+        assert fit_content_to_budget(CONTENT, "Where is it?") == CONTENT
+
+    def test_lead_first__keeps_lines_from_the_start(self, mocker: MockerFixture) -> None:
+        mocker.patch.object(settings, "TOKEN_TRUNCATION_POLICY", "lead_first")
+        question = "Where does the name come from?"
+        self._set_content_budget(mocker, question, count_tokens(f"{LEAD}\n{HISTORY_HEADING}\n{HISTORY}") + 3)
+
+        assert fit_content_to_budget(CONTENT, question) == f"{LEAD}\n{HISTORY_HEADING}\n{HISTORY}"
+
+    def test_section_priority__keeps_lead_and_most_relevant_section(self, mocker: MockerFixture) -> None:
+        mocker.patch.object(settings, "TOKEN_TRUNCATION_POLICY", "section_priority")
+        question = "What does the name Nickar mean?"
+        self._set_content_budget(mocker, question, count_tokens(f"{LEAD}\n{ETYMOLOGY_HEADING}\n{ETYMOLOGY}") + 3)
+
+        assert fit_content_to_budget(CONTENT, question) == f"{LEAD}\n{ETYMOLOGY_HEADING}\n{ETYMOLOGY}"
+
+    def test_sentence_dedup__removes_repeated_sentences(self, mocker: MockerFixture) -> None:
+        mocker.patch.object(settings, "TOKEN_TRUNCATION_POLICY", "sentence_dedup")
+        content = f"{LEAD} {HISTORY}\n{HISTORY}\n{ETYMOLOGY}"
+        question = "Where is it?"
+        self._set_content_budget(mocker, question, count_tokens(content) - 1)
+
+        assert fit_content_to_budget(content, question) == f"{LEAD} {HISTORY}\n{ETYMOLOGY}"
+
+    def test_first_paragraph_too_long__truncates_by_sentence(self, mocker: MockerFixture) -> None:
+        mocker.patch.object(settings, "TOKEN_TRUNCATION_POLICY", "lead_first")
+        content = f"{LEAD} {HISTORY}"
+        question = "Where is it?"
+        self._set_content_budget(mocker, question, count_tokens(LEAD) + 1)
+
+        assert fit_content_to_budget(content, question) == LEAD
+
+    def test_question_leaves_no_room_for_content__raises_413(self, mocker: MockerFixture) -> None:
+        question = "word " * 100
+        mocker.patch.object(settings, "OPENAI_MAX_INPUT_TOKENS", PROMPT_OVERHEAD_TOKENS + count_tokens(question))
+
+        with pytest.raises(HTTPException) as exc_info:
+            fit_content_to_budget(CONTENT, question)
+
+        assert exc_info.value.status_code == 413
+
+    def test_content_truncated__logs_tokens_saved(
+        self, mocker: MockerFixture, caplog: pytest.LogCaptureFixture
+    ) -> None:
+        mocker.patch.object(settings, "TOKEN_TRUNCATION_POLICY", "lead_first")
+        self._set_content_budget(mocker, "Where is it?", count_tokens(LEAD) + 1)
+
+        with caplog.at_level(logging.INFO):
+            budgeted_content = fit_content_to_budget(CONTENT, "Where is it?")
+
+        [record] = caplog.records
+        assert vars(record)["tokens_saved"] == count_tokens(CONTENT) - count_tokens(budgeted_content)
@@ -0,0 +1,166 @@
+import gzip
+import zlib
+from collections.abc import AsyncGenerator, Callable
+
+import aiohttp
+import brotli  # type: ignore[import-untyped]
+import pytest
+import pytest_asyncio
+import zstandard
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from fastapi import HTTPException
+from pytest_mock import MockerFixture
+
+from scraping.services.transfer_service import CHUNK_SIZE, DECOMPRESSOR_FACTORIES, fetch_text
+from settings import settings
+
+RECEIVED_HEADERS = web.AppKey("received_headers", dict[str, str])
+
+PAGE = "<html><body><p>Nico Ditch is a six-mile (9.7 km) long linear earthwork</p></body></html>" * 100
+
+COMPRESSORS: dict[str, Callable[[bytes], bytes]] = {
+    "zstd": zstandard.ZstdCompressor().compress,
+    "br": brotli.compress,
+    "gzip": gzip.compress,
+    "deflate": zlib.compress,
+}
+# ~10KB on the wire, 10MB once decompressed
+BOMB = b"0" * 10 * 1024 * 1024
+
+
+@pytest_asyncio.fixture
+async def server() -> AsyncGenerator[TestServer, None]:
+    received_headers: dict[str, str] = {}
+
+    async def plain(request: web.Request) -> web.Response:
+        received_headers.update(request.headers)
+        return web.Response(text=PAGE, content_type="text/html")
+
+    async def compressed(request: web.Request) -> web.Response:
+        encoding = request.match_info["encoding"]
+        return web.Response(
+            body=COMPRESSORS[encoding](PAGE.encode()),
+            headers={"Content-Encoding": encoding, "Content-Type": "text/html"},
+        )
+
+    async def bomb(request: web.Request) -> web.Response:
+        encoding = request.match_info["encoding"]
+        return web.Response(body=COMPRESSORS[encoding](BOMB), headers={"Content-Encoding": encoding})
+
+    async def corrupt(request: web.Request) -> web.Response:
+        return web.Response(body=b"not compressed" * 10, headers={"Content-Encoding": request.match_info["encoding"]})
+
+    async def chunked(request: web.Request) -> web.StreamResponse:
+        # No Content-Length, so the size can only be checked while streaming
+        response = web.StreamResponse()
+        await response.prepare(request)
+        for _ in range(10):
+            await response.write(b"0" * 1024)
+        await response.write_eof()
+        return response
+
+    async def unknown_encoding(_request: web.Request) -> web.Response:
+        return web.Response(body=b"???", headers={"Content-Encoding": "compress"})
+
+    app = web.Application()
+    app.router.add_get("/plain", plain)
+    app.router.add_get("/compressed/{encoding}", compressed)
+    app.router.add_get("/bomb/{encoding}", bomb)
+    app.router.add_get("/corrupt/{encoding}", corrupt)
+    app.router.add_get("/chunked", chunked)
+    app.router.add_get("/unknown-encoding", unknown_encoding)
+    app[RECEIVED_HEADERS] = received_headers
+    test_server = TestServer(app)
+    await test_server.start_server()
+    yield test_server
+    await test_server.close()
+
+
+@pytest_asyncio.fixture
+async def session() -> AsyncGenerator[aiohttp.ClientSession, None]:
+    async with aiohttp.ClientSession(auto_decompress=False) as session:
+        yield session
+
+
+@pytest.mark.asyncio
+class TestFetchText:
+    @pytest.mark.parametrize(
+        "path", ["/plain", "/compressed/zstd", "/compressed/br", "/compressed/gzip", "/compressed/deflate"]
+    )
+    async def test_supported_encodings__returns_decoded_text(
+        self, server: TestServer, session: aiohttp.ClientSession, path: str
+    ) -> None:
+        assert await fetch_text(session, str(server.make_url(path))) == PAGE
+
+    async def test_advertises_supported_encodings(self, server: TestServer, session: aiohttp.ClientSession) -> None:
+        await fetch_text(session, str(server.make_url("/plain")))
+
+        assert server.app[RECEIVED_HEADERS]["Accept-Encoding"] == "zstd, br, gzip, deflate"
+
+    @pytest.mark.parametrize("encoding", COMPRESSORS)
+    async def test_decompressed_size_over_limit__aborts(
+        self, server: TestServer, session: aiohttp.ClientSession, mocker: MockerFixture, encoding: str
+    ) -> None:
+        mocker.patch.object(settings, "SCRAPE_MAX_DECOMPRESSED_BYTES", 1024 * 1024)
+
+        with pytest.raises(HTTPException) as exc_info:
+            await fetch_text(session, str(server.make_url(f"/bomb/{encoding}")))
+
+        assert exc_info.value.status_code == 502
+        assert exc_info.value.detail == "Page is too large to scrape"
+
+    async def test_content_length_over_limit__aborts_before_reading_body(
+        self, server: TestServer, session: aiohttp.ClientSession, mocker: MockerFixture
+    ) -> None:
+        mocker.patch.object(settings, "SCRAPE_MAX_COMPRESSED_BYTES", 100)
+
+        with pytest.raises(HTTPException) as exc_info:
+            await fetch_text(session, str(server.make_url("/plain")))
+
+        assert exc_info.value.status_code == 502
+        assert exc_info.value.detail == "Page is too large to scrape"
+
+    async def test_streamed_size_over_limit__aborts(
+        self, server: TestServer, session: aiohttp.ClientSession, mocker: MockerFixture
+    ) -> None:
+        mocker.patch.object(settings, "SCRAPE_MAX_COMPRESSED_BYTES", 5 * 1024)
+
+        with pytest.raises(HTTPException) as exc_info:
+            await fetch_text(session, str(server.make_url("/chunked")))
+
+        assert exc_info.value.status_code == 502
+        assert exc_info.value.detail == "Page is too large to scrape"
+
+    @pytest.mark.parametrize(
+        "path", ["/unknown-encoding", "/missing", *(f"/corrupt/{encoding}" for encoding in COMPRESSORS)]
+    )
+    async def test_unsupported_encoding_or_error_status__raises_http_exception(
+        self, server: TestServer, session: aiohttp.ClientSession, path: str
+    ) -> None:
+        with pytest.raises(HTTPException) as exc_info:
+            await fetch_text(session, str(server.make_url(path)))
+
+        assert exc_info.value.detail == "Failed to scrape website"
+
+
+class TestDecompressors:
+    @pytest.mark.parametrize("encoding", COMPRESSORS)
+    def test_bomb__output_is_bounded(self, encoding: str) -> None:
+        decompress = DECOMPRESSOR_FACTORIES[encoding]()
+
+        output = decompress(COMPRESSORS[encoding](BOMB), 1024)
+
+        # Reaching max_length is how the limit is signalled, but the bomb mustn't be inflated much further than that
+        assert 1024 <= len(output) <= 1024 + CHUNK_SIZE
+
+    @pytest.mark.parametrize("encoding", COMPRESSORS)
+    def test_split_into_chunks__returns_whole_page(self, encoding: str) -> None:
+        decompress = DECOMPRESSOR_FACTORIES[encoding]()
+        compressed = COMPRESSORS[encoding](PAGE.encode())
+
+        output = b"".join(
+            decompress(compressed[start : start + 100], 1024 * 1024) for start in range(0, len(compressed), 100)
+        )
+
+        assert output == PAGE.encode()
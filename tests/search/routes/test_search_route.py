@@ -0,0 +1,45 @@
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from pytest_mock import MockerFixture
+
+from scraping.models import ScrapingResponse
+from search.services.index_service import search_index
+from settings import settings
+
+
+class TestGET:
+    def test_search__returns_scraped_articles(
+        self, client: TestClient, auth_headers: dict[str, str], mocker: MockerFixture, tmp_path: Path
+    ) -> None:
+        mocker.patch.object(settings, "SEARCH_INDEX_DIR", str(tmp_path))
+        search_index.add(
+            "https://en.wikipedia.org/wiki/Nico_Ditch",
+            ScrapingResponse(
+                title="Nico Ditch",
+                content="Nico Ditch is a 6-mile long linear earthwork between Ashton-under-Lyne and Stretford.",
+                image_url="",
+                categories=["Earthworks"],
+                references=[],
+            ),
+        )
+        search_index.flush()
+
+        response = client.get("/search", params={"q": "earthwork"}, headers=auth_headers)
+
+        assert response.status_code == 200
+        hits = response.json()["hits"]
+        assert len(hits) == 1
+        assert hits[0]["url"] == "https://en.wikipedia.org/wiki/Nico_Ditch"
+        assert hits[0]["categories"] == ["Earthworks"]
+        assert "earthwork" in hits[0]["snippet"]
+
+    def test_search_disabled__returns_404(self, client: TestClient, auth_headers: dict[str, str]) -> None:
+        response = client.get("/search", params={"q": "earthwork"}, headers=auth_headers)
+
+        assert response.status_code == 404
+
+    def test_no_credentials__returns_401(self, client: TestClient) -> None:
+        response = client.get("/search", params={"q": "earthwork"})
+
+        assert response.status_code == 401
@@ -0,0 +1,170 @@
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+
+from scraping.models import ScrapingResponse
+from search.services.index_service import SearchIndex, _build_snippet
+from search.services.segment_service import SegmentReader
+from settings import settings
+
+
+def _article(title: str, content: str, categories: list[str] | None = None) -> ScrapingResponse:
+    return ScrapingResponse(
+        title=title,
+        content=content,
+        image_url="",
+        categories=categories or [],
+        references=[],
+    )
+
+
+@pytest.fixture
+def index(mocker: MockerFixture, tmp_path: Path) -> SearchIndex:
+    mocker.patch.object(settings, "SEARCH_INDEX_DIR", str(tmp_path))
+    return SearchIndex()
+
+
+class TestSearchIndex:
+    def test_search__ranks_title_matches_first_and_returns_snippets(self, index: SearchIndex) -> None:
+        index.add("https://example.com/hastings", _article("Battle of Hastings", "Fought in 1066 near Hastings."))
+        index.add("https://example.com/normans", _article("Normans", "The Normans won the battle at Hastings."))
+        index.flush()
+
+        hits = index.search("hastings", limit=10)
+
+        assert [hit.url for hit in hits] == ["https://example.com/hastings", "https://example.com/normans"]
+        assert hits[1].snippet == "The Normans won the battle at Hastings."
+        assert index.search("waterloo", limit=10) == []
+
+    def test_same_url_indexed_again__only_latest_version_is_returned(self, index: SearchIndex) -> None:
+        index.add("https://example.com/page", _article("Old title", "Hastings"))
+        index.flush()
+        index.add("https://example.com/page", _article("New title", "Hastings"))
+        index.flush()
+
+        hits = index.search("hastings", limit=10)
+
+        assert [hit.title for hit in hits] == ["New title"]
+
+    def test_only_old_version_of_url_matches__nothing_is_returned(
+        self, mocker: MockerFixture, index: SearchIndex
+    ) -> None:
+        mocker.patch.object(settings, "SEARCH_MAX_SEGMENTS", 1)
+        index.add("https://example.com/page", _article("Old title", "Zebra"))
+        index.flush()
+        index.add("https://example.com/page", _article("New title", "Horse"))
+        index.flush()
+
+        assert index.search("zebra", limit=10) == []
+        assert [hit.title for hit in index.search("horse", limit=10)] == ["New title"]
+
+        index.merge()
+
+        assert index.search("zebra", limit=10) == []
+        assert [hit.title for hit in index.search("horse", limit=10)] == ["New title"]
+
+    def test_merge__combines_smallest_segments_and_keeps_results(
+        self, mocker: MockerFixture, index: SearchIndex, tmp_path: Path
+    ) -> None:
+        mocker.patch.object(settings, "SEARCH_MAX_SEGMENTS", 2)
+        mocker.patch.object(settings, "SEARCH_MERGE_FACTOR", 3)
+        for number in range(4):
+            index.add(f"https://example.com/{number}", _article(f"Page {number}", "Mercia"))
+            index.flush()
+        assert len(list(tmp_path.glob("*.seg"))) == 4
+
+        index.merge()
+
+        assert len(list(tmp_path.glob("*.seg"))) == 2
+        assert len(index.search("mercia", limit=10)) == 4
+
+    def test_flush_fails__articles_are_kept_for_the_next_flush(
+        self, mocker: MockerFixture, index: SearchIndex, tmp_path: Path
+    ) -> None:
+        index.add("https://example.com/hastings", _article("Battle of Hastings", "Fought in 1066."))
+        write_segment = mocker.patch(
+            "search.services.index_service.write_segment", side_effect=OSError("No space left on device")
+        )
+        with pytest.raises(OSError):
+            index.flush()
+        index.add("https://example.com/normans", _article("Normans", "Hastings again."))
+        mocker.stop(write_segment)
+
+        index.flush()
+
+        assert len(list(tmp_path.glob("*.seg"))) == 1
+        assert {hit.url for hit in index.search("hastings", limit=10)} == {
+            "https://example.com/hastings",
+            "https://example.com/normans",
+        }
+
+    def test_search__scores_without_holding_the_segments_lock(self, mocker: MockerFixture, index: SearchIndex) -> None:
+        index.add("https://example.com/hastings", _article("Battle of Hastings", "Fought in 1066."))
+        index.flush()
+        postings = SegmentReader.postings
+        locked_while_scoring = []
+
+        def record_lock(segment: SegmentReader, term: str, limit: int | None = None) -> object:
+            locked_while_scoring.append(index._segments_lock.locked())
+            return postings(segment, term, limit)
+
+        mocker.patch.object(SegmentReader, "postings", record_lock)
+
+        assert len(index.search("hastings", limit=10)) == 1
+        assert locked_while_scoring == [False]
+
+    def test_segment_merged_away__reader_is_left_open_for_running_searches(
+        self, mocker: MockerFixture, index: SearchIndex
+    ) -> None:
+        mocker.patch.object(settings, "SEARCH_MAX_SEGMENTS", 1)
+        for number in range(2):
+            index.add(f"https://example.com/{number}", _article(f"Page {number}", "Mercia"))
+            index.flush()
+        index.search("mercia", limit=10)
+        # What a search that started before the merge would be holding on to
+        old_segments = list(index._segments.values())
+
+        index.merge()
+
+        assert len(index.search("mercia", limit=10)) == 2
+        assert all(segment.postings("mercia") is not None for segment in old_segments)
+
+    def test_common_term__only_highest_impact_postings_are_scored(
+        self, mocker: MockerFixture, index: SearchIndex
+    ) -> None:
+        mocker.patch.object(settings, "SEARCH_MAX_POSTINGS_PER_TERM", 2)
+        index.add("https://example.com/passing", _article("Wessex", "Mercia was north of here."))
+        index.add("https://example.com/mercia", _article("Mercia", "Mercia was a kingdom."))
+        index.add("https://example.com/offa", _article("Offa", "King of Mercia."))
+        index.flush()
+        index.add("https://example.com/penda", _article("Penda of Mercia", "King of Mercia."))
+        index.flush()
+
+        hits = index.search("mercia", limit=10)
+
+        # Two postings from the first segment and one from the second, the passing mention in the longest article is
+        # the one left out
+        assert [hit.url for hit in hits] == [
+            "https://example.com/mercia",
+            "https://example.com/penda",
+            "https://example.com/offa",
+        ]
+
+    def test_disabled__nothing_is_written(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        mocker.patch.object(settings, "SEARCH_INDEX_DIR", None)
+        index = SearchIndex()
+        index.add("https://example.com", _article("Title", "Content"))
+        index.flush()
+
+        assert list(tmp_path.iterdir()) == []
+
+    def test_build_snippet__centres_on_first_match(self) -> None:
+        content = " ".join(["filler"] * 100) + " the battle of Hastings " + " ".join(["filler"] * 100)
+
+        snippet = _build_snippet(content, ["hastings"])
+
+        assert snippet.startswith("…")
+        assert snippet.endswith("…")
+        assert "Hastings" in snippet
+        assert len(snippet) <= 202
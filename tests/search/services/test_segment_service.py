@@ -0,0 +1,72 @@
+from pathlib import Path
+
+from search.services.segment_service import MAX_TOKEN_LENGTH, Document, SegmentReader, tokenize, write_segment
+
+DOCUMENTS = [
+    Document(
+        url="https://en.wikipedia.org/wiki/Offa%27s_Dyke",
+        title="Offa's Dyke",
+        categories=["Mercia"],
+        content="A large earthwork along the border between England and Wales.",
+        indexed_at=1.0,
+    ),
+    Document(
+        url="https://en.wikipedia.org/wiki/Wat%27s_Dyke",
+        title="Wat's Dyke",
+        categories=["Mercia", "Earthworks"],
+        content="An earthwork running parallel to Offa's Dyke.",
+        indexed_at=2.0,
+    ),
+]
+
+
+class TestSegment:
+    def test_write_and_read__postings_and_stored_fields_round_trip(self, tmp_path: Path) -> None:
+        path = tmp_path / "1.seg"
+        write_segment(path, DOCUMENTS)
+        reader = SegmentReader(path)
+
+        assert reader.document_count == 2
+        doc_ids, frequencies = reader.postings("earthwork")  # type: ignore[misc]
+        assert list(doc_ids) == [0, 1]
+        assert list(frequencies) == [1, 1]
+        # Title matches are weighted above content matches
+        doc_ids, frequencies = reader.postings("wat")  # type: ignore[misc]
+        assert list(doc_ids) == [1]
+        assert list(frequencies) == [3]
+        assert reader.postings("missing") is None
+        assert reader.url_and_indexed_at(1) == (DOCUMENTS[1].url, 2.0)
+        assert list(reader.documents()) == DOCUMENTS
+        reader.close()
+
+    def test_postings__are_in_impact_order_and_can_be_limited(self, tmp_path: Path) -> None:
+        path = tmp_path / "1.seg"
+        write_segment(path, DOCUMENTS)
+        reader = SegmentReader(path)
+
+        # "dyke" is in both titles, Wat's Dyke also mentions it in the content
+        doc_ids, frequencies = reader.postings("dyke")  # type: ignore[misc]
+        assert list(doc_ids) == [1, 0]
+        assert list(frequencies) == [4, 3]
+        assert reader.document_frequency("dyke") == 2
+        doc_ids, frequencies = reader.postings("dyke", limit=1)  # type: ignore[misc]
+        assert list(doc_ids) == [1]
+        assert list(frequencies) == [4]
+        reader.close()
+
+    def test_tokenize__lowercases_and_drops_stop_words(self) -> None:
+        assert tokenize("The Battle of Hastings") == ["battle", "hastings"]
+
+    def test_tokenize__drops_tokens_over_max_length(self) -> None:
+        assert tokenize("data " + "a" * (MAX_TOKEN_LENGTH + 1) + " blob") == ["data", "blob"]
+
+    def test_write_segment__token_too_long_for_term_table__is_skipped(self, tmp_path: Path) -> None:
+        path = tmp_path / "1.seg"
+        # 70000 bytes doesn't fit in the term table's 16 bit length
+        document = DOCUMENTS[0]._replace(content="base64 " + "A" * 70000)
+
+        write_segment(path, [document])
+
+        reader = SegmentReader(path)
+        assert reader.postings("base64") is not None
+        reader.close()
@@ -0,0 +1,17 @@
+import logging
+
+from logging_config import ExtraFieldsFormatter
+
+
+class TestExtraFieldsFormatter:
+    def test_extra_fields__are_appended_to_the_message(self) -> None:
+        record = logging.makeLogRecord({"msg": "Fetched page", "levelname": "INFO", "compressed_bytes": 10})
+
+        assert (
+            ExtraFieldsFormatter("%(levelname)s %(message)s").format(record) == "INFO Fetched page compressed_bytes=10"
+        )
+
+    def test_no_extra_fields__message_is_unchanged(self) -> None:
+        record = logging.makeLogRecord({"msg": "Fetched %s", "args": ("page",), "levelname": "INFO"})
+
+        assert ExtraFieldsFormatter("%(levelname)s %(message)s").format(record) == "INFO Fetched page"
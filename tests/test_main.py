@@ -0,0 +1,18 @@
+import subprocess
+import sys
+
+import pytest
+
+
+class TestImportMain:
+    # Decision: running in a subprocess since the other tests will already have imported these modules
+    @pytest.mark.parametrize("module", ["aiohttp", "bs4", "html5lib", "openai", "brotli", "zstandard", "tiktoken"])
+    def test_heavy_dependencies_are_not_imported_on_startup(self, module: str) -> None:
+        result = subprocess.run(
+            [sys.executable, "-c", f"import sys, main; print('{module}' in sys.modules)"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        assert result.stdout.strip() == "False"
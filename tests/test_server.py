@@ -0,0 +1,96 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from pytest_mock import MockerFixture
+
+from server import RestartPolicy, build_config, get_worker_count, main
+from settings import settings
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+class TestGetWorkerCount:
+    def test_workers_set_in_settings__returns_setting(self, mocker: MockerFixture) -> None:
+        mocker.patch.object(settings, "SERVER_WORKERS", 3)
+
+        assert get_worker_count() == 3
+
+    def test_workers_not_set__returns_available_cpus(self, mocker: MockerFixture) -> None:
+        mocker.patch.object(settings, "SERVER_WORKERS", None)
+        mocker.patch("os.sched_getaffinity", return_value={0, 1, 2, 3}, create=True)
+
+        assert get_worker_count() == 4
+
+
+class TestBuildConfig:
+    def test_uses_uvloop_and_httptools_when_installed(self) -> None:
+        config = build_config()
+
+        assert config.loop == "uvloop"
+        assert config.http == "httptools"
+        assert config.timeout_graceful_shutdown == settings.SERVER_GRACEFUL_SHUTDOWN_TIMEOUT
+
+    def test_falls_back_when_uvloop_and_httptools_are_missing(self, mocker: MockerFixture) -> None:
+        mocker.patch("importlib.util.find_spec", return_value=None)
+
+        config = build_config()
+
+        assert config.loop == "asyncio"
+        assert config.http == "h11"
+
+
+class TestRestartPolicy:
+    def test_repeated_crashes__delay_doubles_up_to_the_maximum(self, mocker: MockerFixture) -> None:
+        mocker.patch.object(settings, "SERVER_RESTART_BACKOFF_SECONDS", 1)
+        mocker.patch.object(settings, "SERVER_MAX_RESTART_BACKOFF_SECONDS", 5)
+        mocker.patch.object(settings, "SERVER_MAX_WORKER_RESTARTS", 10)
+        policy = RestartPolicy()
+
+        assert [policy.record_crash(float(now)) for now in range(5)] == [1, 2, 4, 5, 5]
+
+    def test_crashes_outside_the_window__are_forgotten(self, mocker: MockerFixture) -> None:
+        mocker.patch.object(settings, "SERVER_RESTART_BACKOFF_SECONDS", 1)
+        mocker.patch.object(settings, "SERVER_WORKER_RESTART_WINDOW_SECONDS", 60)
+        policy = RestartPolicy()
+        policy.record_crash(0)
+        policy.record_crash(1)
+
+        assert policy.record_crash(100) == 1
+
+    def test_too_many_crashes_in_the_window__returns_none(self, mocker: MockerFixture) -> None:
+        mocker.patch.object(settings, "SERVER_MAX_WORKER_RESTARTS", 2)
+        policy = RestartPolicy()
+        policy.record_crash(0)
+        policy.record_crash(1)
+
+        assert policy.record_crash(2) is None
+
+
+class TestMain:
+    def test_several_workers_without_jobs_storage__refuses_to_start(self, mocker: MockerFixture) -> None:
+        mocker.patch.object(settings, "SERVER_WORKERS", 2)
+        mocker.patch.object(settings, "JOBS_STORAGE_DIR", "")
+        build_config_mock = mocker.patch("server.build_config")
+
+        assert main() == 1
+        build_config_mock.assert_not_called()
+
+    def test_worker_startup_fails__server_exits_with_error_instead_of_restarting(self, tmp_path: Path) -> None:
+        # The index directory can't be created inside a file, so the app's lifespan startup fails in every worker
+        (tmp_path / "file").touch()
+        env = {
+            **os.environ,
+            "SEARCH_INDEX_DIR": str(tmp_path / "file" / "index"),
+            "SERVER_WORKERS": "2",
+            "SERVER_PORT": "0",
+        }
+
+        result = subprocess.run(
+            [sys.executable, "server.py"], cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, timeout=60
+        )
+
+        assert result.returncode == 1
+        assert "failed to start, shutting down" in result.stderr
+        assert "restarting" not in result.stderr